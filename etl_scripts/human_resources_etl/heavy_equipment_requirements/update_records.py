@@ -2,9 +2,10 @@
 # -*- coding: utf-8 -*-
 """
 批量更新人力資源記錄
-根據 out.json 中的記錄，逐一發送 PATCH API 請求來更新資料庫
+根據 out.json 中的記錄，分批發送 PATCH /human_resources/bulk 請求來更新資料庫
 
-API 格式: PATCH https://guangfu250923.pttapp.cc/human_resources/{id}
+API 格式: PATCH https://guangfu250923.pttapp.cc/human_resources/bulk
+    請求主體為 JSON 陣列，每筆含 id 與要更新的欄位；回應逐筆列出結果
 
 使用方法:
     python update_records.py                # 互動模式，會詢問確認
@@ -13,6 +14,8 @@ API 格式: PATCH https://guangfu250923.pttapp.cc/human_resources/{id}
 
 參數說明:
     --auto-confirm, -y    自動確認，不需要互動輸入
+    --api-key             批次 API 需要的 API Key（預設讀取環境變數 GUANFU_API_KEY）
+    --batch-size          每次請求的筆數（預設 500）
 
 依賴套件:
     pip install requests
@@ -20,26 +23,27 @@ API 格式: PATCH https://guangfu250923.pttapp.cc/human_resources/{id}
 功能特點:
     - 安全確認: 執行前會顯示摘要並要求確認（除非使用 --auto-confirm）
     - 錯誤處理: 包含完整的錯誤處理和日誌記錄
-    - 請求限制: 每次請求間隔 1 秒，避免過於頻繁的 API 調用
-    - 詳細日誌: 顯示每筆記錄的更新狀態和結果摘要
+    - 批次更新: 每批一次請求、一個交易，數千筆也只需數秒
+    - 詳細日誌: 依回應顯示每筆記錄的更新狀態和結果摘要
     - 容錯機制: 單筆記錄失敗不會影響其他記錄的更新
 
 注意事項:
     - 確保 out.json 文件存在且格式正確
     - 確認網路連線正常，能夠訪問 API 端點
-    - 腳本會自動移除請求主體中的 id 欄位
+    - 每筆記錄需含 id，用於指定要更新的資料
 """
 
 import json
+import os
 import requests
-import time
 from typing import List, Dict, Any
 import sys
 import argparse
 
 # API 設定
 BASE_URL = "https://guangfu250923.pttapp.cc/human_resources"
-REQUEST_DELAY = 1  # 每次請求間隔秒數，避免過於頻繁的請求
+BULK_URL = f"{BASE_URL}/bulk"
+DEFAULT_BATCH_SIZE = 500
 
 def load_records(file_path: str) -> List[Dict[str, Any]]:
     """讀取 out.json 文件"""
@@ -55,45 +59,24 @@ def load_records(file_path: str) -> List[Dict[str, Any]]:
         print(f"❌ JSON 格式錯誤: {e}")
         sys.exit(1)
 
-def prepare_patch_data(record: Dict[str, Any]) -> Dict[str, Any]:
-    """準備 PATCH 請求的資料，移除 id 欄位"""
-    patch_data = record.copy()
-    patch_data.pop('id', None)  # 移除 id，因為它不應該在請求主體中
-    return patch_data
-
-def update_record(record: Dict[str, Any]) -> bool:
-    """發送 PATCH 請求更新單筆記錄"""
-    record_id = record.get('id')
-    if not record_id:
-        print(f"❌ 記錄缺少 ID: {record}")
-        return False
-
-    url = f"{BASE_URL}/{record_id}"
-    patch_data = prepare_patch_data(record)
-
+def update_batch(records: List[Dict[str, Any]], api_key: str) -> List[Dict[str, Any]]:
+    """發送一批 PATCH 請求，回傳逐筆結果（index 對應本批中的位置）"""
     try:
-        print(f"🔄 更新記錄: {record_id} ({record.get('org', 'N/A')})")
-
-        # 發送 PATCH 請求
         response = requests.patch(
-            url,
-            json=patch_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
+            BULK_URL,
+            json=records,
+            headers={'Content-Type': 'application/json', 'X-Api-Key': api_key},
+            timeout=120
         )
-
-        if response.status_code == 200:
-            print(f"✅ 成功更新: {record_id}")
-            return True
-        else:
-            print(f"❌ 更新失敗: {record_id}")
-            print(f"   狀態碼: {response.status_code}")
-            print(f"   回應: {response.text}")
-            return False
-
     except requests.exceptions.RequestException as e:
-        print(f"❌ 網路錯誤: {record_id} - {e}")
-        return False
+        print(f"❌ 網路錯誤: {e}")
+        return [{"index": i, "status": None, "error": str(e)} for i in range(len(records))]
+
+    if response.status_code != 200:
+        print(f"❌ 批次更新失敗，狀態碼: {response.status_code}")
+        print(f"   回應: {response.text}")
+        return [{"index": i, "status": response.status_code, "error": response.text} for i in range(len(records))]
+    return response.json()["results"]
 
 def show_summary(records: List[Dict[str, Any]]):
     """顯示將要更新的記錄摘要"""
@@ -125,16 +108,28 @@ def main():
     parser = argparse.ArgumentParser(description='批量更新人力資源記錄')
     parser.add_argument('--auto-confirm', '-y', action='store_true',
                        help='自動確認，不需要互動輸入')
+    parser.add_argument('--api-key', default=os.environ.get('GUANFU_API_KEY', ''),
+                       help='批次 API 需要的 API Key（預設讀取環境變數 GUANFU_API_KEY）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'每次請求的筆數（預設 {DEFAULT_BATCH_SIZE}）')
     args = parser.parse_args()
 
     input_file = "out.json"
 
     print("🚀 人力資源記錄批量更新工具")
     print(f"📂 讀取文件: {input_file}")
-    print(f"🌐 API 端點: {BASE_URL}")
+    print(f"🌐 API 端點: {BULK_URL}")
+
+    if not args.api_key:
+        print("❌ 缺少 API Key，請使用 --api-key 或設定環境變數 GUANFU_API_KEY")
+        sys.exit(1)
 
     # 讀取記錄
     records = load_records(input_file)
+    missing_id = [record for record in records if not record.get('id')]
+    if missing_id:
+        print(f"❌ 有 {len(missing_id)} 筆記錄缺少 ID，請先修正 out.json")
+        sys.exit(1)
 
     # 顯示摘要
     show_summary(records)
@@ -145,22 +140,25 @@ def main():
         return
 
     # 執行批量更新
-    print(f"\n🔄 開始批量更新 (每次請求間隔 {REQUEST_DELAY} 秒)...")
+    print(f"\n🔄 開始批量更新 (每批 {args.batch_size} 筆)...")
 
     success_count = 0
     fail_count = 0
 
-    for i, record in enumerate(records, 1):
-        print(f"\n[{i}/{len(records)}]", end=" ")
-
-        if update_record(record):
-            success_count += 1
-        else:
-            fail_count += 1
-
-        # 在請求之間添加延遲
-        if i < len(records):
-            time.sleep(REQUEST_DELAY)
+    for start in range(0, len(records), args.batch_size):
+        batch = records[start:start + args.batch_size]
+        print(f"\n[{start + 1}-{start + len(batch)}/{len(records)}]")
+
+        for result in update_batch(batch, args.api_key):
+            record = batch[result["index"]]
+            if result["status"] == 200:
+                success_count += 1
+                print(f"✅ 成功更新: {record['id']} ({record.get('org', 'N/A')})")
+            else:
+                fail_count += 1
+                print(f"❌ 更新失敗: {record['id']} ({record.get('org', 'N/A')})")
+                print(f"   狀態碼: {result['status']}")
+                print(f"   錯誤: {result['error']}")
 
     # 顯示最終結果
     print("\n" + "="*60)
@@ -175,4 +173,4 @@ def main():
         print("\n🎉 所有記錄都已成功更新！")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
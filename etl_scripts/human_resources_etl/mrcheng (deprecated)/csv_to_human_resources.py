@@ -3,12 +3,12 @@
 CSV轉換為human_resources API插入腳本
 
 此腳本將CSV檔案中的受災情形資料轉換為符合human_resources schema的格式，
-並透過POST API一筆一筆插入到資料庫。
+並透過 POST /human_resources/bulk 分批插入到資料庫。
 
 功能特點:
 - 智能資料轉換：根據泥沙淤積程度判斷所需人力數量和類型
 - 資料對應邏輯：地址→工作地點，淤積程度→人力需求，清潔狀況→完成度
-- API整合：使用requests庫發送POST請求，包含錯誤處理和進度報告
+- API整合：使用requests庫分批發送POST請求（每批一個交易），包含錯誤處理和進度報告
 
 使用方法:
 1. 基本使用：
@@ -18,7 +18,7 @@ CSV轉換為human_resources API插入腳本
    python csv_to_human_resources.py --csv "data_test.csv" --api-url "https://guangfu250923.pttapp.cc/human_resources" --dry-run
 
 3. 指定批次大小：
-   python csv_to_human_resources.py --csv "data_test.csv" --api-url "https://guangfu250923.pttapp.cc/human_resources" --batch-size 10
+   python csv_to_human_resources.py --csv "data_test.csv" --api-url "https://guangfu250923.pttapp.cc/human_resources" --batch-size 100
 
 4. 查看幫助：
    python csv_to_human_resources.py --help
@@ -26,7 +26,8 @@ CSV轉換為human_resources API插入腳本
 參數說明:
 --csv: CSV檔案路徑（必填）
 --api-url: API基礎URL，例如 http://localhost:8080（必填）
---batch-size: 批次處理大小，預設為1（選填）
+--batch-size: 每次請求的筆數，預設為500（選填）
+--api-key: 批次 API 需要的 API Key，預設讀取環境變數 GUANFU_API_KEY（選填）
 --dry-run: 乾跑模式，只解析不發送請求（選填）
 
 範例CSV格式:
@@ -38,11 +39,13 @@ CSV轉換為human_resources API插入腳本
 - 請確保API服務正在運行
 - 建議先使用 --dry-run 模式測試資料解析
 - 腳本會自動跳過空行和無效資料
-- 每次API請求間隔0.5秒以避免過於頻繁
+- 每筆記錄以地址產生固定 id，重複執行會更新既有資料而不是新增重複的列
+- 批次 API 需要 API Key
 """
 
 import csv
 import json
+import os
 import time
 import uuid
 import argparse
@@ -52,9 +55,10 @@ from typing import Dict, List, Any, Optional
 
 
 class CSVToHumanResourcesConverter:
-    def __init__(self, api_base_url: str, batch_size: int = 1):
+    def __init__(self, api_base_url: str, batch_size: int = 500, api_key: str = ""):
         self.api_base_url = api_base_url.rstrip('/')
         self.batch_size = batch_size
+        self.api_key = api_key
         self.success_count = 0
         self.error_count = 0
         self.errors = []
@@ -92,6 +96,8 @@ class CSVToHumanResourcesConverter:
             updated_at = self._parse_datetime(last_update_date, last_update_time)
 
             human_resource_record = {
+                # 以地址產生固定的 id：重複匯入時覆寫同一筆（POST /bulk 為 upsert），不會產生重複資料
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"guanfu/human_resources/0930/{address}")),
                 "org": "受災戶 (0930匯入)",  # 預設組織名稱
                 "address": address,
                 "phone": "現場報到",  # 預設聯絡電話（光復鄉公所）
@@ -205,53 +211,51 @@ class CSVToHumanResourcesConverter:
         print(f"成功解析 {len(records)} 筆記錄")
         return records
 
-    def post_record(self, record: Dict[str, Any]) -> bool:
-        """發送單筆記錄到API"""
+    def post_batch(self, records: List[Dict[str, Any]]) -> None:
+        """發送一批記錄到批次 API，依回應逐筆記錄成功或失敗"""
         try:
-            url = f"{self.api_base_url}"
+            url = f"{self.api_base_url}/bulk"
             headers = {
                 'Content-Type': 'application/json',
-                'Accept': 'application/json'
+                'Accept': 'application/json',
+                'X-Api-Key': self.api_key,
             }
 
-            response = requests.post(url, json=record, headers=headers, timeout=30)
+            response = requests.post(url, json=records, headers=headers, timeout=120)
 
-            if response.status_code == 201:
+            if response.status_code != 200:
+                error_msg = f"API回應錯誤 {response.status_code}: {response.text}"
+                results = [{'index': i, 'status': response.status_code, 'error': error_msg} for i in range(len(records))]
+            else:
+                results = response.json()['results']
+
+        except requests.RequestException as e:
+            results = [{'index': i, 'status': None, 'error': f"網路請求錯誤: {e}"} for i in range(len(records))]
+
+        for result in results:
+            record = records[result['index']]
+            if result['status'] in (200, 201):
                 self.success_count += 1
-                print(f"✓ 成功插入記錄 address: {record['address']}")
-                return True
+                action = "插入" if result['status'] == 201 else "更新"
+                print(f"✓ 成功{action}記錄 address: {record['address']}")
             else:
                 self.error_count += 1
-                error_msg = f"API回應錯誤 {response.status_code}: {response.text}"
+                error_msg = f"{result['status']}: {result['error']}"
                 self.errors.append({
                     'error': error_msg
                 })
                 print(f"✗ 插入失敗 address: {record['address']}, 錯誤: {error_msg}")
-                return False
-
-        except requests.RequestException as e:
-            self.error_count += 1
-            error_msg = f"網路請求錯誤: {e}"
-            self.errors.append({
-                'error': error_msg
-            })
-            print(f"✗ 插入失敗 address: {record['address']}, 錯誤: {error_msg}")
-            return False
 
     def process_records(self, records: List[Dict[str, Any]]) -> None:
-        """處理所有記錄，逐一發送到API"""
+        """處理所有記錄，分批發送到API"""
         total_records = len(records)
-        print(f"\n開始處理 {total_records} 筆記錄...")
+        print(f"\n開始處理 {total_records} 筆記錄（每批 {self.batch_size} 筆）...")
         print("=" * 60)
 
-        for i, record in enumerate(records, 1):
-            print(f"[{i}/{total_records}] 處理地址: {record['address']}")
-
-            success = self.post_record(record)
-
-            # 避免API請求過於頻繁
-            if i < total_records:
-                time.sleep(0.5)  # 每次請求間隔0.5秒
+        for start in range(0, total_records, self.batch_size):
+            batch = records[start:start + self.batch_size]
+            print(f"[{start + 1}-{start + len(batch)}/{total_records}] 發送批次")
+            self.post_batch(batch)
 
         self.print_summary()
 
@@ -276,13 +280,14 @@ def main():
     parser = argparse.ArgumentParser(description='將CSV檔案轉換並插入到human_resources API')
     parser.add_argument('--csv', required=True, help='CSV檔案路徑')
     parser.add_argument('--api-url', required=True, help='API基礎URL（例如: http://localhost:8080）')
-    parser.add_argument('--batch-size', type=int, default=1, help='批次處理大小（預設: 1）')
+    parser.add_argument('--batch-size', type=int, default=500, help='每次請求的筆數（預設: 500）')
+    parser.add_argument('--api-key', default=os.environ.get('GUANFU_API_KEY', ''), help='批次 API 需要的 API Key（預設讀取環境變數 GUANFU_API_KEY）')
     parser.add_argument('--dry-run', action='store_true', help='乾跑模式，只解析不發送API請求')
 
     args = parser.parse_args()
 
     # 建立轉換器
-    converter = CSVToHumanResourcesConverter(args.api_url, args.batch_size)
+    converter = CSVToHumanResourcesConverter(args.api_url, args.batch_size, args.api_key)
 
     # 讀取並解析CSV
     records = converter.read_csv(args.csv)
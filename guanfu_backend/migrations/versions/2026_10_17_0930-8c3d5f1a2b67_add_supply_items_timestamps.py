@@ -0,0 +1,36 @@
+"""add supply_items timestamps
+
+Revision ID: 8c3d5f1a2b67
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3d5f1a2b67'
+down_revision: Union[str, Sequence[str], None] = '5b1e7c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "supply_items",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+    )
+    op.add_column(
+        "supply_items",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("supply_items", "updated_at")
+    op.drop_column("supply_items", "created_at")
@@ -0,0 +1,44 @@
+"""add deleted_records
+
+Revision ID: 2f6a9d4e7c13
+Revises: 8c3d5f1a2b67
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6a9d4e7c13'
+down_revision: Union[str, Sequence[str], None] = '8c3d5f1a2b67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "deleted_records",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("record_id", sa.String(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # index: (deleted_at, id)，/changes 依此排序與分頁
+    op.create_index(
+        "idx_deleted_records_deleted_at_id",
+        "deleted_records",
+        ["deleted_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_deleted_records_deleted_at_id", table_name="deleted_records")
+    op.drop_table("deleted_records")
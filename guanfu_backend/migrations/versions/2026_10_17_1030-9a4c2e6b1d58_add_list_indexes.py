@@ -0,0 +1,73 @@
+"""add list indexes
+
+Revision ID: 9a4c2e6b1d58
+Revises: 2f6a9d4e7c13
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e6b1d58'
+down_revision: Union[str, Sequence[str], None] = '2f6a9d4e7c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名稱, 資料表, 欄位)，對應各列表 API 的 filter_by + order_by 與 keyset 分頁 (updated_at, id)。
+# 遞增排序的 btree 可反向掃描，同時支援 updated_at desc 的列表與 asc 的游標分頁。
+INDEXES = [
+    ("idx_volunteer_organizations_last_updated_id", "volunteer_organizations", ["last_updated", "id"]),
+    ("idx_shelters_updated_at_id", "shelters", ["updated_at", "id"]),
+    ("idx_shelters_status_updated_at", "shelters", ["status", "updated_at"]),
+    ("idx_medical_stations_updated_at_id", "medical_stations", ["updated_at", "id"]),
+    ("idx_medical_stations_status_updated_at", "medical_stations", ["status", "updated_at"]),
+    ("idx_mental_health_resources_updated_at_id", "mental_health_resources", ["updated_at", "id"]),
+    ("idx_mental_health_resources_status_updated_at", "mental_health_resources", ["status", "updated_at"]),
+    ("idx_accommodations_updated_at_id", "accommodations", ["updated_at", "id"]),
+    ("idx_accommodations_status_updated_at", "accommodations", ["status", "updated_at"]),
+    ("idx_shower_stations_updated_at_id", "shower_stations", ["updated_at", "id"]),
+    ("idx_shower_stations_status_updated_at", "shower_stations", ["status", "updated_at"]),
+    ("idx_water_refill_stations_updated_at_id", "water_refill_stations", ["updated_at", "id"]),
+    ("idx_water_refill_stations_status_updated_at", "water_refill_stations", ["status", "updated_at"]),
+    ("idx_restrooms_updated_at_id", "restrooms", ["updated_at", "id"]),
+    ("idx_restrooms_status_updated_at", "restrooms", ["status", "updated_at"]),
+    ("idx_human_resources_updated_at_id", "human_resources", ["updated_at", "id"]),
+    ("idx_human_resources_status_created_at", "human_resources", ["status", "created_at"]),
+    ("idx_human_resources_role_status_created_at", "human_resources", ["role_status", "created_at"]),
+    ("idx_human_resources_role_type_created_at", "human_resources", ["role_type", "created_at"]),
+    ("idx_supplies_updated_at_id", "supplies", ["updated_at", "id"]),
+    ("idx_supply_items_updated_at_id", "supply_items", ["updated_at", "id"]),
+    ("idx_supply_items_supply_id", "supply_items", ["supply_id"]),
+    ("idx_reports_updated_at_id", "reports", ["updated_at", "id"]),
+    ("idx_reports_status_updated_at", "reports", ["status", "updated_at"]),
+    ("idx_supply_providers_updated_at_id", "supply_providers", ["updated_at", "id"]),
+    ("idx_places_updated_at_id", "places", ["updated_at", "id"]),
+    ("idx_places_type_status_updated_at", "places", ["type", "status", "updated_at"]),
+    ("idx_places_status_updated_at", "places", ["status", "updated_at"]),
+    ("idx_requirements_hr_updated_at_id", "requirements_hr", ["updated_at", "id"]),
+    ("idx_requirements_hr_place_id_updated_at", "requirements_hr", ["place_id", "updated_at"]),
+    ("idx_requirements_supplies_updated_at_id", "requirements_supplies", ["updated_at", "id"]),
+    ("idx_requirements_supplies_place_id_updated_at", "requirements_supplies", ["place_id", "updated_at"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # places、requirements_* 由 init_db（create_all）建立，尚未存在時略過，create_all 會依 models 一併建立索引
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    # CONCURRENTLY 不能在交易中執行；建立索引期間不鎖定寫入
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if table in existing_tables:
+                op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,56 @@
+"""add human_resources search_text
+
+Revision ID: 4d7b1e9c3a25
+Revises: 9a4c2e6b1d58
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d7b1e9c3a25'
+down_revision: Union[str, Sequence[str], None] = '9a4c2e6b1d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 與 models.HUMAN_RESOURCE_SEARCH_TEXT 相同
+SEARCH_TEXT = (
+    "lower(coalesce(role_name, '') || chr(31) || coalesce(role_type, '') || chr(31) || coalesce(assignment_notes, ''))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'human_resources',
+        sa.Column('search_text', sa.Text(), sa.Computed(SEARCH_TEXT, persisted=True), nullable=True),
+    )
+    # CONCURRENTLY 不能在交易中執行；建立索引期間不鎖定寫入
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_human_resources_search_text_trgm',
+            'human_resources',
+            ['search_text'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_using='gin',
+            postgresql_ops={'search_text': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_human_resources_search_text_trgm',
+            table_name='human_resources',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
+    op.drop_column('human_resources', 'search_text')
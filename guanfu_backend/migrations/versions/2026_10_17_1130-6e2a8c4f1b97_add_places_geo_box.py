@@ -0,0 +1,46 @@
+"""add places geo_box
+
+Revision ID: 6e2a8c4f1b97
+Revises: 4d7b1e9c3a25
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.geo import GEO_FUNCTIONS, Box
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a8c4f1b97'
+down_revision: Union[str, Sequence[str], None] = '4d7b1e9c3a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for geo_function in GEO_FUNCTIONS:
+        op.execute(geo_function)
+    # places 由 init_db（create_all）建立，尚未存在時略過，create_all 會依 models 一併建立欄位與索引
+    if 'places' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.add_column('places', sa.Column('geo_box', Box(), sa.Computed('geo_box(coordinates)', persisted=True), nullable=True))
+    # CONCURRENTLY 不能在交易中執行；建立索引期間不鎖定寫入
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_places_geo_box', 'places', ['geo_box'], unique=False,
+            if_not_exists=True, postgresql_using='gist', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'places' in sa.inspect(op.get_bind()).get_table_names():
+        with op.get_context().autocommit_block():
+            op.drop_index('idx_places_geo_box', table_name='places', if_exists=True, postgresql_concurrently=True)
+        op.drop_column('places', 'geo_box')
+    op.execute("DROP FUNCTION IF EXISTS geo_distance_m(box, float8, float8)")
+    op.execute("DROP FUNCTION IF EXISTS geo_box(jsonb)")
@@ -0,0 +1,64 @@
+"""add poi_locations
+
+Revision ID: b3f5d2a7c846
+Revises: 6e2a8c4f1b97
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from src.geo import Box
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f5d2a7c846'
+down_revision: Union[str, Sequence[str], None] = '6e2a8c4f1b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 與 crud.POI_MODELS 相同
+POI_TABLES = [
+    'shelters',
+    'medical_stations',
+    'mental_health_resources',
+    'accommodations',
+    'shower_stations',
+    'water_refill_stations',
+    'restrooms',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'poi_locations',
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('record_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('coordinates', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('geo_box', Box(), sa.Computed('geo_box(coordinates)', persisted=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'record_id'),
+    )
+    op.create_index('idx_poi_locations_geo_box', 'poi_locations', ['geo_box'], unique=False, postgresql_using='gist')
+
+    # 回填既有資料；之後由 crud.create / update / delete 同步
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for table in POI_TABLES:
+        if table in existing_tables:
+            op.execute(
+                f"INSERT INTO poi_locations (kind, record_id, name, status, coordinates) "
+                f"SELECT '{table}', id, name, status, coordinates FROM {table} "
+                f"WHERE coordinates IS NOT NULL AND coordinates <> 'null'::jsonb"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_poi_locations_geo_box', table_name='poi_locations', postgresql_using='gist')
+    op.drop_table('poi_locations')
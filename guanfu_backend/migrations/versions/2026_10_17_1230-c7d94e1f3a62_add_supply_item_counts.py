@@ -0,0 +1,64 @@
+"""add supplies item_count / open_item_count
+
+Revision ID: c7d94e1f3a62
+Revises: b3f5d2a7c846
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.models import SUPPLY_ITEM_COUNT_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d94e1f3a62'
+down_revision: Union[str, Sequence[str], None] = 'b3f5d2a7c846'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('supplies', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('supplies', sa.Column('open_item_count', sa.Integer(), server_default='0', nullable=False))
+
+    # 鎖定 supply_items 直到 commit，回填與建立觸發器之間的寫入不會漏算
+    op.execute("LOCK TABLE supply_items IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(
+        """
+        UPDATE supplies SET item_count = counts.item_count, open_item_count = counts.open_item_count
+        FROM (
+            SELECT supply_id,
+                   count(*) AS item_count,
+                   count(*) FILTER (WHERE COALESCE(received_count, 0) < total_number) AS open_item_count
+            FROM supply_items
+            GROUP BY supply_id
+        ) AS counts
+        WHERE supplies.id = counts.supply_id
+        """
+    )
+    for ddl in SUPPLY_ITEM_COUNT_DDL:
+        op.execute(ddl)
+
+    op.create_index(
+        'idx_supplies_open_updated_at_id', 'supplies', ['updated_at', 'id'], unique=False,
+        postgresql_where=sa.text('open_item_count > 0'),
+    )
+    op.create_index(
+        'idx_supplies_fulfilled_updated_at_id', 'supplies', ['updated_at', 'id'], unique=False,
+        postgresql_where=sa.text('open_item_count = 0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_supplies_fulfilled_updated_at_id', table_name='supplies')
+    op.drop_index('idx_supplies_open_updated_at_id', table_name='supplies')
+    op.execute("DROP TRIGGER IF EXISTS supply_items_counts_update ON supply_items")
+    op.execute("DROP TRIGGER IF EXISTS supply_items_counts_insert_delete ON supply_items")
+    op.execute("DROP FUNCTION IF EXISTS supply_items_maintain_counts()")
+    op.drop_column('supplies', 'open_item_count')
+    op.drop_column('supplies', 'item_count')
@@ -0,0 +1,36 @@
+"""add stats_rollup materialized view
+
+Revision ID: d4a81c9e5b27
+Revises: c7d94e1f3a62
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.stats import STATS_SOURCE_TABLES, STATS_VIEW, STATS_VIEW_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a81c9e5b27'
+down_revision: Union[str, Sequence[str], None] = 'c7d94e1f3a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # requirements_* 由 create_all 建立；尚未建立時略過，之後 create_all 會一併建立 view
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if not set(STATS_SOURCE_TABLES) <= existing:
+        return
+    for ddl in STATS_VIEW_DDL:
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {STATS_VIEW}")
+    op.execute(f"DELETE FROM cache_generations WHERE name = '{STATS_VIEW}'")
@@ -0,0 +1,45 @@
+"""add notification_outbox
+
+Revision ID: e5b93d2f7a14
+Revises: d4a81c9e5b27
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b93d2f7a14'
+down_revision: Union[str, Sequence[str], None] = 'd4a81c9e5b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('embed_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'idx_notification_outbox_pending', 'notification_outbox', ['available_at', 'id'], unique=False,
+        postgresql_where=sa.text('failed_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_notification_outbox_pending', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,43 @@
+"""add line_users access_token_hash / id_token_hash
+
+Revision ID: f1c6a8e2d935
+Revises: e5b93d2f7a14
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8e2d935'
+down_revision: Union[str, Sequence[str], None] = 'e5b93d2f7a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('line_users', sa.Column('access_token_hash', sa.String(length=64), nullable=True))
+    op.add_column('line_users', sa.Column('id_token_hash', sa.String(length=64), nullable=True))
+    # 與 services/line_auth.hash_token 相同：UTF-8 的 SHA-256 hex
+    op.execute(
+        """
+        UPDATE line_users SET
+            access_token_hash = encode(sha256(convert_to(access_token, 'UTF8')), 'hex'),
+            id_token_hash = encode(sha256(convert_to(id_token, 'UTF8')), 'hex')
+        WHERE access_token IS NOT NULL OR id_token IS NOT NULL
+        """
+    )
+    op.create_index(op.f('ix_line_users_access_token_hash'), 'line_users', ['access_token_hash'], unique=False)
+    op.create_index(op.f('ix_line_users_id_token_hash'), 'line_users', ['id_token_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_line_users_id_token_hash'), table_name='line_users')
+    op.drop_index(op.f('ix_line_users_access_token_hash'), table_name='line_users')
+    op.drop_column('line_users', 'id_token_hash')
+    op.drop_column('line_users', 'access_token_hash')
@@ -0,0 +1,70 @@
+"""touch supplies.updated_at from the supply_items trigger
+
+Revision ID: a2e7c4f9b318
+Revises: f1c6a8e2d935
+Create Date: 2026-10-17 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.models import SUPPLY_ITEM_COUNT_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2e7c4f9b318'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a8e2d935'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# c7d94e1f3a62 建立的版本：只維護計數，不更新 supplies.updated_at
+PREVIOUS_FUNCTION = """
+CREATE OR REPLACE FUNCTION supply_items_maintain_counts() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    old_open int := 0;
+    new_open int := 0;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_open := (COALESCE(OLD.received_count, 0) < OLD.total_number)::int;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_open := (COALESCE(NEW.received_count, 0) < NEW.total_number)::int;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.supply_id = NEW.supply_id THEN
+        IF old_open <> new_open THEN
+            UPDATE supplies SET open_item_count = open_item_count + new_open - old_open
+            WHERE id = NEW.supply_id;
+        END IF;
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE supplies SET item_count = item_count - 1, open_item_count = open_item_count - old_open
+        WHERE id = OLD.supply_id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE supplies SET item_count = item_count + 1, open_item_count = open_item_count + new_open
+        WHERE id = NEW.supply_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for ddl in SUPPLY_ITEM_COUNT_DDL:
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_FUNCTION)
+    op.execute(
+        "CREATE OR REPLACE TRIGGER supply_items_counts_update "
+        "AFTER UPDATE OF supply_id, total_number, received_count ON supply_items "
+        "FOR EACH ROW EXECUTE FUNCTION supply_items_maintain_counts()"
+    )
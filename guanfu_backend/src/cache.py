@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    行程內（per-worker）的 TTL + LRU 快取。
+    - 以 namespace（通常是資料表名稱）分組，寫入時可整組失效
+    - 超過 max_entries 時淘汰最久未使用的項目
+    - 以 Lock 保護，sync 路由在 threadpool 中並行存取也安全
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[tuple, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._data.get(full_key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[full_key]
+                return None
+            self._data.move_to_end(full_key)
+            return value
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        full_key = (namespace, key)
+        with self._lock:
+            self._data[full_key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def invalidate(self, namespace: str) -> None:
+        """移除某個 namespace 底下的所有項目"""
+        with self._lock:
+            for full_key in [k for k in self._data if k[0] == namespace]:
+                del self._data[full_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -23,6 +25,48 @@ class Settings(BaseSettings):
     DB_NAME: str
     INSTANCE_CONNECTION_NAME: str = ""
 
+    # SQLAlchemy 連線池（每個 uvicorn worker 各自一組，總連線數約為 workers * (POOL_SIZE + MAX_OVERFLOW)）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # 超過此秒數的連線在 checkout 時重建，-1 為不回收
+    DB_POOL_TIMEOUT_SECONDS: int = 30  # 連線池用盡時等待可用連線的秒數
+    DB_POOL_PRE_PING: bool = True  # 每次 checkout 先 ping 一次；已設定 recycle 且網路穩定時可關閉省一次往返
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 傳給 Postgres 的 statement_timeout，0 為不限制
+    DB_APPLICATION_NAME: str = "guanfu-backend"  # 顯示於 pg_stat_activity.application_name
+    DB_POOL_WARMUP: bool = True  # worker 啟動時先建立 DB_POOL_SIZE 條連線，再開始接受請求
+
+    # 公開 GET 端點的回應快取（每個 worker 各自一份，透過 cache_generations 判斷是否過期）
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RESPONSE_CACHE_MAX_BODY_BYTES: int = 1_048_576  # 單筆回應超過此大小不快取
+
+    # POST / PATCH /{resource}/bulk：每 BULK_CHUNK_SIZE 筆一個交易，單次請求最多 BULK_MAX_ROWS 筆
+    BULK_CHUNK_SIZE: int = 500
+    BULK_MAX_ROWS: int = 10000
+
+    # GET /{resource}/export：server-side cursor 每次取回的筆數
+    EXPORT_YIELD_PER: int = 1000
+
+    # /stats：背景工作每 STATS_REFRESH_SECONDS 秒檢查來源資料表是否有寫入，有才重新彙總；0 表示不啟動
+    STATS_REFRESH_SECONDS: float = 15
+
+    # /tiles：zoom 小於 TILE_CLUSTER_MAX_ZOOM 時，將圖磚切成 GRID x GRID 格並合併成聚合點
+    TILE_CLUSTER_MAX_ZOOM: int = 14
+    TILE_CLUSTER_GRID: int = 32
+    # 已產生的圖磚（每個 worker 各自一份），以圖磚內資料的 (max(updated_at), 筆數) 為版本，圖磚內資料異動即失效
+    TILE_CACHE_TTL_SECONDS: int = 300
+    TILE_CACHE_MAX_ENTRIES: int = 4096
+
+    # /changes 只回傳早於「現在 - 此秒數」的異動，避免同步端跳過較晚 commit 的交易
+    CHANGES_SETTLE_SECONDS: float = 5
+
+    # 啟動時的資料表初始化：create_all（預設，沿用 init_db）/ alembic（upgrade head）/ none（交給部署流程）
+    # 透過 src.serve 啟動多個 worker 時只在主行程執行一次，worker 一律視為 none
+    DB_INIT_ON_STARTUP: Literal["create_all", "alembic", "none"] = "create_all"
+    # src.serve 的 worker 數，0 為依可用 CPU 數決定（WEB_CONCURRENCY 環境變數優先）
+    WEB_CONCURRENCY: int = 0
+
     # PROD_SERVER_URL 可以有預設值，因為它不是敏感資訊
     PROD_SERVER_URL: str = "https://api.gf250923.org"
     DEV_SERVER_URL: str = "https://uat-api.gf250923.org"
@@ -37,10 +81,38 @@ class Settings(BaseSettings):
     LINE_CLIENT_SECRET: str
     LINE_REDIRECT_URI: str = ""  # DEPRECATED: redirect_uri 現在由前端在 /authorize 請求中提供
     LINE_SCOPES: str = "profile openid email"
+    # /line/authorize 的 state 加密金鑰（未設定時由 LINE_CLIENT_SECRET 衍生）；已使用 state 的防重送快取上限（每個 worker 各自一份）
+    LINE_STATE_SECRET: str = ""
+    LINE_STATE_REPLAY_CACHE_MAX_ENTRIES: int = 10000
+    # verify_user_token 的 token 快取（每個 worker 各自一份，依 line_users 的快取世代失效，refresh / revoke 後所有 worker 立即生效）
+    LINE_TOKEN_CACHE_TTL_SECONDS: int = 60
+    LINE_TOKEN_CACHE_MAX_ENTRIES: int = 4096
 
     # Discord Webhook
     DISCORD_WEBHOOK_URL: str = ""
 
+    # 對外 HTTP 呼叫（Discord、LINE）共用的 httpx client，每個 worker 一個
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 20
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 60
+
+    # Discord 通知 outbox：輪詢間隔、合併等待時間、重試次數與退避、shutdown 時等待送完的秒數
+    NOTIFY_POLL_SECONDS: float = 5
+    NOTIFY_COALESCE_SECONDS: float = 1
+    NOTIFY_MAX_ATTEMPTS: int = 5
+    NOTIFY_RETRY_BASE_SECONDS: float = 1
+    NOTIFY_RETRY_MAX_SECONDS: float = 30
+    NOTIFY_DRAIN_SECONDS: float = 10
+    # 認領後的發送租約：發送中的 worker 中斷時，超過此秒數未處理的通知可由其他 worker 重新認領（需大於 Discord 逾時）
+    NOTIFY_CLAIM_LEASE_SECONDS: float = 60
+    # 放棄發送的通知（含個人資料）保留的時數，之後刪除
+    NOTIFY_FAILED_RETENTION_HOURS: float = 72
+
+    # 列表 totalItems 精確計數快取（每個 worker 各自一份，寫入時失效）
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+
 
 # 建立一個全域的 settings 實例供整個專案引用
 settings = Settings()
@@ -1,19 +1,28 @@
-from typing import List, Optional, Type, TypeVar
+from typing import List, Optional, Sequence, Tuple, Type, TypeVar
 from urllib.parse import urlencode
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import base64
+import binascii
 import json
 
 from fastapi import HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import exists, and_, select, text
+from sqlalchemy import Integer, Select, String, and_, column, func, literal, literal_column, null, select, text, tuple_, update as sa_update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.inspection import inspect as sa_inspect
 from starlette import status
 
-from . import models
+from . import geo, models
+from .cache import TTLCache
+from .config import settings
+from .http_cache import NAIVE_TIMEZONE
 from .models import Supply, SupplyItem
-from .schemas import SupplyCreate, SupplyItemDistribution
+from .response_cache import invalidate_tables
+from .schemas import CountMode, SupplyCreate, SupplyItemDistribution
 from .pin_related import generate_pin
 from .enum_serializer import *
 
@@ -21,6 +30,16 @@ ModelType = TypeVar("ModelType", bound=models.Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+COUNT_DESCRIPTION = (
+    "totalItems 計算方式：exact 精確計數（依過濾條件快取，寫入時失效）、"
+    "estimate 無過濾條件時使用資料表統計估計值、none 不計數"
+)
+
+CURSOR_DESCRIPTION = (
+    "游標分頁（keyset）：第一頁帶空值 `cursor=`，之後沿用回應中的 next 連結；"
+    "啟用時忽略 offset，並依 (updated_at, id) 由舊到新排序"
+)
+
 
 def get_by_id(db: Session, model: Type[ModelType], id: Any) -> Optional[ModelType]:
     """
@@ -29,43 +48,171 @@ def get_by_id(db: Session, model: Type[ModelType], id: Any) -> Optional[ModelTyp
     return db.query(model).filter(model.id == id).first()
 
 
-def build_next_link(request: Request, *, limit: int, offset: int, total: int) -> Optional[str]:
+async def get_by_id_async(
+    db: AsyncSession, model: Type[ModelType], id: Any, options: Sequence[Any] = ()
+) -> Optional[ModelType]:
+    """
+    get_by_id 的 async 版本；options 可指定關聯載入策略（AsyncSession 不支援 lazy load）。
+    """
+    stmt = select(model).where(model.id == id)
+    if options:
+        stmt = stmt.options(*options)
+    return (await db.scalars(stmt)).first()
+
+
+def keyset_columns(model: Type[ModelType]) -> tuple:
+    """
+    游標分頁的排序鍵：(updated_at, id)；沒有 updated_at 的資料表退回只用 id。
+    """
+    if "updated_at" in model.__table__.c:
+        return model.updated_at, model.id
+    return (model.id,)
+
+
+def encode_token(values: list) -> str:
+    """將排序鍵編碼為不透明的字串（base64url JSON）；datetime 以 ISO 8601 表示。"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str, length: int, detail: str = "cursor 格式不正確") -> list:
+    """解析 encode_token 產生的字串；第一個值若為 ISO 8601 時間會轉回 datetime。格式不符時回 400。"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != length:
+            raise ValueError("token length mismatch")
+        if length > 1:
+            values[0] = datetime.fromisoformat(values[0])
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return values
+
+
+def encode_cursor(obj: Any) -> str:
+    """
+    將資料列的排序鍵編碼為不透明的游標字串（base64url JSON）。
+    """
+    return encode_token([getattr(obj, column.key) for column in keyset_columns(type(obj))])
+
+
+def decode_cursor(model: Type[ModelType], cursor: str) -> list:
+    """
+    解析 encode_cursor 產生的游標；格式不符時回 400。
+    """
+    return decode_token(cursor, len(keyset_columns(model)))
+
+
+def apply_cursor(query, model: Type[ModelType], cursor: str):
+    """
+    套用 keyset 條件：清除原排序，改依 keyset_columns 排序並跳過游標之前的資料。
+    空字串代表從頭開始。
+    """
+    columns = keyset_columns(model)
+    if cursor:
+        query = query.filter(tuple_(*columns) > tuple_(*decode_cursor(model, cursor)))
+    return query.order_by(None).order_by(*columns)
+
+
+def build_next_link(
+    request: Request,
+    *,
+    limit: int,
+    offset: int,
+    total: Optional[int],
+    cursor: Optional[str] = None,
+    items: Optional[List[Any]] = None,
+) -> Optional[str]:
     """
     回傳相對路徑的下一頁連結，如 /shelters?...&limit=50&offset=100
+    游標模式（cursor 不為 None）則以本頁最後一筆產生 cursor，例如 /shelters?...&limit=50&cursor=...
+    total 為 None（count=none）時以本頁是否取滿 limit 判斷是否還有下一頁。
     """
-    if offset + limit >= total:
-        return None
     q = dict(request.query_params)  # 保留原查詢參數（例如 status、embed 等）
     q["limit"] = str(limit)
+    if cursor is not None:
+        if not items or len(items) < limit:
+            return None
+        q.pop("offset", None)
+        q["cursor"] = encode_cursor(items[-1])
+        return f"{request.url.path}?{urlencode(q, doseq=True)}"
+
+    if total is None:
+        if not items or len(items) < limit:
+            return None
+    elif offset + limit >= total:
+        return None
     q["offset"] = str(offset + limit)
     return f"{request.url.path}?{urlencode(q, doseq=True)}"
 
 
-def get_multi(
-    db: Session,
+def build_list_statement(
     model: Type[ModelType],
     skip: int = 0,
     limit: int = 100,
     order_by=None,
+    cursor: Optional[str] = None,
+    options: Sequence[Any] = (),
     **filters: Any,
-) -> List[ModelType]:
+) -> Select:
     """
-    通用列表查詢：
+    組出 get_multi / get_multi_async 共用的列表查詢：
     - 對 filters 做正規化（Enum -> value；移除 None）
     - 使用 filter_by（簡單等值查詢）
     - 支援 order_by（傳 ColumnElement，例如 model.created_at.desc()）
+    - cursor 不為 None 時改用 keyset 分頁（忽略 skip 與 order_by）
+    - options 為關聯載入策略（例如 selectinload），與分頁同一次查詢套用
     """
-    query = db.query(model)
+    stmt = select(model)
+    if options:
+        stmt = stmt.options(*options)
 
     if filters:
         normalized_filters = normalize_filters_dict(filters)
         if normalized_filters:
-            query = query.filter_by(**normalized_filters)
+            stmt = stmt.filter_by(**normalized_filters)
+
+    if cursor is not None:
+        return apply_cursor(stmt, model, cursor).limit(limit)
 
     if order_by is not None:
-        query = query.order_by(order_by)
+        stmt = stmt.order_by(order_by)
+
+    return stmt.offset(skip).limit(limit)
+
+
+def get_multi(
+    db: Session,
+    model: Type[ModelType],
+    skip: int = 0,
+    limit: int = 100,
+    order_by=None,
+    cursor: Optional[str] = None,
+    options: Sequence[Any] = (),
+    **filters: Any,
+) -> List[ModelType]:
+    """
+    通用列表查詢，參數說明見 build_list_statement。
+    """
+    stmt = build_list_statement(model, skip, limit, order_by, cursor, options, **filters)
+    return list(db.scalars(stmt).all())
 
-    return query.offset(skip).limit(limit).all()
+
+async def get_multi_async(
+    db: AsyncSession,
+    model: Type[ModelType],
+    skip: int = 0,
+    limit: int = 100,
+    order_by=None,
+    cursor: Optional[str] = None,
+    options: Sequence[Any] = (),
+    **filters: Any,
+) -> List[ModelType]:
+    """
+    get_multi 的 async 版本。
+    """
+    stmt = build_list_statement(model, skip, limit, order_by, cursor, options, **filters)
+    return list((await db.scalars(stmt)).all())
 
 
 def orm_to_dict(obj: Any) -> dict:
@@ -89,11 +236,262 @@ def mask_id_if_field_equals(rows, field: str, value: bool | str):
     return out
 
 
-def count(db: Session, model: Type[ModelType], **filters) -> int:
-    query = db.query(model)
+def build_count_statement(model: Type[ModelType], statement: Optional[Select] = None, **filters) -> Select:
+    """
+    組出計數查詢；statement 為路由自組的列表查詢時，以子查詢計數（忽略排序）。
+    """
+    if statement is not None:
+        return select(func.count()).select_from(statement.order_by(None).subquery())
+    stmt = select(func.count()).select_from(model)
     if filters:
-        query = query.filter_by(**normalize_filters_dict(filters))
-    return query.count()
+        normalized_filters = normalize_filters_dict(filters)
+        if normalized_filters:
+            stmt = stmt.filter_by(**normalized_filters)
+    return stmt
+
+
+def freshness_column(model: Type[ModelType]):
+    """資料列的最後更新時間欄位：updated_at，志工招募單位為 last_updated；都沒有時回傳 None"""
+    for name in ("updated_at", "last_updated"):
+        if name in model.__table__.c:
+            return getattr(model, name)
+    return None
+
+
+def build_freshness_statement(model: Type[ModelType], statement: Optional[Select] = None, **filters) -> Select:
+    """
+    組出 (max(updated_at), 筆數) 查詢，作為範圍查詢（例如圖磚）的版本資訊。
+    一般列表改用 collection_version，不需掃描符合條件的資料列。
+    """
+    if statement is None:
+        statement = build_list_statement(model, **filters)
+    sub = statement.order_by(None).limit(None).offset(None).subquery()
+    column = freshness_column(model)
+    return select(func.max(sub.c[column.key]) if column is not None else null(), func.count()).select_from(sub)
+
+
+def collection_freshness(db: Session, model: Type[ModelType], statement: Optional[Select] = None, **filters) -> tuple:
+    return tuple(db.execute(build_freshness_statement(model, statement, **filters)).one())
+
+
+async def collection_freshness_async(
+    db: AsyncSession, model: Type[ModelType], statement: Optional[Select] = None, **filters
+) -> tuple:
+    return tuple((await db.execute(build_freshness_statement(model, statement, **filters))).one())
+
+
+def build_version_statement(model: Type[ModelType]) -> Select:
+    """
+    列表的版本資訊：資料表在 cache_generations 的 (世代, 更新時間)，單一主鍵查詢。
+    所有寫入都經由 commit_changes 將世代 +1，世代相同即表示列表內容沒有變動。
+    """
+    return select(models.CacheGeneration.generation, models.CacheGeneration.updated_at).where(
+        models.CacheGeneration.name == model.__tablename__
+    )
+
+
+def collection_version(db: Session, model: Type[ModelType]) -> tuple:
+    """(世代, 更新時間)；資料表尚未寫入過時為 (0, None)"""
+    row = db.execute(build_version_statement(model)).one_or_none()
+    return tuple(row) if row is not None else (0, None)
+
+
+async def collection_version_async(db: AsyncSession, model: Type[ModelType]) -> tuple:
+    row = (await db.execute(build_version_statement(model))).one_or_none()
+    return tuple(row) if row is not None else (0, None)
+
+
+def count(db: Session, model: Type[ModelType], **filters) -> int:
+    return db.scalar(build_count_statement(model, **filters))
+
+
+async def count_async(db: AsyncSession, model: Type[ModelType], **filters) -> int:
+    return await db.scalar(build_count_statement(model, **filters))
+
+
+# 精確計數快取：namespace 為資料表名稱，key 為 (快取世代, 正規化後的過濾條件)
+# 其他 worker 寫入時只會 +1 cache_generations，不會清除本 worker 的快取，因此以世代區分版本
+count_cache = TTLCache(
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+
+def build_generation_statement(model: Type[ModelType]) -> Select:
+    """資料表目前的快取世代（單一主鍵查詢）；尚未寫入過時沒有資料列"""
+    return select(models.CacheGeneration.generation).where(models.CacheGeneration.name == model.__tablename__)
+
+ESTIMATE_COUNT_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)")
+
+
+def _reltuples_to_estimate(reltuples: Optional[int]) -> Optional[int]:
+    # 尚未 ANALYZE 過的資料表 reltuples 為 -1
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def estimate_count(db: Session, model: Type[ModelType]) -> Optional[int]:
+    """
+    讀取 pg_class.reltuples 作為整張表的估計筆數；尚未 ANALYZE 過時回傳 None。
+    """
+    reltuples = db.execute(ESTIMATE_COUNT_SQL, {"table_name": model.__tablename__}).scalar()
+    return _reltuples_to_estimate(reltuples)
+
+
+async def estimate_count_async(db: AsyncSession, model: Type[ModelType]) -> Optional[int]:
+    reltuples = (await db.execute(ESTIMATE_COUNT_SQL, {"table_name": model.__tablename__})).scalar()
+    return _reltuples_to_estimate(reltuples)
+
+
+def count_with_mode(
+    db: Session,
+    model: Type[ModelType],
+    mode: CountMode = "exact",
+    statement: Optional[Select] = None,
+    cache_key: tuple = (),
+    generation: Optional[int] = None,
+    **filters,
+) -> Tuple[Optional[int], str]:
+    """
+    依 mode 回傳 (totalItems, countMode)：
+    - none：不計數，回傳 (None, "none")
+    - estimate：沒有任何過濾條件時回傳 reltuples 估計值；否則退回 exact
+    - exact：精確計數，依 (資料表, 快取世代, 過濾條件, cache_key) 快取；任一 worker 寫入後世代 +1 即不再命中
+    statement 用於路由自組的查詢（例如關鍵字搜尋），此時需以 cache_key 區分條件。
+    generation 為路由已由 collection_version 取得的世代，省去一次查詢。
+    """
+    if mode == "none":
+        return None, "none"
+
+    normalized_filters = normalize_filters_dict(filters)
+    if mode == "estimate" and not normalized_filters and not cache_key:
+        estimated = estimate_count(db, model)
+        if estimated is not None:
+            return estimated, "estimate"
+
+    if generation is None:
+        generation = db.scalar(build_generation_statement(model)) or 0
+    key = (generation, tuple(sorted(normalized_filters.items())), cache_key)
+    total = count_cache.get(model.__tablename__, key)
+    if total is None:
+        total = db.scalar(build_count_statement(model, statement, **normalized_filters))
+        count_cache.set(model.__tablename__, key, total)
+    return total, "exact"
+
+
+async def count_with_mode_async(
+    db: AsyncSession,
+    model: Type[ModelType],
+    mode: CountMode = "exact",
+    statement: Optional[Select] = None,
+    cache_key: tuple = (),
+    generation: Optional[int] = None,
+    **filters,
+) -> Tuple[Optional[int], str]:
+    """
+    count_with_mode 的 async 版本，共用同一份計數快取。
+    """
+    if mode == "none":
+        return None, "none"
+
+    normalized_filters = normalize_filters_dict(filters)
+    if mode == "estimate" and not normalized_filters and not cache_key:
+        estimated = await estimate_count_async(db, model)
+        if estimated is not None:
+            return estimated, "estimate"
+
+    if generation is None:
+        generation = await db.scalar(build_generation_statement(model)) or 0
+    key = (generation, tuple(sorted(normalized_filters.items())), cache_key)
+    total = count_cache.get(model.__tablename__, key)
+    if total is None:
+        total = await db.scalar(build_count_statement(model, statement, **normalized_filters))
+        count_cache.set(model.__tablename__, key, total)
+    return total, "exact"
+
+
+def bump_cache_generations(db: Session, table_names: Sequence[str]) -> None:
+    """
+    在目前交易中將資料表的快取世代 +1（與資料一起 commit），
+    其他 worker 的回應快取讀到新的世代即視為過期。依名稱排序鎖定，避免並行寫入互相死結。
+    """
+    stmt = pg_insert(models.CacheGeneration).values(
+        [{"name": name, "generation": 1} for name in sorted(table_names)]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.CacheGeneration.name],
+        set_={"generation": models.CacheGeneration.generation + 1, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def commit_changes(db: Session, *changed_models: Type[ModelType]) -> None:
+    """
+    提交交易，並讓受影響資料表的列表計數快取與回應快取失效。
+    所有寫入路徑都應透過此函式 commit，避免列表回傳過期的 totalItems 或快取內容。
+    """
+    # supply_items 的觸發器會一併更新 supplies 的項目計數（影響 status 過濾的列表與計數）
+    if models.SupplyItem in changed_models:
+        changed_models = (*changed_models, models.Supply)
+    table_names = sorted({model.__tablename__ for model in changed_models})
+    if table_names:
+        bump_cache_generations(db, table_names)
+    db.commit()
+    for name in table_names:
+        count_cache.invalidate(name)
+    invalidate_tables(table_names)
+
+
+# 座標同步到 poi_locations 的設施資料表（資料表名稱即 /poi/nearby 的 kind）
+POI_MODELS = {
+    model.__tablename__: model
+    for model in (
+        models.Shelter,
+        models.MedicalStation,
+        models.MentalHealthResource,
+        models.Accommodation,
+        models.ShowerStation,
+        models.WaterRefillStation,
+        models.Restroom,
+    )
+}
+
+
+def sync_poi_locations(db: Session, model: Type[ModelType], ids: Sequence[str], deleted: bool = False) -> tuple:
+    """
+    在目前交易中依來源資料表重建這些 id 的 poi_locations（沒有座標或已刪除的不寫入）；
+    回傳受影響的 model，交給 commit_changes 讓相關快取失效。非設施資料表不處理。
+    """
+    if model.__tablename__ not in POI_MODELS or not ids:
+        return ()
+    kind = model.__tablename__
+    poi = models.PoiLocation
+    db.query(poi).filter(poi.kind == kind, poi.record_id.in_(ids)).delete(synchronize_session=False)
+    if not deleted:
+        source = select(literal(kind), model.id, model.name, model.status, model.coordinates).where(
+            model.id.in_(ids), func.jsonb_typeof(model.coordinates) == "object"
+        )
+        db.execute(
+            pg_insert(poi).from_select([poi.kind, poi.record_id, poi.name, poi.status, poi.coordinates], source)
+        )
+    return (poi,)
+
+
+def sync_poi_location(db: Session, db_obj: Any, deleted: bool = False) -> tuple:
+    """單筆版本的 sync_poi_locations；建立時需先 flush 取得 id"""
+    if db_obj.__tablename__ not in POI_MODELS:
+        return ()
+    db.flush()
+    return sync_poi_locations(db, type(db_obj), [str(db_obj.id)], deleted)
+
+
+def _insert_returning(db: Session, model: Type[ModelType], values: dict) -> ModelType:
+    """
+    以 ORM 的 INSERT ... RETURNING 建立單筆資料，server default（created_at 等）與 generated column 一併取回，
+    commit 後不需再 refresh（SessionLocal 設定 expire_on_commit=False）。
+    """
+    return db.scalars(pg_insert(model).values(**values).returning(model)).one()
 
 
 def create(db: Session, model: Type[ModelType], obj_in: CreateSchemaType) -> ModelType:
@@ -103,10 +501,8 @@ def create(db: Session, model: Type[ModelType], obj_in: CreateSchemaType) -> Mod
     - 在持久化前，統一將 Enum 轉為字串，避免 psycopg2 適配問題。
     """
     data = normalize_payload_dict(obj_in.model_dump())  # Enum to value
-    db_obj = model(**data)
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    db_obj = _insert_returning(db, model, data)
+    commit_changes(db, model, *sync_poi_location(db, db_obj))
     return db_obj
 
 
@@ -118,10 +514,8 @@ def create_with_input(db: Session, model: Type[ModelType], obj_in: CreateSchemaT
     """
     payload = normalize_payload_dict(obj_in.model_dump(mode="json"))
     extra = normalize_payload_dict(kwargs) if kwargs else {}
-    db_obj = model(**payload, **extra)
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    db_obj = _insert_returning(db, model, {**payload, **extra})
+    commit_changes(db, model, *sync_poi_location(db, db_obj))
     return db_obj
 
 
@@ -130,19 +524,252 @@ def update(db: Session, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelTyp
     更新資料列：
     - 只在 POST 做嚴格驗證；PUT/PATCH 可寬鬆（schema 以 Optional[str] 允許非標準值）。
     - 但仍需避免 Enum 直接進 DB，故在這裡統一轉字串。
+    - 以 UPDATE ... RETURNING 寫入並取回欄位值（含 onupdate 與 generated column），直接套用到 db_obj；
+      只回傳欄位、不回傳實體，已載入的關聯（例如 Supply.supplies）不會因此失效而重新查詢。
     """
+    model = type(db_obj)
     update_data = normalize_payload_dict(obj_in.model_dump(exclude_unset=True))
+    # Patch schema 可能帶有非欄位的值（例如 SupplyItemPatch.valid_pin 只用於驗證），UPDATE 只寫入實際欄位
+    column_keys = {attr.key for attr in sa_inspect(model).column_attrs}
+    update_data = {key: value for key, value in update_data.items() if key in column_keys}
     # update time
-    if "updated_at" in db_obj.__table__.c:
-        setattr(db_obj, "updated_at", datetime.now(timezone.utc))
-    for field, value in update_data.items():
-        setattr(db_obj, field, value)
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    if "updated_at" in model.__table__.c:
+        update_data["updated_at"] = datetime.now(timezone.utc)
+    if update_data:
+        columns = [attr for attr in sa_inspect(model).column_attrs if not attr.deferred]
+        stmt = (
+            sa_update(model)
+            .where(model.id == db_obj.id)
+            .values(**update_data)
+            .returning(*[getattr(model, attr.key).label(attr.key) for attr in columns])
+        )
+        row = db.execute(stmt, execution_options={"synchronize_session": False}).one()
+        for key, value in row._mapping.items():
+            set_committed_value(db_obj, key, value)
+    commit_changes(db, model, *sync_poi_locations(db, model, [str(db_obj.id)]))
     return db_obj
 
 
+def delete(db: Session, db_obj: ModelType) -> None:
+    """
+    刪除資料列並提交；同一個交易中寫入 tombstone（deleted_records），供 /changes 同步刪除。
+    """
+    db.add(models.DeletedRecord(table_name=db_obj.__tablename__, record_id=str(db_obj.id)))
+    changed = sync_poi_location(db, db_obj, deleted=True)
+    db.delete(db_obj)
+    commit_changes(db, type(db_obj), *changed)
+
+
+def bulk_upsert(
+    db: Session, model: Type[ModelType], rows: List[dict], keep_on_conflict: Sequence[str] = ()
+) -> List[Tuple[str, bool]]:
+    """
+    批次建立或覆寫：一次 executemany 的 INSERT ... ON CONFLICT (id) DO UPDATE ... RETURNING，在目前交易中執行（不 commit）。
+    - rows 需帶相同的欄位與 id；id 已存在時以 rows 的欄位覆寫，created_at 與 keep_on_conflict 的欄位保留原值
+    - 回傳與 rows 順序相同的 (id, 是否為新建立)；呼叫端負責 sync_poi_locations 與 commit_changes
+    """
+    stmt = pg_insert(model)
+    keep = {"id", "created_at", *keep_on_conflict}
+    set_ = {key: stmt.excluded[key] for key in rows[0] if key not in keep}
+    if "updated_at" in model.__table__.c:
+        set_["updated_at"] = func.now()
+    stmt = stmt.on_conflict_do_update(index_elements=[model.id], set_=set_).returning(
+        model.id, literal_column("xmax = 0").label("inserted"), sort_by_parameter_order=True
+    )
+    return [(row.id, row.inserted) for row in db.execute(stmt, rows)]
+
+
+def bulk_update(db: Session, model: Type[ModelType], rows: List[dict]) -> None:
+    """
+    批次更新：rows 為含主鍵 id 的 dict（各筆欄位可不同），以 ORM 依主鍵的 executemany UPDATE 執行，不 commit。
+    """
+    if "updated_at" in model.__table__.c:
+        now = datetime.now(timezone.utc)
+        rows = [{**row, "updated_at": now} for row in rows]
+    db.execute(sa_update(model), rows)
+
+
+# ===================================================================
+# 增量同步（/changes）
+# ===================================================================
+
+# 異動依 (時間, 來源, id) 排序；來源為資源名稱，刪除紀錄的來源為 deleted_records
+CHANGE_SOURCE_DELETED = models.DeletedRecord.__tablename__
+# 比所有來源名稱都大的哨兵：since 轉成的起點只取時間嚴格大於 since 的資料
+CHANGE_SOURCE_AFTER_ALL = "~"
+
+
+def _column_time(column, value: datetime):
+    """tz-aware 時間轉成欄位使用的型別；沒有時區的欄位依 schemas 慣例視為 UTC+8"""
+    if getattr(column.type, "timezone", False):
+        return value
+    return value.astimezone(NAIVE_TIMEZONE).replace(tzinfo=None)
+
+
+def _aware_time(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=NAIVE_TIMEZONE)
+
+
+def _after_position(column, id_column, source: str, after: Optional[tuple]):
+    """(時間, 來源, id) 大於 after 的條件，只作用於單一來源"""
+    if after is None:
+        return column.is_not(None)
+    after_time, after_source, after_id = after
+    after_time = _column_time(column, after_time)
+    if source < after_source:
+        return column > after_time
+    if source == after_source:
+        return tuple_(column, id_column) > tuple_(after_time, after_id)
+    return column >= after_time
+
+
+async def get_changes_async(
+    db: AsyncSession,
+    resources: Sequence[Any],
+    after: Optional[tuple],
+    limit: int,
+    settle_seconds: float = 0,
+) -> Tuple[List[tuple], bool]:
+    """
+    依 (時間, 來源, id) 取得 after 之後的異動，回傳 ([(時間, 來源, id, 資料列或刪除紀錄)], 是否還有更多)。
+    - resources 為 resource_registry.Resource；各來源以 (updated_at, id) 索引排序並各取 limit + 1 筆後合併
+    - 刪除紀錄僅包含 resources 內的資料表
+    - settle_seconds：只回傳早於「資料庫現在時間 - settle_seconds」的異動。updated_at 為交易開始時間，
+      較晚 commit 的長交易可能帶著較早的時間，延後一小段時間可避免同步端的高水位越過尚未 commit 的資料
+    """
+    until = (await db.execute(select(func.now()))).scalar() - timedelta(seconds=settle_seconds)
+    changes = []
+    for resource in sorted(resources, key=lambda r: r.name):
+        column = freshness_column(resource.model)
+        stmt = (
+            select(resource.model)
+            .where(_after_position(column, resource.model.id, resource.name, after), column < _column_time(column, until))
+            .order_by(column, resource.model.id)
+            .limit(limit + 1)
+        )
+        if resource.options:
+            stmt = stmt.options(*resource.options)
+        for obj in (await db.scalars(stmt)).all():
+            changes.append((_aware_time(getattr(obj, column.key)), resource.name, obj.id, obj))
+
+    tombstone = models.DeletedRecord
+    stmt = (
+        select(tombstone)
+        .where(
+            tombstone.table_name.in_([resource.name for resource in resources]),
+            _after_position(tombstone.deleted_at, tombstone.id, CHANGE_SOURCE_DELETED, after),
+            tombstone.deleted_at < until,
+        )
+        .order_by(tombstone.deleted_at, tombstone.id)
+        .limit(limit + 1)
+    )
+    for record in (await db.scalars(stmt)).all():
+        changes.append((record.deleted_at, CHANGE_SOURCE_DELETED, record.id, record))
+
+    changes.sort(key=lambda change: change[:3])
+    return changes[:limit], len(changes) > limit
+
+
+# ===================================================================
+# 地圖圖磚（/tiles）
+# ===================================================================
+
+# 圖層：places 與各設施資料表（poi_locations 的 kind）
+TILE_LAYERS = ("places", *POI_MODELS)
+
+TILE_PLACES_SQL = (
+    "SELECT 'places' AS layer, id, name, status, type, coordinates::text AS geometry, @@ geo_box AS center "
+    "FROM places WHERE geo_box && box(point(:min_lng, :min_lat), point(:max_lng, :max_lat))"
+)
+TILE_POI_SQL = (
+    "SELECT kind AS layer, record_id AS id, name, status, NULL AS type, coordinates::text AS geometry, @@ geo_box AS center "
+    "FROM poi_locations WHERE geo_box && box(point(:min_lng, :min_lat), point(:max_lng, :max_lat)) "
+    "AND kind = ANY(:kinds)"
+)
+
+
+def _tile_bounds(bbox: tuple) -> dict:
+    return dict(zip(("min_lng", "min_lat", "max_lng", "max_lat"), bbox))
+
+
+async def tile_freshness_async(db: AsyncSession, bbox: tuple, layers: Sequence[str]) -> tuple:
+    """圖磚內各圖層資料的 (max(updated_at), 筆數)，作為圖磚快取與 ETag 的版本"""
+    freshness = ()
+    if "places" in layers:
+        stmt = select(models.Place).where(geo.intersects(models.Place.geo_box, bbox))
+        freshness += await collection_freshness_async(db, models.Place, statement=stmt)
+    kinds = [layer for layer in layers if layer in POI_MODELS]
+    if kinds:
+        stmt = select(models.PoiLocation).where(
+            models.PoiLocation.kind.in_(kinds), geo.intersects(models.PoiLocation.geo_box, bbox)
+        )
+        freshness += await collection_freshness_async(db, models.PoiLocation, statement=stmt)
+    return freshness
+
+
+def _tile_geometry(geometry: dict) -> dict:
+    # 設施資料表的座標為 {lat, lng}，轉為 GeoJSON Point
+    if "type" not in geometry and "lat" in geometry and "lng" in geometry:
+        return {"type": "Point", "coordinates": [geometry["lng"], geometry["lat"]]}
+    return geometry
+
+
+async def get_tile_features_async(
+    db: AsyncSession, bbox: tuple, layers: Sequence[str], grid: Optional[int] = None
+) -> List[dict]:
+    """
+    取得與圖磚相交的資料，回傳 GeoJSON Feature 列表。
+    grid 不為 None 時，依資料中心點所在的 grid x grid 格合併：多筆的格子回傳聚合點（cluster、point_count），
+    只有一筆的格子仍回傳該筆資料。
+    """
+    sources = []
+    params = _tile_bounds(bbox)
+    if "places" in layers:
+        sources.append(TILE_PLACES_SQL)
+    kinds = [layer for layer in layers if layer in POI_MODELS]
+    if kinds:
+        sources.append(TILE_POI_SQL)
+        params["kinds"] = kinds
+    if not sources:
+        return []
+    features_sql = " UNION ALL ".join(sources)
+
+    if grid is None:
+        stmt = text(
+            "SELECT 1 AS point_count, center[0] AS lng, center[1] AS lat, layer, id, name, status, type, geometry "
+            f"FROM ({features_sql}) AS features ORDER BY layer, id"
+        )
+    else:
+        stmt = text(
+            "SELECT count(*) AS point_count, avg(center[0]) AS lng, avg(center[1]) AS lat, "
+            "min(layer) AS layer, min(id) AS id, min(name) AS name, min(status) AS status, min(type) AS type, "
+            "min(geometry) AS geometry "
+            f"FROM ({features_sql}) AS features "
+            "GROUP BY floor((center[0] - :min_lng) / :cell_lng), floor((center[1] - :min_lat) / :cell_lat)"
+        )
+        params["cell_lng"] = (bbox[2] - bbox[0]) / grid
+        params["cell_lat"] = (bbox[3] - bbox[1]) / grid
+
+    features = []
+    for row in (await db.execute(stmt, params)).mappings():
+        if row["point_count"] > 1:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [row["lng"], row["lat"]]},
+                "properties": {"cluster": True, "point_count": row["point_count"]},
+            })
+            continue
+        properties = {"layer": row["layer"], "id": row["id"], "name": row["name"], "status": row["status"]}
+        if row["type"] is not None:
+            properties["type"] = row["type"]
+        features.append({
+            "type": "Feature",
+            "geometry": _tile_geometry(json.loads(row["geometry"])),
+            "properties": properties,
+        })
+    return features
+
+
 # =====================
 # for supply
 # =====================
@@ -161,15 +788,16 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
 
         # 設置必填的時間欄位（Supply 使用 DateTime 存儲時間）
         now = datetime.now(timezone.utc)
+        # supplies 以空集合初始化：物資項目經由關聯加入，commit 時一併寫入，回傳時也不需再查詢
         db_supply = models.Supply(
             **supply_data,
             valid_pin=generate_pin(),
             spam_warn=False,
             created_at=now,
-            updated_at=now
+            updated_at=now,
+            supplies=[],
         )
         db.add(db_supply)
-        db.flush()  # 先拿到 db_supply.id 供 item 關聯
 
         # 2) 若有 supplies（單一物件），建立一筆物資
         item_in: Optional[object] = getattr(obj_in, "supplies", None)
@@ -197,20 +825,23 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
 
             # 建立單一 SupplyItem
             db_item = models.SupplyItem(
-                supply_id=db_supply.id,
                 total_number=total_number,
                 tag=item_data.get("tag"),
                 name=item_data.get("name"),
                 received_count=received_count,
                 unit=item_data.get("unit"),
             )
-            db.add(db_item)
-
-        # 3) 提交交易
-        db.commit()
-
-        # 4) 重新載入，帶出關聯
-        db.refresh(db_supply)
+            db_supply.supplies.append(db_item)
+
+        # 3) 提交交易（INSERT 以 RETURNING 取回 server default，expire_on_commit=False，不需 refresh）
+        commit_changes(db, models.Supply, models.SupplyItem)
+        # 項目計數由觸發器寫入；新建的供應單只有這些項目，直接以相同規則計算，不需再查詢
+        set_committed_value(db_supply, "item_count", len(db_supply.supplies))
+        set_committed_value(
+            db_supply,
+            "open_item_count",
+            sum(1 for item in db_supply.supplies if (item.received_count or 0) < item.total_number),
+        )
         return db_supply
 
     except IntegrityError as e:
@@ -233,6 +864,62 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
         raise HTTPException(status_code=500, detail=f"建立供應單時發生未預期錯誤: {str(e)}")
 
 
+def increment_received_counts(db: Session, supply_id: str, item_counts: Dict[str, int]) -> List[dict]:
+    """
+    以單一 UPDATE ... FROM (VALUES ...) RETURNING 累加 received_count，在目前交易中執行（不 commit）。
+    - 條件 received_count + inc <= total_number 在 UPDATE 內判斷：並行請求不會互相覆蓋，也不會超出總量，
+      不需 SELECT ... FOR UPDATE 先鎖定再計算
+    - received_count 為 NULL 時視為 0
+    - 父層 Supply 的 updated_at 由 supply_items 的觸發器一併更新
+    - 依 item_counts 順序回傳每筆結果 {id, status, received_count, total_number}，status 為
+      updated（已累加，received_count 為累加後數量）、rejected（超出 total_number）、not_found（不存在或不屬於此供應單）
+    """
+    items = SupplyItem.__table__
+    increments = select(
+        values(column("id", String), column("inc", Integer), name="v").data(list(item_counts.items()))
+    ).cte("increments")
+    updated = (
+        sa_update(items)
+        .where(
+            items.c.id == increments.c.id,
+            items.c.supply_id == supply_id,
+            func.coalesce(items.c.received_count, 0) + increments.c.inc <= items.c.total_number,
+        )
+        .values(received_count=func.coalesce(items.c.received_count, 0) + increments.c.inc, updated_at=func.now())
+        .returning(items.c.id, items.c.received_count)
+        .cte("updated")
+    )
+    stmt = (
+        select(
+            increments.c.id,
+            updated.c.received_count.label("updated_count"),
+            items.c.id.is_not(None).label("found"),
+            items.c.received_count,
+            items.c.total_number,
+        )
+        .select_from(
+            increments.outerjoin(updated, updated.c.id == increments.c.id).outerjoin(
+                items, and_(items.c.id == increments.c.id, items.c.supply_id == supply_id)
+            )
+        )
+    )
+    rows = {row.id: row for row in db.execute(stmt)}
+
+    results = []
+    for item_id in item_counts:
+        row = rows[item_id]
+        if row.updated_count is not None:
+            status_, received_count = "updated", row.updated_count
+        elif row.found:
+            status_, received_count = "rejected", row.received_count
+        else:
+            status_, received_count = "not_found", None
+        results.append(
+            {"id": item_id, "status": status_, "received_count": received_count, "total_number": row.total_number}
+        )
+    return results
+
+
 def distribute_items(db: Session, supply_id: str, items_to_distribute: List[SupplyItemDistribution]) -> Optional[List[models.SupplyItem]]:
     """
     批次更新指定 supply_id 底下多筆 SupplyItem 的 received_count。
@@ -240,71 +927,42 @@ def distribute_items(db: Session, supply_id: str, items_to_distribute: List[Supp
     整個交易會被回滾以確保資料一致性。
     """
     try:
-        item_ids_to_update = {item.id for item in items_to_distribute}
-        if not item_ids_to_update:
+        item_counts: Dict[str, int] = {}
+        for item in items_to_distribute:
+            if item.count is None or item.count < 0:
+                return None
+            item_counts[str(item.id)] = item_counts.get(str(item.id), 0) + item.count
+        if not item_counts:
             return []
 
-        db_items = (
-            db.query(models.SupplyItem)
-            .filter(
-                models.SupplyItem.supply_id == supply_id,
-                models.SupplyItem.id.in_(item_ids_to_update),
-            )
-            .with_for_update()
-            .all()
-        )
-
-        if len(db_items) != len(item_ids_to_update):
+        results = increment_received_counts(db, supply_id, item_counts)
+        if any(result["status"] != "updated" for result in results):
             db.rollback()
             return None
 
-        items_map = {str(item.id): item for item in db_items}
-
-        for item_update_request in items_to_distribute:
-            db_item = items_map.get(str(item_update_request.id))
-            if not db_item:
-                db.rollback()
-                return None
-
-            current_received = db_item.received_count or 0
-
-            if item_update_request.count is None or item_update_request.count < 0:
-                db.rollback()
-                return None
-
-            new_received_count = current_received + item_update_request.count
-
-            if new_received_count > db_item.total_number:
-                db.rollback()
-                return None
-
-            db_item.received_count = new_received_count
-
-        db.commit()
-        return db_items
+        commit_changes(db, models.SupplyItem, models.Supply)
+        return list(db.scalars(select(models.SupplyItem).where(models.SupplyItem.id.in_(item_counts))).all())
 
     except SQLAlchemyError:
         db.rollback()
         return None
 
 
+# 供應單狀態：open 為仍有物資未到齊，fulfilled 為全部到齊（或沒有物資項目）；皆有對應的部分索引
+SUPPLY_STATUS_CONDITIONS = {
+    "open": models.Supply.open_item_count > 0,
+    "fulfilled": models.Supply.open_item_count == 0,
+}
+
+
 def get_full_supply(db: Session, query) -> models.Supply:
-    not_fulfilled_exists = exists().where(
-        and_(
-            models.SupplyItem.supply_id == models.Supply.id,
-            models.SupplyItem.received_count < models.SupplyItem.total_number
-        )
-    )
-    return query.filter(not_fulfilled_exists)
+    """只保留仍有物資未到齊的供應單"""
+    return query.filter(SUPPLY_STATUS_CONDITIONS["open"])
 
 
 def is_completed_supply(supply: models.Supply) -> bool:
     """Check whether the supply is completed"""
-    is_compelete = True
-    for item in supply.supplies:
-        if item.total_number != item.received_count:
-            is_compelete = False
-    return is_compelete
+    return supply.open_item_count == 0
 
 
 def supply_merge_item_counts(data: List[Dict[str, int]]) -> Dict[str, int]:
@@ -337,72 +995,37 @@ def supply_merge_item_counts(data: List[Dict[str, int]]) -> Dict[str, int]:
     return merged
 
 
-def supply_batch_increment_received(db: Session, supply_id: str, item_counts: Dict[str, int]) -> Supply:
+def supply_batch_increment_received(
+    db: Session, supply_id: str, item_counts: Dict[str, int]
+) -> Tuple[Supply, List[dict]]:
     """
-    對指定 supply 的項目批次累加 received_count，並回傳更新後的 Supply
+    對指定 supply 的項目批次累加 received_count，回傳 (更新後的 Supply, 每筆項目的結果)。
+    - 各項目獨立判斷：超出 total_number 或不屬於此供應單的項目不累加（見 increment_received_counts），其餘照常寫入
     """
-    # 取得 supply
-    supply = db.scalar(select(Supply).where(Supply.id == supply_id))
-    if supply is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Supply {supply_id} 不存在"
-        )
-
-    # 檢查要更新的項目 id 列表
-    item_ids = list(item_counts.keys())
-    if len(item_ids) == 0:
+    if len(item_counts) == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="沒有可更新的項目"
         )
 
-    # 查詢該供應單底下的 items
-    items = list(
-        db.scalars(
-            select(SupplyItem).where(
-                SupplyItem.id.in_(item_ids),
-                SupplyItem.supply_id == supply_id
-            )
-        )
-    )
-
-    # 驗證缺漏
-    found_ids = set()
-    for it in items:
-        found_ids.add(it.id)
-    missing_ids = []
-    for iid in item_ids:
-        if iid not in found_ids:
-            missing_ids.append(iid)
-    if len(missing_ids) > 0:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"以下 supply_item_id 未找到或不屬於 Supply {supply_id}: {missing_ids}"
-        )
-
-    # 交易更新（保持簡潔結構）
     try:
-        for it in items:
-            inc = item_counts[it.id]
-            current = it.received_count if it.received_count is not None else 0
-            it.received_count = current + inc
-
-        # 更新父層 Supply 的 updated_at
-        supply.updated_at = datetime.now(timezone.utc)
-
-        db.add_all(items)
-        db.add(supply)
-        db.flush()
-        db.refresh(supply)
-        db.commit()
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception:
+        results = increment_received_counts(db, supply_id, item_counts)
+        if any(result["status"] == "updated" for result in results):
+            commit_changes(db, Supply, SupplyItem)
+        else:
+            db.rollback()
+    except SQLAlchemyError:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="批次更新失敗，請稍後重試"
         )
-    return supply
+
+    # 取得 supply（物資項目一併載入）
+    supply = db.scalar(select(Supply).where(Supply.id == supply_id).options(selectinload(Supply.supplies)))
+    if supply is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Supply {supply_id} 不存在"
+        )
+    return supply, results
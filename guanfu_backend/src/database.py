@@ -1,6 +1,13 @@
-from typing import Generator
+import asyncio
+import os
+import threading
+import time
+from typing import AsyncGenerator, Generator, Optional
 from sqlalchemy import create_engine, URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
 
@@ -12,6 +19,72 @@ DB_NAME = settings.DB_NAME
 INSTANCE_CONNECTION_NAME = settings.INSTANCE_CONNECTION_NAME
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+
+class _WaitTimingMixin:
+    """
+    連線池加上等待時間統計：記錄每次取得連線花費的時間與逾時次數，
+    用來判斷 pool_size / max_overflow 是否足以應付目前的 worker 數與流量。
+    子類別各自定義 _wait_stats，sync 與 async 連線池分開統計。
+    """
+
+    _stats_lock = threading.Lock()
+    _wait_stats: dict
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self._wait_stats["checkouts"] += 1
+                self._wait_stats["wait_seconds_total"] += waited
+                self._wait_stats["wait_seconds_max"] = max(self._wait_stats["wait_seconds_max"], waited)
+
+
+def _new_wait_stats() -> dict:
+    return {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "timeouts": 0}
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    _wait_stats = _new_wait_stats()
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    _wait_stats = _new_wait_stats()
+
+
+def _connect_args() -> dict:
+    """psycopg2 連線參數：application_name 與 statement_timeout"""
+    connect_args = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return connect_args
+
+
+def _async_connect_args() -> dict:
+    """asyncpg 連線參數：同 _connect_args，但以 server_settings 傳遞"""
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    return {"server_settings": server_settings}
+
+
+# 三種連線方式共用的連線池設定
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+ENGINE_OPTIONS = {"poolclass": InstrumentedQueuePool, "connect_args": _connect_args(), **POOL_OPTIONS}
+ASYNC_ENGINE_OPTIONS = {"poolclass": InstrumentedAsyncQueuePool, "connect_args": _async_connect_args(), **POOL_OPTIONS}
+
 # 依環境切換 Engine
 # if ENVIRONMENT in ("dev", "prod"): # We don't use cloudrun now, default in else
 if ENVIRONMENT in ("cloudrun"):
@@ -25,9 +98,7 @@ if ENVIRONMENT in ("cloudrun"):
             database=DB_NAME,
             query={"host": unix_socket_path},  # Postgres 用 host 指向 socket 路徑
         ),
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
+        **ENGINE_OPTIONS,
     )
 else:
     # 本機或一般 TCP：優先使用完整 DATABASE_URL
@@ -42,18 +113,33 @@ else:
                 port=5432,
                 database=DB_NAME,
             ),
-            pool_pre_ping=True,
+            **ENGINE_OPTIONS,
         )
     else:
         engine = create_engine(
             SQLALCHEMY_DATABASE_URL,
-            pool_pre_ping=True,
+            **ENGINE_OPTIONS,
         )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 寫入以 INSERT / UPDATE ... RETURNING 取回欄位值，commit 後不讓物件過期，回傳時不需再 SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 
+
+def _async_url(url: URL) -> URL:
+    """沿用 sync Engine 的連線位置，driver 換成 asyncpg；psycopg2 的 sslmode 轉為 asyncpg 的 ssl"""
+    query = dict(url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+# 讀取量大的列表 / 單筆查詢走 asyncpg + AsyncSession，不佔用 threadpool；寫入仍使用上方 sync Session。
+async_engine = create_async_engine(_async_url(engine.url), **ASYNC_ENGINE_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def init_db():
     # 在這裡導入所有定義了 Base 的 model，這樣它們才會被正確認識
     # 依賴於 Base 的 metadata。
@@ -62,9 +148,95 @@ def init_db():
     Base.metadata.create_all(bind=engine)
 
 
+def run_alembic_upgrade():
+    """執行 alembic upgrade head（alembic.ini 位於專案根目錄）"""
+    from alembic import command
+    from alembic.config import Config
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command.upgrade(Config(os.path.join(root, "alembic.ini")), "head")
+
+
+def init_schema(mode: Optional[str] = None):
+    """
+    依 DB_INIT_ON_STARTUP 初始化資料表：create_all / alembic / none。
+    未指定 mode 時於呼叫當下讀取設定（src.serve 會在啟動 worker 前改為 none）。
+    """
+    if mode is None:
+        mode = settings.DB_INIT_ON_STARTUP
+    if mode == "create_all":
+        init_db()
+    elif mode == "alembic":
+        run_alembic_upgrade()
+
+
+def warm_pool():
+    """
+    預先建立 DB_POOL_SIZE 條 sync 連線後歸還連線池，避免 worker 剛啟動時每個請求都要重新連線。
+    """
+    connections = []
+    try:
+        for _ in range(settings.DB_POOL_SIZE):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def warm_async_pool():
+    """warm_pool 的 async 版本，同時開啟 DB_POOL_SIZE 條 asyncpg 連線"""
+    results = await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(settings.DB_POOL_SIZE)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_stats(pool, pool_class) -> dict:
+    with pool_class._stats_lock:
+        wait = dict(pool_class._wait_stats)
+    checkouts = wait["checkouts"]
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts_total": checkouts,
+        "checkout_timeouts_total": wait["timeouts"],
+        "wait_seconds_total": round(wait["wait_seconds_total"], 6),
+        "wait_seconds_avg": round(wait["wait_seconds_total"] / checkouts, 6) if checkouts else 0.0,
+        "wait_seconds_max": round(wait["wait_seconds_max"], 6),
+    }
+
+
+def pool_stats() -> dict:
+    """
+    回傳 sync 連線池目前狀態（gauge）與累計等待統計，供 /metrics 使用。
+    """
+    return _pool_stats(engine.pool, InstrumentedQueuePool)
+
+
+def async_pool_stats() -> dict:
+    """
+    回傳 async（asyncpg）連線池的狀態，欄位同 pool_stats。
+    """
+    return _pool_stats(async_engine.pool, InstrumentedAsyncQueuePool)
@@ -0,0 +1,92 @@
+"""
+全表匯出（GET /{resource}/export）：以 server-side cursor 分批讀取，串流輸出 NDJSON 或 CSV。
+
+- AsyncSession.stream_scalars + yield_per，每次只從資料庫取 EXPORT_YIELD_PER 筆，記憶體用量與資料表大小無關
+- 欄位與列表相同：以資源的回應 schema 序列化（不含 valid_pin、pii_date），並套用相同的 id 遮罩規則
+- CSV 以 UTF-8 BOM 開頭（Excel 才能正確辨識中文），巢狀欄位（coordinates、supplies 等）輸出為 JSON 字串
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Literal
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse
+
+from . import crud
+from .config import settings
+from .resource_registry import RESOURCES, Resource, serialize
+
+ExportFormat = Literal["ndjson", "csv"]
+
+FORMAT_DESCRIPTION = "ndjson（預設，每行一筆 JSON）或 csv；不分頁，回傳所有符合條件的資料"
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# 累積到此大小才送出一個區塊，避免每筆資料各送一次
+FLUSH_BYTES = 64 * 1024
+
+
+async def _iter_rows(db: AsyncSession, resource: Resource, statement: Select) -> AsyncIterator[dict]:
+    # 依游標分頁的排序鍵輸出，匯出結果順序固定
+    statement = (
+        statement.order_by(None)
+        .order_by(*crud.keyset_columns(resource.model))
+        .execution_options(yield_per=settings.EXPORT_YIELD_PER)
+    )
+    if resource.options:
+        statement = statement.options(*resource.options)
+    async for obj in await db.stream_scalars(statement):
+        yield serialize(resource, obj)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def _iter_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    async for data in rows:
+        buffer.write(json.dumps(data, ensure_ascii=False))
+        buffer.write("\n")
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def _iter_csv(rows: AsyncIterator[dict], fields: list) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    async for data in rows:
+        writer.writerow({key: _csv_value(value) for key, value in data.items()})
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def export_response(db: AsyncSession, name: str, statement: Select, format: ExportFormat) -> StreamingResponse:
+    """
+    串流輸出 statement 查到的所有資料。
+    - name 為 resource_registry 的資源名稱，決定序列化 schema 與 id 遮罩規則
+    - statement 為路由以列表相同條件組出的查詢（不含分頁）；原有排序會被取代
+    """
+    resource = RESOURCES[name]
+    rows = _iter_rows(db, resource, statement)
+    if format == "csv":
+        content = _iter_csv(rows, list(resource.schema.model_fields))
+    else:
+        content = _iter_ndjson(rows)
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
@@ -0,0 +1,110 @@
+"""
+空間查詢工具（未使用 PostGIS）。
+
+座標以 JSONB 保存（GeoJSON Point / Polygon / LineString，或舊資料表的 {lat, lng}），
+以 IMMUTABLE SQL 函式 geo_box(jsonb) 轉成外接矩形（Postgres 內建 box 型別），
+存成 generated column 並建立 GiST 索引，bbox 查詢（&&）與鄰近查詢都可使用索引。
+距離以外接矩形上離查詢點最近的位置計算（haversine，公尺）；點資料即為實際距離。
+"""
+import math
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DDL, func
+from sqlalchemy.types import UserDefinedType
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_M / 360
+
+BBOX_DESCRIPTION = "範圍查詢：minLng,minLat,maxLng,maxLat（WGS84 經緯度），回傳幾何與範圍相交的資料"
+
+GEO_FUNCTIONS = [
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION geo_box(geometry jsonb) RETURNS box
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE
+                WHEN jsonb_typeof(geometry -> 'lng') = 'number' AND jsonb_typeof(geometry -> 'lat') = 'number' THEN
+                    box(point((geometry ->> 'lng')::float8, (geometry ->> 'lat')::float8),
+                        point((geometry ->> 'lng')::float8, (geometry ->> 'lat')::float8))
+                ELSE (
+                    SELECT box(point(min((p ->> 0)::float8), min((p ->> 1)::float8)),
+                               point(max((p ->> 0)::float8), max((p ->> 1)::float8)))
+                    FROM jsonb_path_query(
+                        geometry, 'strict $.coordinates.** ? (@.type() == "array" && @[0].type() == "number")', '{}', true
+                    ) AS p
+                )
+            END
+        $$
+        """
+    ),
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION geo_distance_m(area box, lng float8, lat float8) RETURNS float8
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT 2 * 6371008.8 * asin(sqrt(
+                power(sin(radians(least(greatest(lat, (area[1])[1]), (area[0])[1]) - lat) / 2), 2)
+                + cos(radians(lat)) * cos(radians(least(greatest(lat, (area[1])[1]), (area[0])[1])))
+                  * power(sin(radians(least(greatest(lng, (area[1])[0]), (area[0])[0]) - lng) / 2), 2)
+            ))
+        $$
+        """
+    ),
+]
+
+
+class Box(UserDefinedType):
+    """Postgres box 型別；僅用於索引與查詢條件，不對外輸出"""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "box"
+
+
+def make_box(min_lng: float, min_lat: float, max_lng: float, max_lat: float):
+    return func.box(func.point(min_lng, min_lat), func.point(max_lng, max_lat))
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """解析 minLng,minLat,maxLng,maxLat；格式錯誤回 400"""
+    if bbox is None:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox 格式應為 minLng,minLat,maxLng,maxLat")
+    if not (-180 <= min_lng <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox 超出經緯度範圍，或 min 大於 max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def intersects(column, bbox: Tuple[float, float, float, float]):
+    return column.op("&&")(make_box(*bbox))
+
+
+def radius_bbox(lng: float, lat: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """涵蓋半徑範圍的經緯度矩形，作為距離條件前的索引過濾"""
+    lat_delta = radius_m / METERS_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 89.9)))
+    lng_delta = min(radius_m / (METERS_PER_DEGREE * cos_lat), 180)
+    return (
+        max(lng - lng_delta, -180), max(lat - lat_delta, -90),
+        min(lng + lng_delta, 180), min(lat + lat_delta, 90),
+    )
+
+
+def distance_m(column, lng: float, lat: float):
+    return func.geo_distance_m(column, lng, lat)
+
+
+def tile_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Web Mercator（slippy map）圖磚 z/x/y 的經緯度範圍 (minLng, minLat, maxLng, maxLat)"""
+    n = 2 ** z
+    if not (0 <= x < n and 0 <= y < n):
+        raise HTTPException(status_code=400, detail=f"zoom {z} 的 x、y 需介於 0 到 {n - 1}")
+
+    def tile_lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, tile_lat(y + 1), (x + 1) / n * 360 - 180, tile_lat(y)
@@ -0,0 +1,92 @@
+"""
+HTTP 條件式請求（ETag / If-None-Match、Last-Modified / If-Modified-Since）。
+
+- 列表：以 (資料表的快取世代, query 參數) 產生 weak ETag，符合 If-None-Match 時直接回 304，
+  只需一次主鍵查詢，不執行分頁查詢、計數也不序列化
+- 單筆：以 (id, updated_at) 產生 weak ETag 並附上 Last-Modified，支援 If-None-Match 與 If-Modified-Since
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# 與 schemas.BaseColumn 相同：沒有時區的 datetime 視為 UTC+8
+NAIVE_TIMEZONE = timezone(timedelta(hours=8))
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=NAIVE_TIMEZONE)
+    return value.astimezone(timezone.utc)
+
+
+def _normalized_query(request: Request) -> list:
+    return sorted(request.query_params.multi_items())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 使用弱比較：忽略 W/ 前綴；* 代表任何版本"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """If-Modified-Since（秒為單位）；同時帶 If-None-Match 時以 ETag 為準"""
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None or "if-none-match" in request.headers:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return Response(status_code=304, headers=headers)
+
+
+def collection_not_modified(request: Request, response: Response, freshness: tuple) -> Optional[Response]:
+    """
+    freshness 為 crud.collection_version 的結果 (世代, 更新時間)，或圖磚的 (max(updated_at), 筆數, ...)。
+    設定回應的 ETag；用戶端已有相同版本時回傳 304 Response，否則回傳 None 繼續查詢。
+    """
+    etag = weak_etag(request.url.path, *freshness, _normalized_query(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return None
+
+
+def item_not_modified(request: Request, response: Response, db_obj: Any, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    單筆資源的 ETag / Last-Modified；last_modified 預設取 db_obj 的 updated_at（或 last_updated）。
+    用戶端已有相同版本時回傳 304 Response，否則設定標頭並回傳 None。
+    """
+    if last_modified is None:
+        last_modified = getattr(db_obj, "updated_at", None) or getattr(db_obj, "last_updated", None)
+    if not isinstance(last_modified, datetime):
+        last_modified = None
+    etag = weak_etag(request.url.path, db_obj.id, last_modified)
+    if etag_matches(request, etag) or not_modified_since(request, last_modified):
+        return not_modified(etag, last_modified)
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return None
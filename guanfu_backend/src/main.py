@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
 
@@ -11,21 +13,32 @@ from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 
 from . import database
 from .config import settings
+from .response_cache import ResponseCacheMiddleware
+from .services.http_client import close_http_client, get_http_client
+from .services.line_auth import purge_line_session_states
+from .services.notifications import start_notification_relay, stop_notification_relay
+from .stats import stats_refresh_loop
 from .routers import (
     accommodations,
+    bulk,
+    changes,
     human_resources,
     medical_stations,
     mental_health_resources,
+    metrics,
     places,
+    poi,
     reports,
     requirements_hr,
     requirements_supplies,
     restrooms,
     shelters,
     shower_stations,
+    stats,
     supplies,
     supply_items,
     supply_providers,
+    tiles,
     volunteer_organizations,
     water_refill_stations,
     line,
@@ -37,8 +50,30 @@ from .routers import (
 async def lifespan(app: FastAPI):
     # Startup:
     # Create database tables to prevent "relation does not exist" errors
-    database.init_db()
+    # （由 src.serve 啟動時已在主行程執行過，worker 的 DB_INIT_ON_STARTUP 為 none）
+    database.init_schema()
+    # 先把連線池填滿再接受請求，避免多個 worker 同時啟動時每個請求都在建立連線
+    if settings.DB_POOL_WARMUP:
+        await asyncio.to_thread(database.warm_pool)
+        await database.warm_async_pool()
+    # 清除改為無狀態 OAuth state 之前留下的 line_session_states
+    await asyncio.to_thread(purge_line_session_states)
+    # Discord / LINE 共用的 httpx client 與 Discord 通知 outbox 的 relay
+    get_http_client()
+    start_notification_relay()
+    # /stats 的背景彙總（各 worker 皆啟動，以 advisory lock 確保同時只有一個在執行）
+    stats_task = None
+    if settings.STATS_REFRESH_SECONDS > 0:
+        stats_task = asyncio.create_task(stats_refresh_loop(settings.STATS_REFRESH_SECONDS))
     yield
+    # Shutdown: 停止背景彙總，送完佇列中的通知，關閉 httpx client 與 async 連線池
+    if stats_task is not None:
+        stats_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await stats_task
+    await stop_notification_relay()
+    await close_http_client()
+    await database.async_engine.dispose()
 
 
 # --- 根據環境動態設定 Swagger UI 的伺服器 URL ---
@@ -139,7 +174,13 @@ async def integrity_error_exception_handler(request: Request, exc: IntegrityErro
     )
 
 
+# --- 公開 GET 端點的回應快取 ---
+app.add_middleware(ResponseCacheMiddleware)
+
+
 # --- 包含所有資源的 routers ---
+# /{resource}/bulk 需在各資源的 PATCH /{id} 之前註冊
+app.include_router(bulk.router)
 app.include_router(shelters.router)
 app.include_router(reports.router)
 app.include_router(volunteer_organizations.router)
@@ -148,6 +189,8 @@ app.include_router(human_resources.router)
 app.include_router(medical_stations.router)
 app.include_router(mental_health_resources.router)
 app.include_router(places.router)
+app.include_router(poi.router)
+app.include_router(tiles.router)
 app.include_router(requirements_hr.router)
 app.include_router(requirements_supplies.router)
 app.include_router(restrooms.router)
@@ -157,3 +200,6 @@ app.include_router(supplies.router)
 app.include_router(supply_items.router)
 app.include_router(supply_providers.router)
 app.include_router(line.router)
+app.include_router(changes.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
@@ -1,12 +1,14 @@
 import uuid
 import time
 from sqlalchemy import (
-    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey, text, ARRAY
+    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey, Index, text, ARRAY, Computed, DDL, event
 )
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from .database import Base
+from .geo import GEO_FUNCTIONS, Box
+from .stats import STATS_VIEW_DDL
 
 
 def generate_uuid_str():
@@ -19,6 +21,18 @@ def current_timestamp_int():
     return time.time()
 
 
+# 關鍵字搜尋使用 pg_trgm 的 GIN 索引；create_all 建表前先確保擴充套件存在
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+# 空間查詢的 geo_box generated column 依賴的 SQL 函式（見 geo.py）
+for geo_function in GEO_FUNCTIONS:
+    event.listen(Base.metadata, "before_create", geo_function)
+
+# human_resources.search_text：q_role 搜尋的欄位合併為一個小寫字串（以 \x1f 分隔，避免跨欄位誤判相符）
+HUMAN_RESOURCE_SEARCH_TEXT = (
+    "lower(coalesce(role_name, '') || chr(31) || coalesce(role_type, '') || chr(31) || coalesce(assignment_notes, ''))"
+)
+
+
 # ===================================================================
 # 資料表模型定義
 # ===================================================================
@@ -38,6 +52,10 @@ class VolunteerOrganization(Base):
     notes = Column(Text)
     image_url = Column(String)
 
+    __table_args__ = (
+        Index("idx_volunteer_organizations_last_updated_id", "last_updated", "id"),
+    )
+
 
 class Shelter(Base):
     __tablename__ = "shelters"
@@ -58,6 +76,11 @@ class Shelter(Base):
     coordinates = Column(JSONB)
     opening_hours = Column(String)
 
+    __table_args__ = (
+        Index("idx_shelters_updated_at_id", "updated_at", "id"),
+        Index("idx_shelters_status_updated_at", "status", "updated_at"),
+    )
+
 
 class MedicalStation(Base):
     __tablename__ = "medical_stations"
@@ -81,6 +104,11 @@ class MedicalStation(Base):
     notes = Column(Text)
     link = Column(String)
 
+    __table_args__ = (
+        Index("idx_medical_stations_updated_at_id", "updated_at", "id"),
+        Index("idx_medical_stations_status_updated_at", "status", "updated_at"),
+    )
+
 
 class MentalHealthResource(Base):
     __tablename__ = "mental_health_resources"
@@ -105,6 +133,11 @@ class MentalHealthResource(Base):
     waiting_time = Column(String)
     notes = Column(Text)
 
+    __table_args__ = (
+        Index("idx_mental_health_resources_updated_at_id", "updated_at", "id"),
+        Index("idx_mental_health_resources_status_updated_at", "status", "updated_at"),
+    )
+
 
 class Accommodation(Base):
     __tablename__ = "accommodations"
@@ -129,6 +162,11 @@ class Accommodation(Base):
     facilities = Column(ARRAY(Text), nullable=True)
     distance_to_disaster_area = Column(String)
 
+    __table_args__ = (
+        Index("idx_accommodations_updated_at_id", "updated_at", "id"),
+        Index("idx_accommodations_status_updated_at", "status", "updated_at"),
+    )
+
 
 class ShowerStation(Base):
     __tablename__ = "shower_stations"
@@ -154,6 +192,11 @@ class ShowerStation(Base):
     distance_to_guangfu = Column(String)
     contact_method = Column(String)
 
+    __table_args__ = (
+        Index("idx_shower_stations_updated_at_id", "updated_at", "id"),
+        Index("idx_shower_stations_status_updated_at", "status", "updated_at"),
+    )
+
 
 class WaterRefillStation(Base):
     __tablename__ = "water_refill_stations"
@@ -177,6 +220,11 @@ class WaterRefillStation(Base):
     notes = Column(Text)
     info_source = Column(String)
 
+    __table_args__ = (
+        Index("idx_water_refill_stations_updated_at_id", "updated_at", "id"),
+        Index("idx_water_refill_stations_status_updated_at", "status", "updated_at"),
+    )
+
 
 class Restroom(Base):
     __tablename__ = "restrooms"
@@ -204,6 +252,11 @@ class Restroom(Base):
     notes = Column(Text)
     info_source = Column(String)
 
+    __table_args__ = (
+        Index("idx_restrooms_updated_at_id", "updated_at", "id"),
+        Index("idx_restrooms_status_updated_at", "status", "updated_at"),
+    )
+
 
 class HumanResource(Base):
     __tablename__ = "human_resources"
@@ -234,6 +287,20 @@ class HumanResource(Base):
     assignment_notes = Column(Text)
     pii_date = Column(BigInteger, nullable=False, default=current_timestamp_int)
     valid_pin = Column(String)
+    search_text = Column(Text, Computed(HUMAN_RESOURCE_SEARCH_TEXT, persisted=True))
+
+    __table_args__ = (
+        Index("idx_human_resources_updated_at_id", "updated_at", "id"),
+        Index("idx_human_resources_status_created_at", "status", "created_at"),
+        Index("idx_human_resources_role_status_created_at", "role_status", "created_at"),
+        Index("idx_human_resources_role_type_created_at", "role_type", "created_at"),
+        Index(
+            "idx_human_resources_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+    )
 
 
 class Supply(Base):
@@ -249,6 +316,16 @@ class Supply(Base):
     pii_date = Column(BigInteger, nullable=False, default=current_timestamp_int)
     valid_pin = Column(String)
     spam_warn = Column(Boolean)
+    # 物資項目數與尚未到齊（received_count < total_number）的項目數，由 supply_items 的觸發器在同一交易中維護
+    item_count = Column(Integer, nullable=False, server_default="0")
+    open_item_count = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("idx_supplies_updated_at_id", "updated_at", "id"),
+        # GET /supplies?status=open|fulfilled 依 updated_at 排序分頁
+        Index("idx_supplies_open_updated_at_id", "updated_at", "id", postgresql_where=text("open_item_count > 0")),
+        Index("idx_supplies_fulfilled_updated_at_id", "updated_at", "id", postgresql_where=text("open_item_count = 0")),
+    )
 
 
 class SupplyItem(Base):
@@ -260,8 +337,67 @@ class SupplyItem(Base):
     name = Column(String)
     received_count = Column(Integer)
     unit = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
     supply = relationship("Supply", back_populates="supplies")
 
+    __table_args__ = (
+        Index("idx_supply_items_updated_at_id", "updated_at", "id"),
+        Index("idx_supply_items_supply_id", "supply_id"),
+    )
+
+
+# supply_items 新增、刪除，或 supply_id / total_number / received_count 變動時，
+# 以增減量更新 supplies.item_count / open_item_count（並行交易各自加減，不會互相覆蓋）；
+# 任何異動都會一併更新父層 supplies.updated_at，內嵌物資項目的列表只需以 supplies 判斷版本
+SUPPLY_ITEM_COUNT_DDL = [
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION supply_items_maintain_counts() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            old_open int := 0;
+            new_open int := 0;
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                old_open := (COALESCE(OLD.received_count, 0) < OLD.total_number)::int;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                new_open := (COALESCE(NEW.received_count, 0) < NEW.total_number)::int;
+            END IF;
+
+            IF TG_OP = 'UPDATE' AND OLD.supply_id = NEW.supply_id THEN
+                UPDATE supplies SET open_item_count = open_item_count + new_open - old_open, updated_at = now()
+                WHERE id = NEW.supply_id;
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE supplies
+                SET item_count = item_count - 1, open_item_count = open_item_count - old_open, updated_at = now()
+                WHERE id = OLD.supply_id;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                UPDATE supplies
+                SET item_count = item_count + 1, open_item_count = open_item_count + new_open, updated_at = now()
+                WHERE id = NEW.supply_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ),
+    DDL(
+        "CREATE OR REPLACE TRIGGER supply_items_counts_insert_delete AFTER INSERT OR DELETE ON supply_items "
+        "FOR EACH ROW EXECUTE FUNCTION supply_items_maintain_counts()"
+    ),
+    DDL(
+        "CREATE OR REPLACE TRIGGER supply_items_counts_update AFTER UPDATE ON supply_items "
+        "FOR EACH ROW EXECUTE FUNCTION supply_items_maintain_counts()"
+    ),
+]
+for supply_item_ddl in SUPPLY_ITEM_COUNT_DDL:
+    event.listen(SupplyItem.__table__, "after_create", supply_item_ddl)
+
 
 class Report(Base):
     __tablename__ = "reports"
@@ -275,6 +411,11 @@ class Report(Base):
     notes = Column(Text)
     status = Column(String, nullable=False)
 
+    __table_args__ = (
+        Index("idx_reports_updated_at_id", "updated_at", "id"),
+        Index("idx_reports_status_updated_at", "status", "updated_at"),
+    )
+
 
 class SupplyProvider(Base):
     __tablename__ = "supply_providers"
@@ -289,6 +430,11 @@ class SupplyProvider(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
 
+    __table_args__ = (
+        Index("idx_supply_providers_updated_at_id", "updated_at", "id"),
+        Index("idx_supply_providers_supply_item_id", "supply_item_id"),
+    )
+
 
 class LineUser(Base):
     __tablename__ = "line_users"
@@ -308,6 +454,9 @@ class LineUser(Base):
     refresh_token = Column(Text)
     id_token = Column(Text)
     token_expires_at = Column(DateTime)
+    # token 的 SHA-256（hex），verify_user_token 以此查詢（見 services/line_auth.hash_token）
+    access_token_hash = Column(String(64), index=True)
+    id_token_hash = Column(String(64), index=True)
 
     # 管理欄位
     channel_id = Column(String)
@@ -316,6 +465,10 @@ class LineUser(Base):
 
 
 class LineSessionState(Base):
+    """
+    DEPRECATED: OAuth state 改為加密的 token（見 services/line_auth.encode_state），不再寫入；
+    僅供改版前發出的授權請求完成登入，啟動時清除已使用或過期的資料。
+    """
     __tablename__ = "line_session_states"
     id = Column(String, primary_key=True, default=generate_uuid_str)
     state = Column(String, unique=True, index=True)
@@ -350,6 +503,15 @@ class Place(Base):
     notes = Column(Text, server_default="")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+    # coordinates 的外接矩形，供 bbox / nearby 查詢使用 GiST 索引；不對外輸出，預設不載入
+    geo_box = deferred(Column(Box, Computed("geo_box(coordinates)", persisted=True)))
+
+    __table_args__ = (
+        Index("idx_places_updated_at_id", "updated_at", "id"),
+        Index("idx_places_type_status_updated_at", "type", "status", "updated_at"),
+        Index("idx_places_status_updated_at", "status", "updated_at"),
+        Index("idx_places_geo_box", "geo_box", postgresql_using="gist"),
+    )
 
 
 class RequirementsHr(Base):
@@ -364,6 +526,11 @@ class RequirementsHr(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
 
+    __table_args__ = (
+        Index("idx_requirements_hr_updated_at_id", "updated_at", "id"),
+        Index("idx_requirements_hr_place_id_updated_at", "place_id", "updated_at"),
+    )
+
 
 class RequirementsSupplies(Base):
     __tablename__ = "requirements_supplies"
@@ -376,3 +543,75 @@ class RequirementsSupplies(Base):
     received_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_requirements_supplies_updated_at_id", "updated_at", "id"),
+        Index("idx_requirements_supplies_place_id_updated_at", "place_id", "updated_at"),
+    )
+
+
+class CacheGeneration(Base):
+    """
+    各資料表的快取世代：寫入時與資料在同一個交易中 +1，
+    讓多個 worker 的行程內快取都能判斷自己手上的回應是否過期。
+    """
+    __tablename__ = "cache_generations"
+    name = Column(String, primary_key=True)  # 資料表名稱
+    generation = Column(BigInteger, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+
+
+class PoiLocation(Base):
+    """
+    跨資料表的設施位置索引（避難所、醫療站、心理資源、住宿、洗澡、加水、廁所）：
+    crud.create / update / delete 與來源資料在同一個交易中同步，供 /poi/nearby 以單一 GiST 索引查詢。
+    """
+    __tablename__ = "poi_locations"
+    kind = Column(String, primary_key=True)  # 來源資料表名稱
+    record_id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    coordinates = Column(JSONB, nullable=False)
+    geo_box = deferred(Column(Box, Computed("geo_box(coordinates)", persisted=True)))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+
+    __table_args__ = (Index("idx_poi_locations_geo_box", "geo_box", postgresql_using="gist"),)
+
+
+class DeletedRecord(Base):
+    """
+    刪除紀錄（tombstone）：crud.delete 與刪除在同一個交易中寫入，
+    讓 /changes 的同步端得知資料已被移除。
+    """
+    __tablename__ = "deleted_records"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    record_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (Index("idx_deleted_records_deleted_at_id", "deleted_at", "id"),)
+
+
+class NotificationOutbox(Base):
+    """
+    待發送的 Discord 通知（transactional outbox）：與建立的資料在同一個交易中寫入，
+    背景 relay 以 FOR UPDATE SKIP LOCKED 認領並發送，成功後刪除（見 services/notifications.py）。
+    """
+    __tablename__ = "notification_outbox"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    content = Column(Text, nullable=False)
+    embed_data = Column(JSONB)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))  # 重試延後到此時間
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
+    failed_at = Column(DateTime(timezone=True))  # 放棄發送的時間；保留資料供查詢，不再認領
+    last_error = Column(Text)
+
+    __table_args__ = (
+        Index("idx_notification_outbox_pending", "available_at", "id", postgresql_where=text("failed_at IS NULL")),
+    )
+
+
+# /stats 的 materialized view 依賴多張資料表，於 create_all 建立所有資料表之後建立（見 stats.py）
+for stats_ddl in STATS_VIEW_DDL:
+    event.listen(Base.metadata, "after_create", stats_ddl)
@@ -0,0 +1,61 @@
+"""
+公開資源登錄表：資源名稱（= 資料表名稱 = 路由前綴）對應 ORM model 與回應 schema。
+供跨資料表的功能（例如 /changes）共用；LINE 登入相關資料表含 token，不列入。
+"""
+from typing import Dict, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import selectinload
+
+from . import models, schemas
+
+
+class Resource(NamedTuple):
+    name: str
+    model: Type[models.Base]
+    schema: Type[BaseModel]
+    options: tuple = ()  # AsyncSession 需預先載入的關聯
+    mask_id_when: Optional[Tuple[str, str]] = None  # 與列表相同的 id 遮罩規則 (欄位, 值)
+
+
+RESOURCES: Dict[str, Resource] = {
+    resource.name: resource
+    for resource in (
+        Resource("accommodations", models.Accommodation, schemas.Accommodation),
+        Resource("human_resources", models.HumanResource, schemas.HumanResource, mask_id_when=("status", "completed")),
+        Resource("medical_stations", models.MedicalStation, schemas.MedicalStation),
+        Resource("mental_health_resources", models.MentalHealthResource, schemas.MentalHealthResource),
+        Resource("places", models.Place, schemas.Place),
+        Resource("reports", models.Report, schemas.Report),
+        Resource("requirements_hr", models.RequirementsHr, schemas.RequirementsHr),
+        Resource("requirements_supplies", models.RequirementsSupplies, schemas.RequirementsSupplies),
+        Resource("restrooms", models.Restroom, schemas.Restroom),
+        Resource("shelters", models.Shelter, schemas.Shelter),
+        Resource("shower_stations", models.ShowerStation, schemas.ShowerStation),
+        Resource("supplies", models.Supply, schemas.Supply, options=(selectinload(models.Supply.supplies),)),
+        Resource("supply_items", models.SupplyItem, schemas.SupplyItem),
+        Resource("supply_providers", models.SupplyProvider, schemas.SupplyProvider),
+        Resource("volunteer_organizations", models.VolunteerOrganization, schemas.VolunteerOrganization),
+        Resource("water_refill_stations", models.WaterRefillStation, schemas.WaterRefillStation),
+    )
+}
+
+
+def get_resource(name: str) -> Optional[Resource]:
+    return RESOURCES.get(name)
+
+
+def is_masked(resource: Resource, obj) -> bool:
+    """資料列是否符合列表的 id 遮罩規則（例如已完成的人力需求）"""
+    if resource.mask_id_when is None:
+        return False
+    field, value = resource.mask_id_when
+    return getattr(obj, field, None) == value
+
+
+def serialize(resource: Resource, obj) -> dict:
+    """以回應 schema 序列化（不含 valid_pin 等未公開欄位），並套用列表的 id 遮罩規則"""
+    data = resource.schema.model_validate(obj).model_dump(mode="json")
+    if is_masked(resource, obj):
+        data["id"] = ""
+    return data
@@ -0,0 +1,147 @@
+"""
+公開 GET 端點的行程內回應快取（ASGI middleware）。
+
+- 以「路徑 + 排序後的 query 參數」為 key，保存序列化後的 JSON bytes，命中時直接回傳，不查詢也不經過 Pydantic
+- TTL + LRU（TTLCache），單筆回應超過 RESPONSE_CACHE_MAX_BODY_BYTES 不快取
+- 命中時若 If-None-Match 與快取回應的 ETag 相同，直接回 304
+- 多 worker 一致性：每張資料表在 cache_generations 有一個世代值，crud.commit_changes 在同一個交易中 +1；
+  讀取時先取目前世代（單一主鍵查詢），與快取項目記錄的世代不同即視為過期
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.requests import Request
+
+from .cache import TTLCache
+from .config import settings
+from .database import async_engine
+from .http_cache import etag_matches
+from .models import CacheGeneration
+
+# 路徑前綴 -> 回應內容所依賴的資料表
+CACHEABLE_PATHS: Dict[str, Tuple[str, ...]] = {
+    "/accommodations": ("accommodations",),
+    "/human_resources": ("human_resources",),
+    "/medical_stations": ("medical_stations",),
+    "/mental_health_resources": ("mental_health_resources",),
+    "/places": ("places",),
+    "/poi": ("poi_locations",),
+    "/reports": ("reports",),
+    "/requirements_hr": ("requirements_hr",),
+    "/requirements_supplies": ("requirements_supplies",),
+    "/restrooms": ("restrooms",),
+    "/shelters": ("shelters",),
+    "/shower_stations": ("shower_stations",),
+    "/supplies": ("supplies", "supply_items"),
+    "/supply_items": ("supply_items",),
+    "/supply_providers": ("supply_providers",),
+    "/volunteer_organizations": ("volunteer_organizations",),
+    "/water_refill_stations": ("water_refill_stations",),
+}
+
+response_cache = TTLCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+cache_stats = {"hits": 0, "misses": 0, "stale": 0, "uncacheable": 0, "errors": 0}
+
+
+def resource_prefix(path: str) -> Optional[str]:
+    prefix = "/" + path.strip("/").split("/", 1)[0]
+    return prefix if prefix in CACHEABLE_PATHS else None
+
+
+def normalize_query(query_string: bytes) -> str:
+    """query 參數排序後重新編碼，?a=1&b=2 與 ?b=2&a=1 共用同一筆快取"""
+    return urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+
+
+def invalidate_tables(table_names: Iterable[str]) -> None:
+    """移除依賴這些資料表的快取項目（本 worker）；其他 worker 透過世代值得知過期"""
+    changed = set(table_names)
+    for prefix, tables in CACHEABLE_PATHS.items():
+        if changed.intersection(tables):
+            response_cache.invalidate(prefix)
+
+
+async def current_generations(tables: Tuple[str, ...]) -> Tuple[int, ...]:
+    async with async_engine.connect() as conn:
+        rows = await conn.execute(
+            select(CacheGeneration.name, CacheGeneration.generation).where(CacheGeneration.name.in_(tables))
+        )
+        generations = dict(rows.all())
+    return tuple(generations.get(table, 0) for table in tables)
+
+
+def response_cache_stats() -> dict:
+    return {**cache_stats, "entries": len(response_cache)}
+
+
+class ResponseCacheMiddleware:
+    """
+    只處理 CACHEABLE_PATHS 底下的 GET 請求，只快取 200 的 JSON 回應。
+    世代值在執行路由之前取得：若期間有寫入，快取項目會帶著較舊的世代，下一次讀取自然失效。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        prefix = resource_prefix(scope["path"])
+        if prefix is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            generations = await current_generations(CACHEABLE_PATHS[prefix])
+        except SQLAlchemyError:
+            cache_stats["errors"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], normalize_query(scope.get("query_string", b"")))
+        entry = response_cache.get(prefix, key)
+        if entry is not None:
+            cached_generations, headers, body = entry
+            if cached_generations == generations:
+                cache_stats["hits"] += 1
+                etag = dict(headers).get(b"etag")
+                if etag is not None and etag_matches(Request(scope), etag.decode("latin-1")):
+                    await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag), (b"x-cache", b"HIT")]})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send({"type": "http.response.start", "status": 200, "headers": [*headers, (b"x-cache", b"HIT")]})
+                await send({"type": "http.response.body", "body": body})
+                return
+            cache_stats["stale"] += 1
+        cache_stats["misses"] += 1
+
+        response = {"status": None, "headers": [], "chunks": [], "size": 0, "cacheable": True}
+
+        async def send_and_capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+                content_type = dict(response["headers"]).get(b"content-type", b"")
+                response["cacheable"] = message["status"] == 200 and content_type.startswith(b"application/json")
+                message = {**message, "headers": [*response["headers"], (b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and response["cacheable"]:
+                body = message.get("body", b"")
+                response["size"] += len(body)
+                if response["size"] > settings.RESPONSE_CACHE_MAX_BODY_BYTES:
+                    response["cacheable"] = False
+                    response["chunks"] = []
+                else:
+                    response["chunks"].append(body)
+                if not message.get("more_body", False) and response["cacheable"]:
+                    response_cache.set(prefix, key, (generations, response["headers"], b"".join(response["chunks"])))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+        if not response["cacheable"]:
+            cache_stats["uncacheable"] += 1
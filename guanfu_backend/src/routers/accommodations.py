@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import AccommodationVacancyEnum, AccommodationStatusEnum
 
@@ -16,11 +19,14 @@ router = APIRouter(
 @router.get("", response_model=schemas.AccommodationCollection, summary="取得庇護所清單")
 def list_accommodations(
         request: Request,
+        response: Response,
         status: Optional[AccommodationStatusEnum] = Query(None),
         township: Optional[str] = Query(None),
         has_vacancy: Optional[AccommodationVacancyEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -31,10 +37,34 @@ def list_accommodations(
         "township": township,
         "has_vacancy": has_vacancy,
     }
-    accommodations = crud.get_multi(db, models.Accommodation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Accommodation, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": accommodations, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.Accommodation)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    accommodations = crud.get_multi(db, models.Accommodation, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.Accommodation, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=accommodations)
+    return {"member": accommodations, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出住宿資源（NDJSON / CSV）")
+async def export_accommodations(
+        status: Optional[AccommodationStatusEnum] = Query(None),
+        township: Optional[str] = Query(None),
+        has_vacancy: Optional[AccommodationVacancyEnum] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的住宿資源（串流輸出，過濾條件與列表相同）
+    """
+    filters = {
+        "status": status,
+        "township": township,
+        "has_vacancy": has_vacancy,
+    }
+    statement = crud.build_list_statement(models.Accommodation, limit=None, **filters)
+    return export.export_response(db, "accommodations", statement, format)
 
 
 @router.post("", response_model=schemas.Accommodation, status_code=201, summary="建立庇護所")
@@ -48,13 +78,16 @@ def create_accommodation(
 
 
 @router.get("/{id}", response_model=schemas.Accommodation, summary="取得特定庇護所")
-def get_accommodation(id: str, db: Session = Depends(get_db)):
+def get_accommodation(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一住宿資源
     """
     db_accommodation = crud.get_by_id(db, models.Accommodation, id)
     if db_accommodation is None:
         raise HTTPException(status_code=404, detail="Accommodation not found")
+    not_modified = http_cache.item_not_modified(request, response, db_accommodation)
+    if not_modified is not None:
+        return not_modified
     return db_accommodation
 
 
@@ -0,0 +1,324 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Security
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .. import crud, models, schemas
+from ..api_key import require_modify_api_key
+from ..config import settings
+from ..database import get_db
+from ..enum_serializer import normalize_payload_dict
+from ..pin_related import generate_pin
+from . import human_resources
+
+# 路徑與各資源的 PATCH /{id} 重疊，main.py 需在各資源 router 之前 include
+router = APIRouter(
+    tags=["批次寫入（Bulk）"],
+    dependencies=[Security(require_modify_api_key)],
+)
+
+
+class BulkResource(NamedTuple):
+    model: Type[models.Base]
+    create_schema: Type[BaseModel]
+    patch_schema: Type[BaseModel]
+    references: Tuple[Tuple[str, Type[models.Base]], ...] = ()  # (欄位, 參照的 model)，寫入前確認存在
+    create_defaults: Optional[Callable[[], dict]] = None  # 每筆建立時額外帶入的欄位
+    validate_create: Optional[Callable[[Any], None]] = None  # 與單筆 API 相同的檢核，失敗時 raise HTTPException
+    validate_patch: Optional[Callable[[Any, Any], None]] = None
+
+
+# 建立邏輯與單筆 API 相同、可直接寫入的資源；supplies（含物資項目）、supply_items（PIN）、
+# supply_providers（LINE 登入）有額外流程，不提供批次寫入
+BULK_RESOURCES: Dict[str, BulkResource] = {
+    resource.model.__tablename__: resource
+    for resource in (
+        BulkResource(models.Accommodation, schemas.AccommodationCreate, schemas.AccommodationPatch),
+        BulkResource(
+            models.HumanResource,
+            schemas.HumanResourceCreate,
+            schemas.HumanResourcePatch,
+            create_defaults=lambda: {"valid_pin": generate_pin()},
+            validate_create=human_resources.validate_create,
+            validate_patch=human_resources.validate_patch,
+        ),
+        BulkResource(models.MedicalStation, schemas.MedicalStationCreate, schemas.MedicalStationPatch),
+        BulkResource(models.MentalHealthResource, schemas.MentalHealthResourceCreate, schemas.MentalHealthResourcePatch),
+        BulkResource(models.Place, schemas.PlaceCreate, schemas.PlacePatch),
+        BulkResource(models.Report, schemas.ReportCreate, schemas.ReportPatch),
+        BulkResource(
+            models.RequirementsHr, schemas.RequirementsHrCreate, schemas.RequirementsHrPatch,
+            references=(("place_id", models.Place),),
+        ),
+        BulkResource(
+            models.RequirementsSupplies, schemas.RequirementsSuppliesCreate, schemas.RequirementsSuppliesPatch,
+            references=(("place_id", models.Place),),
+        ),
+        BulkResource(models.Restroom, schemas.RestroomCreate, schemas.RestroomPatch),
+        BulkResource(models.Shelter, schemas.ShelterCreate, schemas.ShelterPatch),
+        BulkResource(models.ShowerStation, schemas.ShowerStationCreate, schemas.ShowerStationPatch),
+        BulkResource(models.VolunteerOrganization, schemas.VolunteerOrgCreate, schemas.VolunteerOrgPatch),
+        BulkResource(models.WaterRefillStation, schemas.WaterRefillStationCreate, schemas.WaterRefillStationPatch),
+    )
+}
+
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "description": "JSON 陣列，或 Content-Type: application/x-ndjson（每行一筆 JSON 物件）",
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+def _row_result(index: int, status_code: int, id: Optional[str] = None, error: Any = None) -> dict:
+    return {"index": index, "id": id, "status": status_code, "error": error}
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return exc
+
+
+async def _iter_records(request: Request) -> AsyncIterator[Any]:
+    """逐筆讀出請求內容；NDJSON 邊接收邊解析，不需等整個請求送完"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if buffer.strip():
+            yield _parse_line(buffer)
+        return
+
+    try:
+        records = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    for record in records:
+        yield record
+
+
+async def _aenumerate(records: AsyncIterator[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    index = 0
+    async for record in records:
+        yield index, record
+        index += 1
+
+
+def _parse_record(record: Any, index: int, schema: Type[BaseModel], results: dict) -> Optional[BaseModel]:
+    if not isinstance(record, dict):
+        results[index] = _row_result(index, 422, error="每筆資料需為 JSON 物件")
+        return None
+    try:
+        return schema.model_validate(record)
+    except ValidationError as exc:
+        results[index] = _row_result(index, 422, error=exc.errors(include_url=False, include_context=False))
+        return None
+
+
+def _check_references(db: Session, resource: BulkResource, pending: list, results: dict) -> list:
+    """整批查詢參照的資料是否存在（例如 place_id），不存在的列標為 404"""
+    for field, ref_model in resource.references:
+        values = {row[field] for _, row in pending if row.get(field) is not None}
+        if not values:
+            continue
+        existing = set(db.scalars(select(ref_model.id).where(ref_model.id.in_(values))))
+        kept = []
+        for index, row in pending:
+            value = row.get(field)
+            if value is not None and value not in existing:
+                results[index] = _row_result(index, 404, error=f"{ref_model.__name__} with id {value} not found")
+            else:
+                kept.append((index, row))
+        pending = kept
+    return pending
+
+
+def _write_chunk(
+    db: Session, model, pending: list, write: Callable[[List[dict]], List[Tuple[str, int]]], results: dict
+) -> None:
+    """
+    整段在一個交易中寫入；write 回傳與 rows 順序相同的 (id, 狀態碼)。
+    若有任一筆違反資料庫限制，改為逐筆以 SAVEPOINT 寫入，只讓出錯的列失敗。
+    """
+    if not pending:
+        return
+    try:
+        written = write([row for _, row in pending])
+        crud.commit_changes(db, model, *crud.sync_poi_locations(db, model, [id for id, _ in written]))
+        for (index, _), (id, status_code) in zip(pending, written):
+            results[index] = _row_result(index, status_code, id=id)
+        return
+    except SQLAlchemyError:
+        db.rollback()
+
+    ids = []
+    for index, row in pending:
+        try:
+            with db.begin_nested():
+                ((id, status_code),) = write([row])
+            ids.append(id)
+            results[index] = _row_result(index, status_code, id=id)
+        except SQLAlchemyError as exc:
+            message = str(getattr(exc, "orig", exc)).splitlines()[0]
+            results[index] = _row_result(index, 409 if isinstance(exc, IntegrityError) else 400, id=row.get("id"), error=message)
+    crud.commit_changes(db, model, *crud.sync_poi_locations(db, model, ids))
+
+
+def _create_chunk(db: Session, resource: BulkResource, records: list, offset: int) -> List[dict]:
+    results: dict = {}
+    pending = []
+    for index, record in enumerate(records, start=offset):
+        record_id = record.get("id") if isinstance(record, dict) else None
+        if record_id is not None and (not isinstance(record_id, str) or not record_id):
+            results[index] = _row_result(index, 400, error="id must be a non-empty string")
+            continue
+        fields = {key: value for key, value in record.items() if key != "id"} if isinstance(record, dict) else record
+        obj_in = _parse_record(fields, index, resource.create_schema, results)
+        if obj_in is None:
+            continue
+        if resource.validate_create is not None:
+            try:
+                resource.validate_create(obj_in)
+            except HTTPException as exc:
+                results[index] = _row_result(index, exc.status_code, error=exc.detail)
+                continue
+        row = normalize_payload_dict(obj_in.model_dump())
+        if resource.create_defaults is not None:
+            row.update(resource.create_defaults())
+        # 未帶 id 時產生新的 id；帶 id 且已存在時覆寫該筆（重複匯入同一批資料不會產生重複的列）
+        row["id"] = record_id or models.generate_uuid_str()
+        pending.append((index, row))
+
+    pending = _check_references(db, resource, pending, results)
+    # 覆寫時保留建立時產生的欄位（例如 human_resources 的 valid_pin）
+    keep = tuple(resource.create_defaults()) if resource.create_defaults is not None else ()
+
+    def write(rows: List[dict]) -> List[Tuple[str, int]]:
+        return [
+            (id, 201 if inserted else 200)
+            for id, inserted in crud.bulk_upsert(db, resource.model, rows, keep_on_conflict=keep)
+        ]
+
+    _write_chunk(db, resource.model, pending, write, results)
+    return [results[index] for index in sorted(results)]
+
+
+def _patch_chunk(db: Session, resource: BulkResource, records: list, offset: int) -> List[dict]:
+    results: dict = {}
+    parsed = []
+    for index, record in enumerate(records, start=offset):
+        record_id = record.get("id") if isinstance(record, dict) else None
+        if isinstance(record, dict) and (not isinstance(record_id, str) or not record_id):
+            results[index] = _row_result(index, 400, error="id is required")
+            continue
+        fields = {key: value for key, value in record.items() if key != "id"} if isinstance(record, dict) else record
+        obj_in = _parse_record(fields, index, resource.patch_schema, results)
+        if obj_in is None:
+            continue
+        update_data = normalize_payload_dict(obj_in.model_dump(exclude_unset=True))
+        if not update_data:
+            results[index] = _row_result(index, 400, id=record_id, error="No fields provided")
+            continue
+        parsed.append((index, record_id, obj_in, update_data))
+
+    model = resource.model
+    ids = {record_id for _, record_id, _, _ in parsed}
+    existing = {obj.id: obj for obj in db.scalars(select(model).where(model.id.in_(ids)))} if ids else {}
+    pending = []
+    for index, record_id, obj_in, update_data in parsed:
+        db_obj = existing.get(record_id)
+        if db_obj is None:
+            results[index] = _row_result(index, 404, id=record_id, error="Not found")
+            continue
+        if resource.validate_patch is not None:
+            try:
+                resource.validate_patch(db_obj, obj_in)
+            except HTTPException as exc:
+                results[index] = _row_result(index, exc.status_code, id=record_id, error=exc.detail)
+                continue
+        pending.append((index, {"id": record_id, **update_data}))
+
+    pending = _check_references(db, resource, pending, results)
+
+    def write(rows: List[dict]) -> List[Tuple[str, int]]:
+        crud.bulk_update(db, model, rows)
+        return [(row["id"], 200) for row in rows]
+
+    _write_chunk(db, model, pending, write, results)
+    return [results[index] for index in sorted(results)]
+
+
+async def _run_bulk(request: Request, db: Session, resource: BulkResource, process_chunk) -> dict:
+    """每 BULK_CHUNK_SIZE 筆交給 threadpool 寫入一次；超過 BULK_MAX_ROWS 的列不處理，標為 413"""
+    results: List[dict] = []
+    chunk: list = []
+    chunk_start = 0
+    async for index, record in _aenumerate(_iter_records(request)):
+        if index >= settings.BULK_MAX_ROWS:
+            results.append(_row_result(index, 413, error=f"單次請求最多 {settings.BULK_MAX_ROWS} 筆"))
+            continue
+        if not chunk:
+            chunk_start = index
+        chunk.append(record)
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            results.extend(await run_in_threadpool(process_chunk, db, resource, chunk, chunk_start))
+            chunk = []
+    if chunk:
+        results.extend(await run_in_threadpool(process_chunk, db, resource, chunk, chunk_start))
+    results.sort(key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["status"] < 400)
+    return {"total": len(results), "succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+def _register(name: str, resource: BulkResource) -> None:
+    @router.post(
+        f"/{name}/bulk",
+        response_model=schemas.BulkResult,
+        summary=f"批次建立 {name}",
+        openapi_extra=BULK_REQUEST_BODY,
+        name=f"bulk_create_{name}",
+    )
+    async def bulk_create(request: Request, db: Session = Depends(get_db)):
+        """
+        批次建立：每筆以單筆建立 API 相同的 schema 與規則檢核，每 BULK_CHUNK_SIZE 筆一個交易。
+        每筆可帶 id：已存在時覆寫該筆（INSERT ... ON CONFLICT），狀態為 200；新建立為 201。
+        重複執行同一批匯入（帶固定 id）不會產生重複資料。
+        回應逐筆列出結果（index 對應請求中的位置）；單筆失敗不影響其他筆。需要 API Key 權限。
+        """
+        return await _run_bulk(request, db, resource, _create_chunk)
+
+    @router.patch(
+        f"/{name}/bulk",
+        response_model=schemas.BulkResult,
+        summary=f"批次更新 {name}",
+        openapi_extra=BULK_REQUEST_BODY,
+        name=f"bulk_patch_{name}",
+    )
+    async def bulk_patch(request: Request, db: Session = Depends(get_db)):
+        """
+        批次更新：每筆需含 id，其餘欄位同單筆 PATCH（只更新有提供的欄位）。
+        回應逐筆列出結果；找不到的 id 為 404。需要 API Key 權限。
+        """
+        return await _run_bulk(request, db, resource, _patch_chunk)
+
+
+for _name, _resource in BULK_RESOURCES.items():
+    _register(_name, _resource)
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud, schemas
+from ..config import settings
+from ..database import get_async_db
+from ..resource_registry import RESOURCES, is_masked, serialize
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["增量同步（Changes）"],
+)
+
+
+@router.get("", response_model=schemas.ChangeFeed, summary="取得異動資料（增量同步）")
+async def list_changes(
+    since: Optional[float] = Query(None, ge=0, description="epoch 秒；回傳 updated_at 大於此時間的資料，未提供則從頭開始"),
+    cursor: Optional[str] = Query(None, description="上一次回應的 highWaterMark；提供時忽略 since"),
+    types: Optional[str] = Query(
+        None, description=f"以逗號分隔的資源名稱，預設為全部：{','.join(RESOURCES)}"
+    ),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    取得 since（或 cursor）之後新增、更新與刪除的資料，依 (updated_at, 資源, id) 排序分頁。
+
+    - 同步端保存回應中的 highWaterMark，下一次以 cursor 帶入，只需處理期間的異動
+    - op=delete 為刪除紀錄（例如 DELETE /requirements_hr/{id}），或列表中會遮罩 id 的資料（已完成的人力需求）
+    - 最近 CHANGES_SETTLE_SECONDS 秒內的異動會在之後的呼叫中出現，避免遺漏尚未 commit 的交易
+    """
+    names = [name.strip() for name in types.split(",") if name.strip()] if types else list(RESOURCES)
+    unknown = [name for name in names if name not in RESOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown types: {unknown}")
+    resources = [RESOURCES[name] for name in names]
+
+    if cursor:
+        after = tuple(crud.decode_token(cursor, 3))
+    elif since is not None:
+        after = (datetime.fromtimestamp(since, tz=timezone.utc), crud.CHANGE_SOURCE_AFTER_ALL, "")
+    else:
+        after = None
+
+    changes, has_more = await crud.get_changes_async(
+        db, resources, after, limit, settle_seconds=settings.CHANGES_SETTLE_SECONDS
+    )
+
+    member = []
+    for changed_at, source, key, obj in changes:
+        if source == crud.CHANGE_SOURCE_DELETED:
+            member.append(
+                {"type": obj.table_name, "op": "delete", "id": obj.record_id, "updated_at": int(changed_at.timestamp())}
+            )
+            continue
+        resource = RESOURCES[source]
+        if is_masked(resource, obj):
+            # 列表會遮罩 id 的資料（例如已完成的人力需求）改以刪除事件通知，同步端移除先前收到的同一筆，
+            # 不會留下沒有 id、無法對應的資料
+            member.append(
+                {"type": source, "op": "delete", "id": obj.id, "updated_at": int(changed_at.timestamp())}
+            )
+            continue
+        data = serialize(resource, obj)
+        member.append({"type": source, "op": "upsert", "id": data["id"], "updated_at": int(changed_at.timestamp()), "data": data})
+
+    if changes:
+        high_water_mark = crud.encode_token(list(changes[-1][:3]))
+    else:
+        high_water_mark = cursor or (crud.encode_token(list(after)) if after is not None else None)
+
+    next_link = None
+    if has_more:
+        params = {"cursor": high_water_mark, "limit": limit}
+        if types:
+            params["types"] = types
+        next_link = f"{router.prefix}?{urlencode(params)}"
+
+    return {"member": member, "highWaterMark": high_water_mark, "hasMore": has_more, "next": next_link}
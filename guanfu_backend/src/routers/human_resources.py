@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional, Literal
-import asyncio
+from typing import List, Literal, Optional, Tuple
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..enum_serializer import (
     HumanResourceRoleStatusEnum,
     HumanResourceRoleTypeEnum,
@@ -13,7 +15,7 @@ from ..enum_serializer import (
 )
 from ..pin_related import generate_pin
 from ..api_key import require_modify_api_key
-from ..services.discord_webhook import send_discord_message
+from ..services.notifications import enqueue_notification, wake_relay
 
 router = APIRouter(
     prefix="/human_resources",
@@ -22,111 +24,201 @@ router = APIRouter(
 )
 
 
+def validate_create(resource_in: schemas.HumanResourceCreate) -> None:
+    """建立前的檢核（單筆與批次建立共用）"""
+    if resource_in.headcount_got > resource_in.headcount_need:
+        raise HTTPException(
+            status_code=400,
+            detail="headcount_got must be less than or equal to headcount_need.",
+        )
+
+
+def validate_patch(db_resource: models.HumanResource, resource_in: schemas.HumanResourcePatch) -> None:
+    """更新前的檢核（單筆與批次更新共用）"""
+    # if db_resource.valid_pin and db_resource.valid_pin != resource_in.valid_pin:
+    #     raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
+    if db_resource.status == HumanResourceRoleStatusEnum.completed.value:
+        raise HTTPException(status_code=400, detail="Completed data cannot be edited.")
+
+    # 人數供給>需求防呆
+    if resource_in.headcount_need is not None or resource_in.headcount_got is not None:
+        if (
+            resource_in.headcount_need == resource_in.headcount_got
+            and resource_in.status == HumanResourceRoleStatusEnum.completed.value
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="headcount_need and headcount_got are locked because their values are equal; updates are not allowed.",
+            )
+        headcount_need = (
+            resource_in.headcount_need
+            if resource_in.headcount_need is not None
+            else db_resource.headcount_need
+        )
+        headcount_got = (
+            resource_in.headcount_got
+            if resource_in.headcount_got is not None
+            else db_resource.headcount_got
+        )
+        if headcount_got > headcount_need:
+            raise HTTPException(
+                status_code=400,
+                detail="headcount_got must be less than or equal to headcount_need.",
+            )
+
+
+def build_search_statement(filters: dict, q_role: Optional[str]) -> Tuple[Select, List[str]]:
+    """列表與匯出共用的查詢條件，回傳 (查詢, q_role 關鍵字)"""
+    normalized_filters = crud.normalize_filters_dict(filters)
+    query = select(models.HumanResource)
+    if normalized_filters:
+        query = query.filter_by(**normalized_filters)
+
+    keywords = []
+    if q_role:
+        keywords = [kw.strip().lower() for kw in q_role.split(",") if kw.strip()]
+        if keywords:
+            # search_text 為三個欄位合併的小寫字串，LIKE '%kw%' 可使用 trigram GIN 索引
+            # （關鍵字少於 3 個字元時 trigram 無法縮小範圍，仍會逐筆比對）
+            search_text = models.HumanResource.search_text
+            query = query.where(or_(*[search_text.contains(kw, autoescape=True) for kw in keywords]))
+    return query, keywords
+
+
 @router.get(
     "", response_model=schemas.HumanResourceCollection, summary="取得人力需求清單"
 )
-def list_human_resources(
+async def list_human_resources(
     request: Request,
+    response: Response,
     status: Optional[HumanResourceStatusEnum] = Query(None),
     q_role: Optional[str] = Query(None),
     role_status: Optional[HumanResourceRoleStatusEnum] = Query(None),
     role_type: Optional[HumanResourceRoleTypeEnum] = Query(None),
     limit: int = Query(20, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+    count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
     order_by_time: Optional[Literal["asc", "desc"]] = Query(
         None, description="時間排序方式：asc 或 desc"
     ),
-    db: Session = Depends(get_db),
+    order_by_relevance: bool = Query(
+        False, description="有 q_role 時依關鍵字相關度排序（優先於 order_by_time）"
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     取得人力需求清單 (分頁)
 
     - order_by: 指定時間排序方式，可選 "asc" (由舊到新) 或 "desc" (由新到舊)
+    - q_role: 以逗號分隔的關鍵字，任一關鍵字出現在 role_name / role_type / assignment_notes 即相符（不分大小寫）
+    - order_by_relevance: 依關鍵字相似度（pg_trgm word_similarity）由高到低排序，同分再依建立時間由新到舊
     """
     filters = {
         "status": status,
         "role_status": role_status,
         "role_type": role_type,
     }
+    query, keywords = build_search_statement(filters, q_role)
 
-    normalized_filters = crud.normalize_filters_dict(filters)
-    query = db.query(models.HumanResource)
-    if normalized_filters:
-        query = query.filter_by(**normalized_filters)
-
-    if q_role:
-        keywords = [kw.strip() for kw in q_role.split(",") if kw.strip()]
-        if keywords:
-            keyword_clauses = []
-            for kw in keywords:
-                pattern = f"%{kw}%"
-                keyword_clauses.append(
-                    or_(
-                        models.HumanResource.assignment_notes.ilike(pattern),
-                        models.HumanResource.role_name.ilike(pattern),
-                        models.HumanResource.role_type.ilike(pattern),
-                    )
-                )
-            query = query.filter(or_(*keyword_clauses))
-
-    if order_by_time == "asc":
+    if keywords and order_by_relevance:
+        relevance = func.greatest(*[func.word_similarity(kw, models.HumanResource.search_text) for kw in keywords])
+        query = query.order_by(relevance.desc(), models.HumanResource.created_at.desc())
+    elif order_by_time == "asc":
         query = query.order_by(models.HumanResource.created_at.asc())
     elif order_by_time == "desc":
         query = query.order_by(models.HumanResource.created_at.desc())
 
-    total = query.count()
-    resources = query.offset(offset).limit(limit).all()
+    version = await crud.collection_version_async(db, models.HumanResource)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+
+    total, count_mode = await crud.count_with_mode_async(
+        db, models.HumanResource, count, statement=query, cache_key=tuple(keywords),
+        generation=version[0], **filters
+    )
+    if cursor is not None:
+        query = crud.apply_cursor(query, models.HumanResource, cursor).limit(limit)
+    else:
+        query = query.offset(offset).limit(limit)
+    resources = list((await db.scalars(query)).all())
+    # 游標需以原始 id 產生，故在遮罩前先算 next 連結
+    next_link = crud.build_next_link(
+        request, limit=limit, offset=offset, total=total, cursor=cursor, items=resources
+    )
     resources = crud.mask_id_if_field_equals(resources, "status", "completed")
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
     return {
         "member": resources,
         "totalItems": total,
+        "countMode": count_mode,
         "limit": limit,
         "offset": offset,
         "next": next_link,
     }
 
 
+@router.get("/export", response_class=StreamingResponse, summary="匯出人力需求（NDJSON / CSV）")
+async def export_human_resources(
+    status: Optional[HumanResourceStatusEnum] = Query(None),
+    q_role: Optional[str] = Query(None),
+    role_status: Optional[HumanResourceRoleStatusEnum] = Query(None),
+    role_type: Optional[HumanResourceRoleTypeEnum] = Query(None),
+    format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    匯出所有符合條件的人力需求（串流輸出，過濾條件與列表相同）
+
+    - 不含 valid_pin、pii_date；status 為 completed 的需求 id 以空字串遮罩，與列表相同
+    """
+    filters = {
+        "status": status,
+        "role_status": role_status,
+        "role_type": role_type,
+    }
+    query, _ = build_search_statement(filters, q_role)
+    return export.export_response(db, "human_resources", query, format)
+
+
 @router.post(
     "",
     response_model=schemas.HumanResourceWithPin,
     status_code=201,
     summary="建立人力需求",
 )
-async def create_human_resource(
+def create_human_resource(
     resource_in: schemas.HumanResourceCreate, db: Session = Depends(get_db)
 ):
     """
     建立人力需求/角色
     """
-    if resource_in.headcount_got > resource_in.headcount_need:
-        raise HTTPException(
-            status_code=400,
-            detail="headcount_got must be less than or equal to headcount_need.",
-        )
-
-    created_resource = crud.create_with_input(
-        db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin()
-    )
+    validate_create(resource_in)
 
-    # Send notification to Discord in the background
+    # Discord 通知寫入 outbox，與人力需求在同一個交易 commit（見 services.notifications）
     message_content = "新的志工人力需求已建立 ✨"
     embed_data = resource_in.model_dump(mode="json")
-    asyncio.create_task(
-        send_discord_message(content=message_content, embed_data=embed_data)
+    enqueue_notification(db, message_content, embed_data)
+
+    created_resource = crud.create_with_input(
+        db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin()
     )
+    wake_relay()
 
     return created_resource
 
 
 @router.get("/{id}", response_model=schemas.HumanResource, summary="取得特定人力需求")
-def get_human_resource(id: str, db: Session = Depends(get_db)):
+async def get_human_resource(id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     取得單一人力需求/角色
     """
-    db_resource = crud.get_by_id(db, models.HumanResource, id)
+    db_resource = await crud.get_by_id_async(db, models.HumanResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Human Resource not found")
+    not_modified = http_cache.item_not_modified(request, response, db_resource)
+    if not_modified is not None:
+        return not_modified
     return db_resource
 
 
@@ -145,34 +237,5 @@ def patch_human_resource(
     db_resource = crud.get_by_id(db, models.HumanResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Human Resource not found")
-    # if db_resource.valid_pin and db_resource.valid_pin != resource_in.valid_pin:
-    #     raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
-    if db_resource.status == HumanResourceRoleStatusEnum.completed.value:
-        raise HTTPException(status_code=400, detail="Completed data cannot be edited.")
-
-    # 人數供給>需求防呆
-    if resource_in.headcount_need is not None or resource_in.headcount_got is not None:
-        if (
-            resource_in.headcount_need == resource_in.headcount_got
-            and resource_in.status == HumanResourceRoleStatusEnum.completed.value
-        ):
-            raise HTTPException(
-                status_code=400,
-                detail="headcount_need and headcount_got are locked because their values are equal; updates are not allowed.",
-            )
-        headcount_need = (
-            resource_in.headcount_need
-            if resource_in.headcount_need is not None
-            else db_resource.headcount_need
-        )
-        headcount_got = (
-            resource_in.headcount_got
-            if resource_in.headcount_got is not None
-            else db_resource.headcount_got
-        )
-        if headcount_got > headcount_need:
-            raise HTTPException(
-                status_code=400,
-                detail="headcount_got must be less than or equal to headcount_need.",
-            )
+    validate_patch(db_resource, resource_in)
     return crud.update(db, db_obj=db_resource, obj_in=resource_in)
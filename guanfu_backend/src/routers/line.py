@@ -1,10 +1,13 @@
 from typing import Optional
+
+import httpx
 from fastapi import APIRouter, Depends, Request, HTTPException, Form, Query
 from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..schemas import LineTokenResponse, LineUserInfoResponse
+from ..services.http_client import get_http_client
 from ..services.line_auth import (
     build_authorize_url,
     exchange_token_authorization_code,
@@ -22,10 +25,8 @@ def authorize(
         prompt: Optional[str] = Query(default=None),
         response_mode: Optional[str] = Query(default=None),
         disable_auto_login: Optional[bool] = Query(default=None),
-        db: Session = Depends(get_db),
 ):
     url = build_authorize_url(
-        db,
         redirect_uri=redirect_uri,
         prompt=prompt,
         response_mode=response_mode,
@@ -35,7 +36,11 @@ def authorize(
 
 
 @router.get("/token", summary="依照line授權碼(code)交換token", response_model=LineTokenResponse)
-async def token_exchange(request: Request, db: Session = Depends(get_db)):
+async def token_exchange(
+        request: Request,
+        db: Session = Depends(get_db),
+        http_client: httpx.AsyncClient = Depends(get_http_client),
+):
     q = dict(request.query_params)
     if "error" in q:
         return JSONResponse(status_code=400, content={"error": q.get("error"), "error_description": q.get("error_description")})
@@ -43,7 +48,7 @@ async def token_exchange(request: Request, db: Session = Depends(get_db)):
     state = q.get("state")
     if not code or not state:
         raise HTTPException(status_code=400, detail="缺少 code 或 state")
-    token_payload = await exchange_token_authorization_code(db, code, state)
+    token_payload = await exchange_token_authorization_code(db, http_client, code, state)
     return token_payload
 
 
@@ -53,6 +58,7 @@ async def token(
         code: Optional[str] = Form(default=None),
         refresh_token: Optional[str] = Form(default=None),
         db: Session = Depends(get_db),
+        http_client: httpx.AsyncClient = Depends(get_http_client),
 ):
     if grant_type == "authorization_code":
         if not code:
@@ -62,10 +68,14 @@ async def token(
     elif grant_type == "refresh_token":
         if not refresh_token:
             raise HTTPException(status_code=400, detail="缺少 refresh_token")
-        return await exchange_token_refresh(db, refresh_token)
+        return await exchange_token_refresh(db, http_client, refresh_token)
 
 
 @router.post("/revoke", summary="撤銷token")
-async def revoke(access_token: str = Form(...)):
-    ok = await revoke_token(access_token)
+async def revoke(
+        access_token: str = Form(...),
+        db: Session = Depends(get_db),
+        http_client: httpx.AsyncClient = Depends(get_http_client),
+):
+    ok = await revoke_token(db, http_client, access_token)
     return {"revoked": ok}
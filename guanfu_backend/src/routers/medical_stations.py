@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import MedicalStationTypeEnum, MedicalStationStatusEnum
 
@@ -16,20 +19,42 @@ router = APIRouter(
 @router.get("", response_model=schemas.MedicalStationCollection, summary="取得醫療站清單")
 def list_medical_stations(
         request: Request,
+        response: Response,
         status: Optional[MedicalStationStatusEnum] = Query(None),
         station_type: Optional[MedicalStationTypeEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
     取得醫療站清單 (分頁)
     """
     filters = {"status": status, "station_type": station_type}
-    stations = crud.get_multi(db, models.MedicalStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.MedicalStation, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.MedicalStation)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    stations = crud.get_multi(db, models.MedicalStation, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.MedicalStation, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=stations)
+    return {"member": stations, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出醫療站（NDJSON / CSV）")
+async def export_medical_stations(
+        status: Optional[MedicalStationStatusEnum] = Query(None),
+        station_type: Optional[MedicalStationTypeEnum] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的醫療站（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"status": status, "station_type": station_type}
+    statement = crud.build_list_statement(models.MedicalStation, limit=None, **filters)
+    return export.export_response(db, "medical_stations", statement, format)
 
 
 @router.post("", response_model=schemas.MedicalStation, status_code=201, summary="建立醫療站")
@@ -43,13 +68,16 @@ def create_medical_station(
 
 
 @router.get("/{id}", response_model=schemas.MedicalStation, summary="取得特定醫療站")
-def get_medical_station(id: str, db: Session = Depends(get_db)):
+def get_medical_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一醫療站
     """
     db_station = crud.get_by_id(db, models.MedicalStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Medical Station not found")
+    not_modified = http_cache.item_not_modified(request, response, db_station)
+    if not_modified is not None:
+        return not_modified
     return db_station
 
 
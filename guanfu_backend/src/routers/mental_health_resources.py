@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import MentalHealthDurationEnum, MentalHealthFormatEnum, MentalHealthResourceStatusEnum
 
@@ -16,11 +19,14 @@ router = APIRouter(
 @router.get("", response_model=schemas.MentalHealthResourceCollection, summary="取得心理健康資源清單")
 def list_mental_health_resources(
         request: Request,
+        response: Response,
         status: Optional[MentalHealthResourceStatusEnum] = Query(None),
         duration_type: Optional[MentalHealthDurationEnum] = Query(None),
         service_format: Optional[MentalHealthFormatEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -31,10 +37,34 @@ def list_mental_health_resources(
         "duration_type": duration_type,
         "service_format": service_format,
     }
-    resources = crud.get_multi(db, models.MentalHealthResource, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.MentalHealthResource, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": resources, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.MentalHealthResource)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    resources = crud.get_multi(db, models.MentalHealthResource, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.MentalHealthResource, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=resources)
+    return {"member": resources, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出心理健康資源（NDJSON / CSV）")
+async def export_mental_health_resources(
+        status: Optional[MentalHealthResourceStatusEnum] = Query(None),
+        duration_type: Optional[MentalHealthDurationEnum] = Query(None),
+        service_format: Optional[MentalHealthFormatEnum] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的心理健康資源（串流輸出，過濾條件與列表相同）
+    """
+    filters = {
+        "status": status,
+        "duration_type": duration_type,
+        "service_format": service_format,
+    }
+    statement = crud.build_list_statement(models.MentalHealthResource, limit=None, **filters)
+    return export.export_response(db, "mental_health_resources", statement, format)
 
 
 @router.post("", response_model=schemas.MentalHealthResource, status_code=201, summary="建立心理健康資源")
@@ -48,13 +78,16 @@ def create_mental_health_resource(
 
 
 @router.get("/{id}", response_model=schemas.MentalHealthResource, summary="取得特定心理健康資源")
-def get_mental_health_resource(id: str, db: Session = Depends(get_db)):
+def get_mental_health_resource(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一心理健康資源
     """
     db_resource = crud.get_by_id(db, models.MentalHealthResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Mental Health Resource not found")
+    not_modified = http_cache.item_not_modified(request, response, db_resource)
+    if not_modified is not None:
+        return not_modified
     return db_resource
 
 
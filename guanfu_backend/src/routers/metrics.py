@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from .. import database
+from ..response_cache import response_cache_stats
+from ..services.notifications import notification_outbox_stats
+
+router = APIRouter(prefix="/metrics", tags=["監控（Metrics）"], include_in_schema=False)
+
+
+@router.get("", summary="取得服務運行指標")
+def get_metrics():
+    """
+    回傳目前 worker 的運行指標（各 worker 各自統計）：
+    - db_pool: 連線池使用中 / 閒置 / overflow 連線數與等待時間
+    - async_db_pool: asyncpg 連線池，欄位同 db_pool
+    - response_cache: 回應快取命中 / 未命中 / 過期次數與目前筆數
+    - notifications: Discord 通知已送出 / 放棄 / 重試 / 遭 rate limit 的次數，outbox 待發送與已放棄的筆數
+    """
+    return {
+        "db_pool": database.pool_stats(),
+        "async_db_pool": database.async_pool_stats(),
+        "response_cache": response_cache_stats(),
+        "notifications": notification_outbox_stats(),
+    }
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, geo, http_cache, models, schemas
+from ..database import get_async_db, get_db
 from ..api_key import require_modify_api_key
-from ..schemas import PlaceStatusEnum, PlaceTypeEnum
+from ..schemas import CountMode, PlaceStatusEnum, PlaceTypeEnum
 
 router = APIRouter(
     prefix="/places",
@@ -14,13 +17,17 @@ router = APIRouter(
 
 
 @router.get("", response_model=schemas.PlaceCollection, summary="取得場所清單")
-def list_places(
+async def list_places(
         request: Request,
+        response: Response,
         status: Optional[PlaceStatusEnum] = Query(None),
         type: Optional[PlaceTypeEnum] = Query(None),
+        bbox: Optional[str] = Query(None, description=geo.BBOX_DESCRIPTION),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     取得場所清單 (分頁)
@@ -28,12 +35,89 @@ def list_places(
     支援過濾條件：
     - status: 場所狀態 (開放/暫停/關閉)
     - type: 場所類型 (醫療/加水/廁所/洗澡/避難/住宿/物資/心理援助)
+    - bbox: 地圖範圍 minLng,minLat,maxLng,maxLat，Point / Polygon / LineString 與範圍相交即回傳
     """
     filters = {"status": status, "type": type}
-    places = crud.get_multi(db, models.Place, skip=offset, limit=limit, order_by=models.Place.updated_at.desc(), **filters)
-    total = crud.count(db, models.Place, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": places, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    bounds = geo.parse_bbox(bbox)
+    query = None
+    if bounds is not None:
+        query = crud.build_list_statement(models.Place, limit=None, **filters).where(
+            geo.intersects(models.Place.geo_box, bounds)
+        )
+    version = await crud.collection_version_async(db, models.Place)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    if query is None:
+        places = await crud.get_multi_async(db, models.Place, skip=offset, limit=limit, order_by=models.Place.updated_at.desc(), cursor=cursor, **filters)
+    elif cursor is not None:
+        places = list((await db.scalars(crud.apply_cursor(query, models.Place, cursor).limit(limit))).all())
+    else:
+        places = list((await db.scalars(query.order_by(models.Place.updated_at.desc()).offset(offset).limit(limit))).all())
+    total, count_mode = await crud.count_with_mode_async(
+        db, models.Place, count, statement=query, cache_key=("bbox", bounds) if bounds else (),
+        generation=version[0], **filters
+    )
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=places)
+    return {"member": places, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出場所（NDJSON / CSV）")
+async def export_places(
+        status: Optional[PlaceStatusEnum] = Query(None),
+        type: Optional[PlaceTypeEnum] = Query(None),
+        bbox: Optional[str] = Query(None, description=geo.BBOX_DESCRIPTION),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的場所（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"status": status, "type": type}
+    bounds = geo.parse_bbox(bbox)
+    query = crud.build_list_statement(models.Place, limit=None, **filters)
+    if bounds is not None:
+        query = query.where(geo.intersects(models.Place.geo_box, bounds))
+    return export.export_response(db, "places", query, format)
+
+
+@router.get("/nearby", response_model=schemas.PlaceNearbyCollection, summary="取得鄰近場所")
+async def list_nearby_places(
+        request: Request,
+        response: Response,
+        lat: float = Query(..., ge=-90, le=90),
+        lng: float = Query(..., ge=-180, le=180),
+        radius: float = Query(5000, gt=0, le=50000, description="搜尋半徑（公尺）"),
+        status: Optional[PlaceStatusEnum] = Query(None),
+        type: Optional[PlaceTypeEnum] = Query(None),
+        limit: int = Query(20, ge=1, le=200),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    取得 (lat, lng) 半徑 radius 公尺內最近的場所，依距離由近到遠排序
+
+    先以半徑的外接經緯度矩形走 GiST 索引過濾，再計算實際距離
+    """
+    filters = {"status": status, "type": type}
+    distance = geo.distance_m(models.Place.geo_box, lng, lat)
+    query = (
+        crud.build_list_statement(models.Place, limit=None, **filters)
+        .where(geo.intersects(models.Place.geo_box, geo.radius_bbox(lng, lat, radius)))
+        .where(distance <= radius)
+    )
+    not_modified = http_cache.collection_not_modified(
+        request, response, await crud.collection_version_async(db, models.Place)
+    )
+    if not_modified is not None:
+        return not_modified
+    rows = (await db.execute(
+        query.add_columns(distance.label("distance")).order_by(distance, models.Place.id).limit(limit)
+    )).all()
+    member = [
+        schemas.PlaceNearby(**schemas.Place.model_validate(place).model_dump(), distance=round(place_distance, 1))
+        for place, place_distance in rows
+    ]
+    return {"member": member, "limit": limit}
 
 
 @router.post(
@@ -64,13 +148,16 @@ def create_place(
 
 
 @router.get("/{id}", response_model=schemas.Place, summary="取得特定場所")
-def get_place(id: str, db: Session = Depends(get_db)):
+async def get_place(id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     取得單一場所詳細資訊
     """
-    db_place = crud.get_by_id(db, models.Place, id)
+    db_place = await crud.get_by_id_async(db, models.Place, id)
     if db_place is None:
         raise HTTPException(status_code=404, detail="Place not found")
+    not_modified = http_cache.item_not_modified(request, response, db_place)
+    if not_modified is not None:
+        return not_modified
     return db_place
 
 
@@ -0,0 +1,74 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud, geo, http_cache, models, schemas
+from ..database import get_async_db
+
+router = APIRouter(
+    prefix="/poi",
+    tags=["鄰近設施（POI）"],
+)
+
+
+@router.get("/nearby", response_model=schemas.PoiNearbyCollection, summary="取得鄰近設施")
+async def list_nearby_poi(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5000, gt=0, le=50000, description="搜尋半徑（公尺）"),
+    kinds: Optional[str] = Query(
+        None, description=f"以逗號分隔的設施類型，預設為全部：{','.join(crud.POI_MODELS)}"
+    ),
+    status: Optional[str] = Query(None, description="只回傳此狀態的設施（各類型的狀態值不同，例如 open）"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    取得 (lat, lng) 半徑 radius 公尺內最近的設施，跨避難所、醫療站、心理資源、住宿、洗澡、加水、廁所，
+    依距離由近到遠排序。
+
+    - 以 poi_locations 的 GiST 索引查詢，只回傳摘要欄位；完整資料以 kind 與 id 查詢各資源的單筆 API
+    """
+    names = [name.strip() for name in kinds.split(",") if name.strip()] if kinds else list(crud.POI_MODELS)
+    unknown = [name for name in names if name not in crud.POI_MODELS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kinds: {unknown}")
+
+    distance = geo.distance_m(models.PoiLocation.geo_box, lng, lat)
+    query = (
+        select(models.PoiLocation)
+        .where(models.PoiLocation.kind.in_(names))
+        .where(geo.intersects(models.PoiLocation.geo_box, geo.radius_bbox(lng, lat, radius)))
+        .where(distance <= radius)
+    )
+    if status is not None:
+        query = query.where(models.PoiLocation.status == status)
+
+    not_modified = http_cache.collection_not_modified(
+        request, response, await crud.collection_version_async(db, models.PoiLocation)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    rows = (await db.execute(
+        query.add_columns(distance.label("distance"))
+        .order_by(distance, models.PoiLocation.kind, models.PoiLocation.record_id)
+        .limit(limit)
+    )).all()
+    member = [
+        {
+            "kind": poi.kind,
+            "id": poi.record_id,
+            "name": poi.name,
+            "status": poi.status,
+            "coordinates": poi.coordinates,
+            "distance": round(poi_distance, 1),
+            "updated_at": poi.updated_at,
+        }
+        for poi, poi_distance in rows
+    ]
+    return {"member": member, "limit": limit}
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 
 router = APIRouter(
@@ -15,19 +18,40 @@ router = APIRouter(
 @router.get("", response_model=schemas.ReportCollection, summary="取得回報事件清單")
 def list_reports(
         request: Request,
+        response: Response,
         status: Optional[str] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
     取得回報事件清單 (分頁)
     """
     filters = {"status": status}
-    reports = crud.get_multi(db, models.Report, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Report, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": reports, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.Report)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    reports = crud.get_multi(db, models.Report, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.Report, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=reports)
+    return {"member": reports, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出回報事件（NDJSON / CSV）")
+async def export_reports(
+        status: Optional[str] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的回報事件（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"status": status}
+    statement = crud.build_list_statement(models.Report, limit=None, **filters)
+    return export.export_response(db, "reports", statement, format)
 
 
 @router.post("", response_model=schemas.Report, status_code=201, summary="建立回報事件")
@@ -41,13 +65,16 @@ def create_report(
 
 
 @router.get("/{id}", response_model=schemas.Report, summary="取得特定回報事件")
-def get_report(id: str, db: Session = Depends(get_db)):
+def get_report(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一回報事件
     """
     db_report = crud.get_by_id(db, models.Report, id)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Report not found")
+    not_modified = http_cache.item_not_modified(request, response, db_report)
+    if not_modified is not None:
+        return not_modified
     return db_report
 
 
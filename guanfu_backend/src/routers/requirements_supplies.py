@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
 from ..api_key import require_modify_api_key
-from ..schemas import RequirementsSuppliesTypeEnum
+from ..schemas import CountMode, RequirementsSuppliesTypeEnum
 
 router = APIRouter(
     prefix="/requirements_supplies",
@@ -16,10 +18,13 @@ router = APIRouter(
 @router.get("", response_model=schemas.RequirementsSuppliesCollection, summary="取得物資需求清單")
 def list_requirements_supplies(
         request: Request,
+        response: Response,
         place_id: Optional[str] = Query(None, description="篩選特定場所的物資需求"),
         required_type: Optional[RequirementsSuppliesTypeEnum] = Query(None, description="篩選特定類型的物資需求"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -30,17 +35,37 @@ def list_requirements_supplies(
     - required_type: 需求類型
     """
     filters = {"place_id": place_id, "required_type": required_type}
+    version = crud.collection_version(db, models.RequirementsSupplies)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
     requirements = crud.get_multi(
         db,
         models.RequirementsSupplies,
         skip=offset,
         limit=limit,
         order_by=models.RequirementsSupplies.updated_at.desc(),
+        cursor=cursor,
         **filters
     )
-    total = crud.count(db, models.RequirementsSupplies, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": requirements, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    total, count_mode = crud.count_with_mode(db, models.RequirementsSupplies, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=requirements)
+    return {"member": requirements, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出物資需求（NDJSON / CSV）")
+async def export_requirements_supplies(
+        place_id: Optional[str] = Query(None, description="篩選特定場所的物資需求"),
+        required_type: Optional[RequirementsSuppliesTypeEnum] = Query(None, description="篩選特定類型的物資需求"),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的物資需求（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"place_id": place_id, "required_type": required_type}
+    statement = crud.build_list_statement(models.RequirementsSupplies, limit=None, **filters)
+    return export.export_response(db, "requirements_supplies", statement, format)
 
 
 @router.post(
@@ -77,13 +102,16 @@ def create_requirement_supply(
 
 
 @router.get("/{id}", response_model=schemas.RequirementsSupplies, summary="取得特定物資需求")
-def get_requirement_supply(id: str, db: Session = Depends(get_db)):
+def get_requirement_supply(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資需求詳細資訊
     """
     db_requirement = crud.get_by_id(db, models.RequirementsSupplies, id)
     if db_requirement is None:
         raise HTTPException(status_code=404, detail="Requirement Supply not found")
+    not_modified = http_cache.item_not_modified(request, response, db_requirement)
+    if not_modified is not None:
+        return not_modified
     return db_requirement
 
 
@@ -130,6 +158,5 @@ def delete_requirement_supply(id: str, db: Session = Depends(get_db)):
     if db_requirement is None:
         raise HTTPException(status_code=404, detail="Requirement Supply not found")
 
-    db.delete(db_requirement)
-    db.commit()
+    crud.delete(db, db_requirement)
     return None
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import RestroomFacilityTypeEnum, RestroomStatusEnum
 
@@ -16,6 +19,7 @@ router = APIRouter(
 @router.get("", response_model=schemas.RestroomCollection, summary="取得廁所點清單")
 def list_restrooms(
         request: Request,
+        response: Response,
         status: Optional[RestroomStatusEnum] = Query(None),
         facility_type: Optional[RestroomFacilityTypeEnum] = Query(None),
         is_free: Optional[bool] = Query(None),
@@ -23,6 +27,8 @@ def list_restrooms(
         has_lighting: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -35,10 +41,38 @@ def list_restrooms(
         "has_water": has_water,
         "has_lighting": has_lighting,
     }
-    restrooms = crud.get_multi(db, models.Restroom, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Restroom, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": restrooms, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.Restroom)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    restrooms = crud.get_multi(db, models.Restroom, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.Restroom, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=restrooms)
+    return {"member": restrooms, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出廁所點（NDJSON / CSV）")
+async def export_restrooms(
+        status: Optional[RestroomStatusEnum] = Query(None),
+        facility_type: Optional[RestroomFacilityTypeEnum] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        has_water: Optional[bool] = Query(None),
+        has_lighting: Optional[bool] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的廁所點（串流輸出，過濾條件與列表相同）
+    """
+    filters = {
+        "status": status,
+        "facility_type": facility_type,
+        "is_free": is_free,
+        "has_water": has_water,
+        "has_lighting": has_lighting,
+    }
+    statement = crud.build_list_statement(models.Restroom, limit=None, **filters)
+    return export.export_response(db, "restrooms", statement, format)
 
 
 @router.post("", response_model=schemas.Restroom, status_code=201, summary="建立廁所點")
@@ -52,13 +86,16 @@ def create_restroom(
 
 
 @router.get("/{id}", response_model=schemas.Restroom, summary="取得特定廁所點")
-def get_restroom(id: str, db: Session = Depends(get_db)):
+def get_restroom(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一廁所點
     """
     db_restroom = crud.get_by_id(db, models.Restroom, id)
     if db_restroom is None:
         raise HTTPException(status_code=404, detail="Restroom not found")
+    not_modified = http_cache.item_not_modified(request, response, db_restroom)
+    if not_modified is not None:
+        return not_modified
     return db_restroom
 
 
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
 from ..api_key import require_modify_api_key
-from ..schemas import ShelterStatusEnum
+from ..schemas import CountMode, ShelterStatusEnum
 router = APIRouter(
     prefix="/shelters",
     tags=["庇護所（Shelters）"],
@@ -13,21 +15,42 @@ router = APIRouter(
 
 
 @router.get("", response_model=schemas.ShelterCollection, summary="取得庇護所清單")
-def list_shelters(
+async def list_shelters(
         request: Request,
+        response: Response,
         status: Optional[ShelterStatusEnum] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     取得庇護所清單 (分頁)
     """
     filters = {"status": status}
-    shelters = crud.get_multi(db, models.Shelter, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.Shelter, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": shelters, "totalItems": total, "limit": limit, "offset": offset, "next": next_link, "next": next_link}
+    version = await crud.collection_version_async(db, models.Shelter)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    shelters = await crud.get_multi_async(db, models.Shelter, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = await crud.count_with_mode_async(db, models.Shelter, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=shelters)
+    return {"member": shelters, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出庇護所（NDJSON / CSV）")
+async def export_shelters(
+        status: Optional[ShelterStatusEnum] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的庇護所（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"status": status}
+    statement = crud.build_list_statement(models.Shelter, limit=None, **filters)
+    return export.export_response(db, "shelters", statement, format)
 
 
 @router.post("", response_model=schemas.Shelter, status_code=201, summary="建立庇護所")
@@ -41,13 +64,16 @@ def create_shelter(
 
 
 @router.get("/{id}", response_model=schemas.Shelter, summary="取得特定庇護所")
-def get_shelter(id: str, db: Session = Depends(get_db)):
+async def get_shelter(id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     取得單一庇護所
     """
-    db_shelter = crud.get_by_id(db, models.Shelter, id)
+    db_shelter = await crud.get_by_id_async(db, models.Shelter, id)
     if db_shelter is None:
         raise HTTPException(status_code=404, detail="Shelter not found")
+    not_modified = http_cache.item_not_modified(request, response, db_shelter)
+    if not_modified is not None:
+        return not_modified
     return db_shelter
 
 
@@ -1,10 +1,13 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import ShowerFacilityTypeEnum, ShowerStationStatusEnum
 
@@ -18,12 +21,15 @@ router = APIRouter(
 @router.get("", response_model=schemas.ShowerStationCollection, summary="取得洗澡點清單")
 def list_shower_stations(
         request: Request,
+        response: Response,
         status: Optional[ShowerStationStatusEnum] = Query(None),
         facility_type: Optional[ShowerFacilityTypeEnum] = Query(None),
         is_free: Optional[bool] = Query(None),
         requires_appointment: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -35,10 +41,36 @@ def list_shower_stations(
         "is_free": is_free,
         "requires_appointment": requires_appointment,
     }
-    stations = crud.get_multi(db, models.ShowerStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.ShowerStation, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.ShowerStation)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    stations = crud.get_multi(db, models.ShowerStation, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.ShowerStation, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=stations)
+    return {"member": stations, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出洗澡點（NDJSON / CSV）")
+async def export_shower_stations(
+        status: Optional[ShowerStationStatusEnum] = Query(None),
+        facility_type: Optional[ShowerFacilityTypeEnum] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        requires_appointment: Optional[bool] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的洗澡點（串流輸出，過濾條件與列表相同）
+    """
+    filters = {
+        "status": status,
+        "facility_type": facility_type,
+        "is_free": is_free,
+        "requires_appointment": requires_appointment,
+    }
+    statement = crud.build_list_statement(models.ShowerStation, limit=None, **filters)
+    return export.export_response(db, "shower_stations", statement, format)
 
 
 @router.post("", response_model=schemas.ShowerStation, status_code=201, summary="建立洗澡點")
@@ -52,13 +84,16 @@ def create_shower_station(
 
 
 @router.get("/{id}", response_model=schemas.ShowerStation, summary="取得特定洗澡點")
-def get_shower_station(id: str, db: Session = Depends(get_db)):
+def get_shower_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一洗澡點
     """
     db_station = crud.get_by_id(db, models.ShowerStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Shower Station not found")
+    not_modified = http_cache.item_not_modified(request, response, db_station)
+    if not_modified is not None:
+        return not_modified
     return db_station
 
 
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..database import get_async_db
+from ..stats import ROLLUP_GENERATION_SQL, SOURCE_GENERATION_SQL, STATS_SOURCE_TABLES, STATS_VIEW
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["統計總覽（Stats）"],
+)
+
+REFRESHED_AT_SQL = text("SELECT extract(epoch FROM updated_at)::bigint FROM cache_generations WHERE name = :name")
+
+
+@router.get("", response_model=schemas.Stats, summary="取得統計總覽")
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
+    """
+    取得各類資源的彙總數字（開放中庇護所與剩餘床位、尚缺人力、尚缺物資、各場所未滿足的需求）。
+
+    - 讀取背景預先彙總的結果（stats_rollup），不掃描原始資料表
+    - refreshedAt 為彙總時間；stale 為 true 表示之後有新的寫入，數字會在 STATS_REFRESH_SECONDS 秒內更新
+    """
+    try:
+        rows = (
+            await db.execute(text(f"SELECT section, key, record_count, quantity FROM {STATS_VIEW} ORDER BY section, key"))
+        ).all()
+    except ProgrammingError:
+        raise HTTPException(status_code=503, detail="Stats are not available yet.")
+    refreshed_at = (await db.execute(REFRESHED_AT_SQL, {"name": STATS_VIEW})).scalar()
+    refreshed_generation = (await db.execute(ROLLUP_GENERATION_SQL, {"name": STATS_VIEW})).scalar()
+    source_generation = (await db.execute(SOURCE_GENERATION_SQL, {"names": list(STATS_SOURCE_TABLES)})).scalar()
+
+    sections = {}
+    for section, key, record_count, quantity in rows:
+        data = sections.setdefault(section, {"count": 0, "quantity": 0, "buckets": []})
+        data["count"] += record_count
+        data["quantity"] += quantity
+        data["buckets"].append({"key": key, "count": record_count, "quantity": quantity})
+
+    open_shelters = next(
+        (bucket for bucket in sections.get("shelters", {}).get("buckets", []) if bucket["key"] == "open"), None
+    )
+    return {
+        **sections,
+        "refreshedAt": refreshed_at,
+        "stale": refreshed_generation != source_generation,
+        "openShelters": open_shelters["count"] if open_shelters else 0,
+        "availableSpaces": open_shelters["quantity"] if open_shelters else 0,
+    }
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
-from sqlalchemy import desc
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, noload, selectinload
 from typing import Optional, List, Literal
-import asyncio
 
-from .. import crud, models, schemas
+from .. import crud, export, http_cache, models, schemas
 from ..crud import (
     get_full_supply,
     supply_merge_item_counts,
     supply_batch_increment_received,
 )
-from ..database import get_db
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
-from ..services.discord_webhook import send_discord_message
+from ..services.notifications import enqueue_notification, wake_relay
 
 router = APIRouter(
     prefix="/supplies",
@@ -21,61 +23,107 @@ router = APIRouter(
 )
 
 
+SupplyStatus = Literal["open", "fulfilled"]
+
+SUPPLY_STATUS_DESCRIPTION = "open：仍有物資未到齊；fulfilled：物資已全部到齊"
+
+
+def supply_status_statement(status: Optional[SupplyStatus]) -> Select:
+    """列表與匯出共用的查詢條件"""
+    query = crud.build_list_statement(models.Supply, limit=None)
+    if status is not None:
+        query = query.where(crud.SUPPLY_STATUS_CONDITIONS[status])
+    return query
+
+
 @router.get("", response_model=schemas.SupplyCollection, summary="取得供應單清單")
-def list_supplies(
+async def list_supplies(
     request: Request,
-    embed: Optional[str] = Query(None, enum=["all"]),
+    response: Response,
+    embed: Optional[str] = Query(
+        None, enum=["all", "none"], description="all（預設）：包含物資項目；none：不載入物資項目"
+    ),
+    status: Optional[SupplyStatus] = Query(None, description=SUPPLY_STATUS_DESCRIPTION),
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+    count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     取得供應單清單 (分頁)
 
     - order_by: 指定時間排序方式，可選 "asc" (由舊到新) 或 "desc" (由新到舊)，預設為 desc (最新的在前)
+    - status: open 仍有物資未到齊、fulfilled 已全部到齊；依 open_item_count 的部分索引過濾，不需掃描物資項目
     """
-    order_by = desc(models.Supply.updated_at)
+    query = supply_status_statement(status)
+
+    # 物資項目的寫入也會將 supplies 的世代 +1（見 crud.commit_changes），版本資訊只需看 supplies
+    version = await crud.collection_version_async(db, models.Supply)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
 
-    supplies = crud.get_multi(
-        db, model=models.Supply, skip=offset, limit=limit, order_by=order_by
+    # 使用 crud.count 取得總數
+    total, count_mode = await crud.count_with_mode_async(
+        db, models.Supply, count, statement=query, cache_key=("status", status) if status else (),
+        generation=version[0],
     )
 
-    if embed == "all":
-        supplies = (
-            db.query(models.Supply)
-            .options(joinedload(models.Supply.supplies))
-            .filter(models.Supply.id.in_([s.id for s in supplies]))
-            .all()
-        )
+    # 物資項目以 selectinload 隨分頁一起載入（單一 IN 查詢，保留排序），避免序列化時逐筆 lazy load
+    if embed == "none":
+        item_loader = noload(models.Supply.supplies)
+    else:
+        item_loader = selectinload(models.Supply.supplies)
+    query = query.options(item_loader)
+    if cursor is not None:
+        query = crud.apply_cursor(query, models.Supply, cursor).limit(limit)
+    else:
+        query = query.order_by(desc(models.Supply.updated_at)).offset(offset).limit(limit)
+    supplies = list((await db.scalars(query)).all())
+    next_link = crud.build_next_link(
+        request, limit=limit, offset=offset, total=total, cursor=cursor, items=supplies
+    )
 
-    # 使用 crud.count 取得總數
-    total = crud.count(db, model=models.Supply)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
     return {
         "member": supplies,
         "totalItems": total,
+        "countMode": count_mode,
         "limit": limit,
         "offset": offset,
         "next": next_link,
     }
 
 
+@router.get("/export", response_class=StreamingResponse, summary="匯出供應單（NDJSON / CSV）")
+async def export_supplies(
+    status: Optional[SupplyStatus] = Query(None, description=SUPPLY_STATUS_DESCRIPTION),
+    format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    匯出所有符合條件的供應單（串流輸出，包含物資項目；CSV 的 supplies 欄位為 JSON 字串）
+
+    - 不含 valid_pin、pii_date，與列表相同
+    """
+    return export.export_response(db, "supplies", supply_status_statement(status), format)
+
+
 @router.post(
     "", response_model=schemas.SupplyWithPin, status_code=201, summary="建立供應單"
 )
-async def create_supply(supply_in: schemas.SupplyCreate, db: Session = Depends(get_db)):
+def create_supply(supply_in: schemas.SupplyCreate, db: Session = Depends(get_db)):
     """
     建立供應單 (注意：同時建立 supply_items 的邏輯需在 crud 中客製化)
     """
-    # This requires custom logic in crud.py to handle the nested `supplies` object
-    created_supply = crud.create_supply_with_items(db, obj_in=supply_in)
-
-    # Send Discord notification in background
+    # Discord 通知寫入 outbox，與供應單在同一個交易 commit（見 services.notifications）
     message_content = "新的物資供應已建立 📦"
     embed_data = supply_in.model_dump(mode="json")
-    asyncio.create_task(
-        send_discord_message(content=message_content, embed_data=embed_data)
-    )
+    enqueue_notification(db, message_content, embed_data)
+
+    # This requires custom logic in crud.py to handle the nested `supplies` object
+    created_supply = crud.create_supply_with_items(db, obj_in=supply_in)
+    wake_relay()
 
     return created_supply
 
@@ -106,22 +154,24 @@ def patch_supply(id: str, supply_in: schemas.SupplyPatch, db: Session = Depends(
 
 
 @router.get("/{id}", response_model=schemas.Supply, summary="取得特定供應單")
-def get_supply(id: str, db: Session = Depends(get_db)):
+async def get_supply(id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     取得單一供應單 (包含其所有物資項目)
     """
-    db_supply = (
-        db.query(models.Supply)
-        .options(joinedload(models.Supply.supplies))
-        .filter(models.Supply.id == id)
-        .first()
+    db_supply = await crud.get_by_id_async(
+        db, models.Supply, id, options=[selectinload(models.Supply.supplies)]
     )
     if db_supply is None:
         raise HTTPException(status_code=404, detail="Supply not found")
+    # 最後更新時間取供應單與其物資項目中較新者
+    last_modified = max([db_supply.updated_at, *(item.updated_at for item in db_supply.supplies)])
+    not_modified = http_cache.item_not_modified(request, response, db_supply, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
     return db_supply
 
 
-@router.post("/{id}", response_model=schemas.Supply)
+@router.post("/{id}", response_model=schemas.SupplyWithIncrementResults)
 def update_supply(
     id: str,
     supply_item_in: List[schemas.SupplyItemUpdate],
@@ -130,7 +180,11 @@ def update_supply(
     """
     將 payload.data 中的各項目依據 id 對應到 supply_item，
     執行 received_count += count 的批次更新，並回傳更新後的 Supply。
+
+    - 以單一 UPDATE 累加，並行的多個請求不會互相覆蓋
+    - 各項目獨立處理：累加後超過 total_number 的項目不更新（rejected），不屬於此供應單的項目為 not_found，
+      其餘照常累加；每筆結果列於 results
     """
     merged = supply_merge_item_counts([item.model_dump() for item in supply_item_in])
-    updated_supply = supply_batch_increment_received(db, id, merged)
-    return updated_supply
+    updated_supply, results = supply_batch_increment_received(db, id, merged)
+    return {**schemas.Supply.model_validate(updated_supply).model_dump(), "results": results}
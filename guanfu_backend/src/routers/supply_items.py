@@ -1,10 +1,13 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 from ..enum_serializer import SupplyItemTypeEnum
 
@@ -18,20 +21,42 @@ router = APIRouter(
 @router.get("", response_model=schemas.SupplyItemCollection, summary="取得特定供應單物資項目清單")
 def list_supply_items(
         request: Request,
+        response: Response,
         supply_id: Optional[str] = Query(None),
         tag: Optional[SupplyItemTypeEnum] = Query(None),
         limit: int = Query(100, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
     取得物資項目清單 (分頁)
     """
     filters = {"supply_id": supply_id, "tag": tag.value if tag else None, }
-    items = crud.get_multi(db, models.SupplyItem, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.SupplyItem, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": items, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.SupplyItem)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    items = crud.get_multi(db, models.SupplyItem, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.SupplyItem, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=items)
+    return {"member": items, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出物資項目（NDJSON / CSV）")
+async def export_supply_items(
+        supply_id: Optional[str] = Query(None),
+        tag: Optional[SupplyItemTypeEnum] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的物資項目（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"supply_id": supply_id, "tag": tag.value if tag else None, }
+    statement = crud.build_list_statement(models.SupplyItem, limit=None, **filters)
+    return export.export_response(db, "supply_items", statement, format)
 
 
 @router.post("", response_model=schemas.SupplyItem, status_code=201, summary="建立特定供應單物資項目")
@@ -86,11 +111,14 @@ def patch_supply_item(
 
 
 @router.get("/{id}", response_model=schemas.SupplyItem, summary="取得特定物資項目")
-def get_supply_item(id: str, db: Session = Depends(get_db)):
+def get_supply_item(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資項目
     """
     db_item = crud.get_by_id(db, models.SupplyItem, id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Supply Item not found")
+    not_modified = http_cache.item_not_modified(request, response, db_item)
+    if not_modified is not None:
+        return not_modified
     return db_item
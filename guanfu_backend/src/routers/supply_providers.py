@@ -1,10 +1,13 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..services.line_auth import verify_user_token
 
 router = APIRouter(
@@ -17,26 +20,48 @@ router = APIRouter(
 @router.get("", response_model=schemas.SupplyProviderCollection, summary="取得物資供應提供者清單")
 def list_supply_providers(
         request: Request,
+        response: Response,
         supply_item_id: Optional[str] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
     取得物資供應提供者清單 (分頁)
     """
     filters = {"supply_item_id": supply_item_id}
+    version = crud.collection_version(db, models.SupplyProvider)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
     providers = crud.get_multi(
         db,
         models.SupplyProvider,
         skip=offset,
         limit=limit,
         order_by=models.SupplyProvider.updated_at.desc(),
+        cursor=cursor,
         **filters,
     )
-    total = crud.count(db, models.SupplyProvider, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": providers, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    total, count_mode = crud.count_with_mode(db, models.SupplyProvider, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=providers)
+    return {"member": providers, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出物資供應提供者（NDJSON / CSV）")
+async def export_supply_providers(
+        supply_item_id: Optional[str] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的物資供應提供者（串流輸出，過濾條件與列表相同）
+    """
+    filters = {"supply_item_id": supply_item_id}
+    statement = crud.build_list_statement(models.SupplyProvider, limit=None, **filters)
+    return export.export_response(db, "supply_providers", statement, format)
 
 
 @router.post(
@@ -92,11 +117,14 @@ def patch_supply_provider(
 
 
 @router.get("/{id}", response_model=schemas.SupplyProvider, summary="取得特定物資供應提供者")
-def get_supply_provider(id: str, db: Session = Depends(get_db)):
+def get_supply_provider(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資供應提供者
     """
     db_provider = crud.get_by_id(db, models.SupplyProvider, id)
     if db_provider is None:
         raise HTTPException(status_code=404, detail="Supply Provider not found")
+    not_modified = http_cache.item_not_modified(request, response, db_provider)
+    if not_modified is not None:
+        return not_modified
     return db_provider
@@ -0,0 +1,68 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud, geo, http_cache, schemas
+from ..cache import TTLCache
+from ..config import settings
+from ..database import get_async_db
+
+router = APIRouter(
+    prefix="/tiles",
+    tags=["地圖圖磚（Tiles）"],
+)
+
+# 以 (z, x, y, 圖層, 圖磚內資料的版本) 為 key 保存序列化後的 GeoJSON；
+# 版本取自圖磚內資料的 (max(updated_at), 筆數)，因此只有資料有異動的圖磚會重新產生
+tile_cache = TTLCache(
+    max_entries=settings.TILE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TILE_CACHE_TTL_SECONDS,
+)
+
+
+@router.get(
+    "/{z}/{x}/{y}",
+    response_model=schemas.TileFeatureCollection,
+    summary="取得地圖圖磚（GeoJSON）",
+)
+async def get_tile(
+    request: Request,
+    response: Response,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    layers: Optional[str] = Query(
+        None, description=f"以逗號分隔的圖層，預設為全部：{','.join(crud.TILE_LAYERS)}"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    取得 Web Mercator 圖磚 z/x/y 範圍內的場所與設施（GeoJSON FeatureCollection）。
+
+    - zoom 小於 TILE_CLUSTER_MAX_ZOOM 時，同一格內的多筆資料合併為聚合點（properties.cluster、point_count）
+    - 單筆資料的 properties 含 layer（places 或設施類型）、id、name、status，場所另含 type
+    - 回應帶 ETag，圖磚內資料未異動時可用 If-None-Match 取得 304
+    """
+    names = [name.strip() for name in layers.split(",") if name.strip()] if layers else list(crud.TILE_LAYERS)
+    unknown = [name for name in names if name not in crud.TILE_LAYERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown layers: {unknown}")
+    bbox = geo.tile_bbox(z, x, y)
+
+    freshness = await crud.tile_freshness_async(db, bbox, names)
+    not_modified = http_cache.collection_not_modified(request, response, freshness)
+    if not_modified is not None:
+        return not_modified
+
+    key = (z, x, y, tuple(sorted(names)), freshness)
+    body = tile_cache.get("tiles", key)
+    if body is None:
+        grid = settings.TILE_CLUSTER_GRID if z < settings.TILE_CLUSTER_MAX_ZOOM else None
+        features = await crud.get_tile_features_async(db, bbox, names, grid)
+        body = json.dumps(
+            {"type": "FeatureCollection", "features": features}, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+        tile_cache.set("tiles", key, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": response.headers["etag"]})
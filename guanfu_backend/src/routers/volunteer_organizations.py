@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 
 router = APIRouter(
@@ -15,17 +20,36 @@ router = APIRouter(
 @router.get("", response_model=schemas.VolunteerOrgCollection, summary="取得志工招募單位清單")
 def list_volunteer_orgs(
         request: Request,
+        response: Response,
         limit: int = Query(20, ge=1, le=200),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
     取得志工招募單位清單 (分頁)
     """
-    orgs = crud.get_multi(db, models.VolunteerOrganization, skip=offset, limit=limit)
-    total = crud.count(db, models.VolunteerOrganization)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": orgs, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.VolunteerOrganization)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    orgs = crud.get_multi(db, models.VolunteerOrganization, skip=offset, limit=limit, cursor=cursor)
+    total, count_mode = crud.count_with_mode(db, models.VolunteerOrganization, count, generation=version[0])
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=orgs)
+    return {"member": orgs, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出志工招募單位（NDJSON / CSV）")
+async def export_volunteer_organizations(
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有志工招募單位（串流輸出）
+    """
+    statement = crud.build_list_statement(models.VolunteerOrganization, limit=None)
+    return export.export_response(db, "volunteer_organizations", statement, format)
 
 
 @router.post("", response_model=schemas.VolunteerOrganization, status_code=201, summary="建立志工招募單位")
@@ -39,13 +63,16 @@ def create_volunteer_org(
 
 
 @router.get("/{id}", response_model=schemas.VolunteerOrganization, summary="取得特定志工招募單位")
-def get_volunteer_org(id: str, db: Session = Depends(get_db)):
+def get_volunteer_org(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一志工招募單位
     """
     db_org = crud.get_by_id(db, models.VolunteerOrganization, id)
     if db_org is None:
         raise HTTPException(status_code=404, detail="Volunteer Organization not found")
+    not_modified = http_cache.item_not_modified(request, response, db_org)
+    if not_modified is not None:
+        return not_modified
     return db_org
 
 
@@ -1,10 +1,13 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, export, http_cache, models, schemas
+from ..database import get_async_db, get_db
+from ..schemas import CountMode
 from ..api_key import require_modify_api_key
 
 router = APIRouter(
@@ -17,12 +20,15 @@ router = APIRouter(
 @router.get("", response_model=schemas.WaterRefillStationCollection, summary="取得飲用水補給站清單")
 def list_water_refill_stations(
         request: Request,
+        response: Response,
         status: Optional[str] = Query(None),
         water_type: Optional[str] = Query(None),
         is_free: Optional[bool] = Query(None),
         accessibility: Optional[bool] = Query(None),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description=crud.CURSOR_DESCRIPTION),
+        count: CountMode = Query("exact", description=crud.COUNT_DESCRIPTION),
         db: Session = Depends(get_db)
 ):
     """
@@ -34,10 +40,36 @@ def list_water_refill_stations(
         "is_free": is_free,
         "accessibility": accessibility,
     }
-    stations = crud.get_multi(db, models.WaterRefillStation, skip=offset, limit=limit, **filters)
-    total = crud.count(db, models.WaterRefillStation, **filters)
-    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
-    return {"member": stations, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
+    version = crud.collection_version(db, models.WaterRefillStation)
+    not_modified = http_cache.collection_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    stations = crud.get_multi(db, models.WaterRefillStation, skip=offset, limit=limit, cursor=cursor, **filters)
+    total, count_mode = crud.count_with_mode(db, models.WaterRefillStation, count, generation=version[0], **filters)
+    next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total, cursor=cursor, items=stations)
+    return {"member": stations, "totalItems": total, "countMode": count_mode, "limit": limit, "offset": offset, "next": next_link}
+
+
+@router.get("/export", response_class=StreamingResponse, summary="匯出飲用水補給站（NDJSON / CSV）")
+async def export_water_refill_stations(
+        status: Optional[str] = Query(None),
+        water_type: Optional[str] = Query(None),
+        is_free: Optional[bool] = Query(None),
+        accessibility: Optional[bool] = Query(None),
+        format: export.ExportFormat = Query("ndjson", description=export.FORMAT_DESCRIPTION),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    匯出所有符合條件的飲用水補給站（串流輸出，過濾條件與列表相同）
+    """
+    filters = {
+        "status": status,
+        "water_type": water_type,
+        "is_free": is_free,
+        "accessibility": accessibility,
+    }
+    statement = crud.build_list_statement(models.WaterRefillStation, limit=None, **filters)
+    return export.export_response(db, "water_refill_stations", statement, format)
 
 
 @router.post("", response_model=schemas.WaterRefillStation, status_code=201, summary="建立飲用水補給站")
@@ -51,13 +83,16 @@ def create_water_refill_station(
 
 
 @router.get("/{id}", response_model=schemas.WaterRefillStation, summary="取得特定飲用水補給站")
-def get_water_refill_station(id: str, db: Session = Depends(get_db)):
+def get_water_refill_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一飲用水補給站
     """
     db_station = crud.get_by_id(db, models.WaterRefillStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Water Refill Station not found")
+    not_modified = http_cache.item_not_modified(request, response, db_station)
+    if not_modified is not None:
+        return not_modified
     return db_station
 
 
@@ -1,5 +1,5 @@
 from datetime import timezone, datetime, timedelta
-from typing import List, Optional, Annotated, Union, Literal, Tuple
+from typing import Any, List, Optional, Annotated, Union, Literal, Tuple
 
 from pydantic import BaseModel, constr, field_validator, NonNegativeInt, Field, conint
 
@@ -32,8 +32,13 @@ class Coordinates(BaseModel):
     lng: float
 
 
+# totalItems 計算方式：exact 精確（快取）、estimate 估計（pg_class.reltuples）、none 不計數
+CountMode = Literal["exact", "estimate", "none"]
+
+
 class CollectionBase(BaseModel):
-    totalItems: int
+    totalItems: Optional[int] = None
+    countMode: CountMode = "exact"
     limit: int
     offset: int
     next: Optional[str] = None
@@ -667,6 +672,8 @@ class SupplyPatch(BaseModel):
 class Supply(SupplyBase, BaseColumn):
     supplies: List[SupplyItem] = []
     spam_warn: Optional[bool] = None
+    item_count: int = Field(0, description="物資項目數")
+    open_item_count: int = Field(0, description="尚未到齊（received_count < total_number）的物資項目數；0 表示已全部到齊")
 
     class Config:
         from_attributes = True
@@ -695,6 +702,19 @@ class SupplyItemUpdate(BaseModel):
     )
 
 
+class SupplyItemIncrementResult(BaseModel):
+    id: str = Field(..., description="supply_item_id")
+    status: Literal["updated", "rejected", "not_found"] = Field(
+        ..., description="updated：已累加；rejected：累加後會超過 total_number，未更新；not_found：不屬於此供應單"
+    )
+    received_count: Optional[int] = Field(None, description="updated 為累加後的數量，rejected 為目前數量")
+    total_number: Optional[int] = None
+
+
+class SupplyWithIncrementResults(Supply):
+    results: List[SupplyItemIncrementResult] = []
+
+
 # ===================================================================
 # 物資供應提供者 (Supply Providers)
 # ===================================================================
@@ -1064,6 +1084,65 @@ class PlaceCollection(CollectionBase):
     member: List[Place]
 
 
+class PlaceNearby(Place):
+    distance: float = Field(..., description="與查詢點的距離（公尺）；Polygon / LineString 以外接矩形計算")
+
+
+class PlaceNearbyCollection(BaseModel):
+    member: List[PlaceNearby]
+    limit: int
+
+
+# ===================================================================
+# 鄰近設施（POI）
+# ===================================================================
+class PoiNearby(BaseColumn):
+    kind: str = Field(..., description="設施類型（來源資料表），例如 shelters、restrooms")
+    name: str
+    status: str
+    coordinates: Coordinates
+    distance: float = Field(..., description="與查詢點的距離（公尺）")
+
+
+class PoiNearbyCollection(BaseModel):
+    member: List[PoiNearby]
+    limit: int
+
+
+# ===================================================================
+# 批次寫入（Bulk）
+# ===================================================================
+class BulkRowResult(BaseModel):
+    index: int = Field(..., description="在請求中的位置（從 0 開始）")
+    id: Optional[str] = None
+    status: int = Field(..., description="與單筆 API 相同的狀態碼：201 建立、200 更新、4xx 失敗")
+    error: Optional[Any] = None
+
+
+class BulkResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkRowResult]
+
+
+# ===================================================================
+# 地圖圖磚（Tiles，GeoJSON）
+# ===================================================================
+class TileFeature(BaseModel):
+    type: Literal["Feature"] = "Feature"
+    geometry: dict = Field(..., description="GeoJSON geometry；聚合點為各資料中心點的平均位置")
+    properties: dict = Field(
+        ...,
+        description="單筆資料：layer（places 或設施類型）、id、name、status、type；聚合點：cluster=true、point_count",
+    )
+
+
+class TileFeatureCollection(BaseModel):
+    type: Literal["FeatureCollection"] = "FeatureCollection"
+    features: List[TileFeature]
+
+
 # ===================================================================
 # 人力需求 (Requirements HR) (NOTE: This obsolates "Human Resources")
 # ===================================================================
@@ -1137,3 +1216,62 @@ class RequirementsSupplies(RequirementsSuppliesBase, BaseColumn):
 class RequirementsSuppliesCollection(CollectionBase):
     member: List[RequirementsSupplies]
 
+
+
+# ===================================================================
+# 增量同步 (Changes)
+# ===================================================================
+
+
+class ChangeRecord(BaseModel):
+    type: str  # 資源名稱，例如 places、supplies
+    op: Literal["upsert", "delete"]
+    id: str
+    updated_at: int  # epoch 秒；刪除為刪除時間
+    data: Optional[dict] = None  # upsert 時為與單筆 API 相同格式的資料
+
+
+class ChangeFeed(BaseModel):
+    member: List[ChangeRecord]
+    highWaterMark: Optional[str] = None  # 下一次呼叫帶入 cursor 參數
+    hasMore: bool = False
+    next: Optional[str] = None
+
+
+# ===================================================================
+# 統計總覽 (Stats)
+# ===================================================================
+
+
+class StatsBucket(BaseModel):
+    key: str
+    count: int
+    quantity: int
+
+
+class StatsSection(BaseModel):
+    count: int = 0
+    quantity: int = 0
+    buckets: List[StatsBucket] = []
+
+
+class Stats(BaseModel):
+    refreshedAt: Optional[int] = Field(None, description="彙總時間（epoch 秒）；尚未彙總過為 null")
+    stale: bool = Field(False, description="彙總之後來源資料表有寫入，數字將於下一次背景彙總時更新")
+    shelters: StatsSection = Field(
+        default_factory=StatsSection, description="依 status 分組；quantity 為剩餘床位（available_spaces）"
+    )
+    openShelters: int = Field(0, description="status 為 open 的庇護所數")
+    availableSpaces: int = Field(0, description="開放中庇護所的剩餘床位")
+    human_resources: StatsSection = Field(
+        default_factory=StatsSection, description="進行中且未滿額的人力需求，依 role_type 分組；quantity 為尚缺人數"
+    )
+    supply_items: StatsSection = Field(
+        default_factory=StatsSection, description="尚未到齊的物資項目，依 tag 分組；quantity 為尚缺數量"
+    )
+    requirements_hr: StatsSection = Field(
+        default_factory=StatsSection, description="尚未滿足的場所人力需求，依 place_id 分組；quantity 為尚缺數量"
+    )
+    requirements_supplies: StatsSection = Field(
+        default_factory=StatsSection, description="尚未滿足的場所物資需求，依 place_id 分組；quantity 為尚缺數量"
+    )
@@ -0,0 +1,58 @@
+"""
+正式環境啟動入口：python -m src.serve
+
+- worker 數：WEB_CONCURRENCY，未設定（0）時依可用 CPU 數決定
+- 資料表初始化（DB_INIT_ON_STARTUP）只在主行程執行一次，worker 啟動時不再做 DDL 檢查
+- 每個 worker 在 lifespan 中先預熱連線池，完成後才開始接受請求
+"""
+import logging
+import os
+
+import uvicorn
+
+from .config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:  # macOS / Windows 沒有 sched_getaffinity
+        return os.cpu_count() or 1
+
+
+def main():
+    workers = worker_count()
+
+    if settings.DB_INIT_ON_STARTUP != "none":
+        from . import database
+
+        database.init_schema(settings.DB_INIT_ON_STARTUP)
+        # 主行程不處理請求，釋放初始化用的連線
+        database.engine.dispose()
+    # worker 以 spawn 啟動並重新讀取環境變數，這裡關掉之後就不會重複初始化；
+    # 單一 worker 時 uvicorn 在本行程載入 app，沿用已載入的 settings，需一併修改
+    os.environ["DB_INIT_ON_STARTUP"] = "none"
+    settings.DB_INIT_ON_STARTUP = "none"
+
+    per_worker = 2 * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)  # sync + async 兩組連線池
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        "Starting %d worker(s); up to %d database connections in total", workers, workers * per_worker
+    )
+
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", settings.SERVER_PORT)),
+        workers=workers,
+        log_level="info",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
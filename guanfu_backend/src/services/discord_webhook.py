@@ -1,32 +1,100 @@
 import httpx
 from ..config import settings
 import json
+from typing import NamedTuple, Optional, Sequence
 
+# Discord webhook 的逾時（共用 client 的預設值之外，依主機個別設定）
+DISCORD_TIMEOUT = httpx.Timeout(10, connect=5)
 
-async def send_discord_message(content: str, embed_data: dict | None = None):
+# 一則訊息最多 10 個 embed（Discord 限制）
+MAX_EMBEDS = 10
+# Discord 限制 content 最多 2000 字、一則訊息的 embed 合計最多 6000 字；
+# 單一 embed 的 JSON 超過 EMBED_JSON_MAX_CHARS 時截斷，合併時 embed 合計不超過 MESSAGE_EMBED_MAX_CHARS（保留餘裕）
+CONTENT_MAX_CHARS = 2000
+EMBED_JSON_MAX_CHARS = 1500
+MESSAGE_EMBED_MAX_CHARS = 5000
+
+
+class Notification(NamedTuple):
+    content: str
+    embed_data: Optional[dict] = None
+
+
+def embed_description(embed_data: dict) -> str:
+    """embed 內容：不縮排的 JSON，過長時截斷"""
+    body = json.dumps(embed_data, ensure_ascii=False, separators=(",", ":"), default=str)
+    if len(body) > EMBED_JSON_MAX_CHARS:
+        body = body[: EMBED_JSON_MAX_CHARS - 1] + "…"
+    return f"```json\n{body}\n```"
+
+
+def batch_size(notifications: Sequence[Notification]) -> int:
+    """
+    notifications 開頭最多幾筆可以合併成一則訊息：不超過 MAX_EMBEDS 筆、
+    content 合計不超過 CONTENT_MAX_CHARS、embed 合計不超過 MESSAGE_EMBED_MAX_CHARS（至少 1 筆）
     """
-    Sends a message to a Discord webhook.
+    contents = set()
+    content_chars = embed_chars = 0
+    for index, notification in enumerate(notifications[:MAX_EMBEDS]):
+        if notification.content not in contents:
+            content_chars += len(notification.content) + (1 if contents else 0)
+            contents.add(notification.content)
+        if notification.embed_data:
+            embed_chars += len(embed_description(notification.embed_data))
+        if index > 0 and (content_chars > CONTENT_MAX_CHARS or embed_chars > MESSAGE_EMBED_MAX_CHARS):
+            return index
+    return min(len(notifications), MAX_EMBEDS)
 
-    Args:
-        content: The main text content of the message.
-        embed_data: Optional dictionary to be sent as a formatted JSON embed.
+
+def build_message(notifications: Sequence[Notification]) -> dict:
     """
-    if not settings.DISCORD_WEBHOOK_URL:
-        return
+    Builds one webhook message from notifications (see batch_size for how many fit).
 
+    Distinct contents are joined line by line and every embed_data becomes its own
+    embed with compact, length-capped JSON, so the message stays within Discord's limits.
+    """
+    content = "\n".join(dict.fromkeys(n.content for n in notifications))
+    if len(content) > CONTENT_MAX_CHARS:
+        content = content[: CONTENT_MAX_CHARS - 1] + "…"
     message = {"content": content}
 
-    if embed_data:
-        message["embeds"] = [
-            {
-                "description": f"```json\n{json.dumps(embed_data, indent=2, ensure_ascii=False)}\n```",
-                "color": 5814783,  # A nice blue color
-            }
-        ]
-
-    async with httpx.AsyncClient() as client:
-        try:
-            await client.post(settings.DISCORD_WEBHOOK_URL, json=message)
-        except httpx.RequestError as e:
-            # In a real app, you'd want to log this error.
-            print(f"Error sending Discord webhook: {e}")
+    embeds = [
+        {
+            "description": embed_description(n.embed_data),
+            "color": 5814783,  # A nice blue color
+        }
+        for n in notifications
+        if n.embed_data
+    ]
+    if embeds:
+        message["embeds"] = embeds[:MAX_EMBEDS]
+    return message
+
+
+async def post_discord_message(client: httpx.AsyncClient, message: dict) -> httpx.Response:
+    """
+    Posts a message to the Discord webhook and returns the response (rate limit headers included).
+
+    Args:
+        client: The shared httpx client (services.http_client.get_http_client).
+        message: The webhook payload, see build_message.
+    """
+    return await client.post(settings.DISCORD_WEBHOOK_URL, json=message, timeout=DISCORD_TIMEOUT)
+
+
+def retry_after_seconds(response: httpx.Response) -> float:
+    """429 回應要求等待的秒數（body 的 retry_after，沒有則看 Retry-After 標頭）"""
+    try:
+        return float(response.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return float(response.headers.get("Retry-After", 1))
+
+
+def rate_limit_wait_seconds(response: httpx.Response) -> float:
+    """目前的 rate limit 額度已用完時，下一次呼叫前需等待的秒數；尚有額度時為 0"""
+    if response.headers.get("X-RateLimit-Remaining") != "0":
+        return 0.0
+    try:
+        return float(response.headers.get("X-RateLimit-Reset-After", 0))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,46 @@
+"""
+對外 HTTP 呼叫（Discord webhook、LINE OAuth）共用的 httpx.AsyncClient。
+
+- 每個 worker 一個 client，由 lifespan 建立與關閉；連線保留重用（keep-alive），對方支援 HTTP/2 時
+  同一條連線可同時處理多個請求，不必每次呼叫都重新做 TCP + TLS 握手
+- 逾時依目標主機各自設定（見 discord_webhook / line_auth），此處只設定預設值與連線池上限
+- 以 FastAPI dependency（get_http_client）注入到路由，再由路由傳給 service 函式
+"""
+from typing import Optional
+
+import httpx
+
+from ..config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.HTTP_CLIENT_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(10, connect=5),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    取得共用的 client（FastAPI dependency）。
+    未經 lifespan 啟動時（例如 scripts 直接呼叫 service）於第一次使用時建立。
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """關閉共用 client 與其保留的連線（lifespan shutdown）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
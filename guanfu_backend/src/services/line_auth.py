@@ -1,20 +1,27 @@
 import base64
+import binascii
 import hashlib
+import json
 import secrets
 import logging
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Callable
+from typing import Optional, Dict, Callable, NamedTuple
 
 import httpx
 from urllib.parse import urlencode
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from starlette import status
 
+from ..cache import TTLCache
 from ..config import settings
-from ..database import get_db
+from ..crud import build_generation_statement, bump_cache_generations
+from ..database import SessionLocal, get_db
 from ..models import LineUser, LineSessionState
 
 # LINE OAuth2 / OIDC endpoints
@@ -24,16 +31,44 @@ USERINFO_URL = "https://api.line.me/oauth2/v2.1/userinfo"
 VERIFY_URL = "https://api.line.me/oauth2/v2.1/verify"
 REVOKE_URL = "https://api.line.me/oauth2/v2.1/revoke"
 
+# api.line.me 的逾時（共用 client 的預設值之外，依主機個別設定）
+LINE_TIMEOUT = httpx.Timeout(15, connect=5)
+
 # Logger
 logger = logging.getLogger(__name__)
 
+# (line_users 的快取世代, token hash) → TokenUser；verify_user_token 命中時不查詢 line_users。
+# refresh / revoke / 重新登入時在同一個交易中將世代 +1，所有 worker 的舊快取都不再命中
+TOKEN_CACHE_NAMESPACE = "line_token"
+token_cache = TTLCache(
+    max_entries=settings.LINE_TOKEN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LINE_TOKEN_CACHE_TTL_SECONDS,
+)
 
-# ====== Utility functions ======
 
-def _generate_state() -> str:
-    return secrets.token_urlsafe(32)
+class TokenUser(NamedTuple):
+    """verify_user_token 驗證通過的使用者（快取內容，不含 token 本身）"""
+    id: str
+    line_user_id: str
+    scopes: Optional[str]
+    token_expires_at: Optional[datetime]  # UTC（aware）
+
+
+def hash_token(token: str) -> str:
+    """token 的 SHA-256（hex），對應 LineUser.access_token_hash / id_token_hash"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
+def invalidate_token_cache(db: Session) -> None:
+    """
+    token 失效（refresh / revoke / 重新登入）時呼叫，於目前交易將 line_users 的快取世代 +1，
+    commit 後所有 worker 的 token 快取都視為過期
+    """
+    bump_cache_generations(db, [LineUser.__tablename__])
+
+
+# ====== Utility functions ======
+
 def _generate_nonce() -> str:
     return secrets.token_urlsafe(32)
 
@@ -47,10 +82,107 @@ def _code_challenge_s256(code_verifier: str) -> str:
     return base64.urlsafe_b64encode(h).decode("utf-8").rstrip("=")
 
 
+# ====== OAuth state ======
+# state 本身即為加密並驗證（AES-256-GCM）的 token，內含 nonce / code_verifier / redirect_uri / 到期時間，
+# 登入流程不需寫入資料庫；已使用的 state 記在本 worker 的快取中防止重送
+# （其他 worker 收到重送的 state 時，LINE 也會拒絕已使用過的授權碼）
+
+STATE_TTL_SECONDS = 600
+STATE_AAD = b"guanfu-line-oauth-state-v1"
+STATE_NONCE_BYTES = 12
+CONSUMED_STATE_NAMESPACE = "line_state"
+
+consumed_states = TTLCache(
+    max_entries=settings.LINE_STATE_REPLAY_CACHE_MAX_ENTRIES,
+    ttl_seconds=STATE_TTL_SECONDS,
+)
+
+
+def _state_cipher() -> AESGCM:
+    # 未設定 LINE_STATE_SECRET 時由 LINE_CLIENT_SECRET 衍生，兩者用途不同，加上前綴區隔
+    secret = settings.LINE_STATE_SECRET or settings.LINE_CLIENT_SECRET
+    return AESGCM(hashlib.sha256(b"line-oauth-state\x00" + secret.encode("utf-8")).digest())
+
+
+_cipher = _state_cipher()
+
+
+class OAuthState(NamedTuple):
+    nonce: str
+    code_verifier: str
+    redirect_uri: str
+
+
+def encode_state(oauth_state: OAuthState, expires_at: int) -> str:
+    """將 OAuthState 與到期時間（epoch 秒）加密為 URL-safe 的 state 字串"""
+    payload = json.dumps(
+        {"n": oauth_state.nonce, "v": oauth_state.code_verifier, "r": oauth_state.redirect_uri, "x": expires_at},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    iv = secrets.token_bytes(STATE_NONCE_BYTES)
+    token = iv + _cipher.encrypt(iv, payload, STATE_AAD)
+    return base64.urlsafe_b64encode(token).decode("ascii").rstrip("=")
+
+
+def decode_state(state: str) -> Optional[tuple]:
+    """解密 state，回傳 (OAuthState, 到期時間)；格式不符或遭竄改時回傳 None"""
+    try:
+        token = base64.urlsafe_b64decode(state + "=" * (-len(state) % 4))
+        if len(token) <= STATE_NONCE_BYTES:
+            return None
+        payload = json.loads(_cipher.decrypt(token[:STATE_NONCE_BYTES], token[STATE_NONCE_BYTES:], STATE_AAD))
+        return OAuthState(payload["n"], payload["v"], payload["r"]), int(payload["x"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidTag):
+        return None
+
+
+def _consume_legacy_state(db: Session, state: str) -> OAuthState:
+    # 改為無狀態 state 之前發出的授權請求（line_session_states），使用後刪除
+    sess: Optional[LineSessionState] = db.query(LineSessionState).filter(LineSessionState.state == state).first()
+    if not sess or sess.consumed:
+        raise HTTPException(status_code=400, detail="state 無效或已使用")
+    if sess.expires_at and sess.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="state 已過期")
+    db.delete(sess)
+    return OAuthState(sess.nonce, sess.code_verifier, sess.redirect_uri)
+
+
+def consume_state(db: Session, state: str) -> OAuthState:
+    """驗證 state 並標記為已使用；無效、過期或已使用時回傳 400"""
+    decoded = decode_state(state)
+    if decoded is None:
+        return _consume_legacy_state(db, state)
+    oauth_state, expires_at = decoded
+    remaining = expires_at - time.time()
+    if remaining <= 0:
+        raise HTTPException(status_code=400, detail="state 已過期")
+    if consumed_states.get(CONSUMED_STATE_NAMESPACE, oauth_state.nonce) is not None:
+        raise HTTPException(status_code=400, detail="state 無效或已使用")
+    consumed_states.set(CONSUMED_STATE_NAMESPACE, oauth_state.nonce, True, remaining)
+    return oauth_state
+
+
+def purge_line_session_states() -> int:
+    """刪除 line_session_states 中已使用或已過期的舊資料（啟動時執行），回傳刪除筆數"""
+    with SessionLocal() as db:
+        deleted = (
+            db.query(LineSessionState)
+            .filter(
+                or_(
+                    LineSessionState.consumed.is_(True),
+                    LineSessionState.expires_at.is_(None),
+                    LineSessionState.expires_at < datetime.utcnow(),
+                )
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+    return deleted
+
+
 # ====== Build Authorization URL ======
 
 def build_authorize_url(
-        db: Session,
         redirect_uri: str,
         prompt: Optional[str] = None,
         response_mode: Optional[str] = None,
@@ -59,20 +191,10 @@ def build_authorize_url(
     """
     產生 LINE Login 授權頁 URL（PKCE + OIDC）
     """
-    state = _generate_state()
     nonce = _generate_nonce()
     code_verifier = _generate_code_verifier()
     code_challenge = _code_challenge_s256(code_verifier)
-
-    sess = LineSessionState(
-        state=state,
-        nonce=nonce,
-        code_verifier=code_verifier,
-        redirect_uri=redirect_uri,
-        expires_at=datetime.utcnow() + timedelta(minutes=10),
-    )
-    db.add(sess)
-    db.commit()
+    state = encode_state(OAuthState(nonce, code_verifier, redirect_uri), int(time.time()) + STATE_TTL_SECONDS)
 
     params = {
         "response_type": "code",
@@ -97,52 +219,46 @@ def build_authorize_url(
 
 # ====== Exchange Token ======
 
-async def exchange_token_authorization_code(db: Session, code: str, state: str) -> Dict:
+async def exchange_token_authorization_code(db: Session, client: httpx.AsyncClient, code: str, state: str) -> Dict:
     """
     授權碼換取 access_token / id_token，並驗證 ID Token + 更新使用者資料
     """
-    sess: Optional[LineSessionState] = db.query(LineSessionState).filter(LineSessionState.state == state).first()
-    if not sess or sess.consumed:
-        raise HTTPException(status_code=400, detail="state 無效或已使用")
-    if sess.expires_at and sess.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="state 已過期")
+    sess = consume_state(db, state)
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        data = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "redirect_uri": sess.redirect_uri,
-            "client_id": settings.LINE_CLIENT_ID,
-            "client_secret": settings.LINE_CLIENT_SECRET,
-            "code_verifier": sess.code_verifier,
-        }
-        token_resp = await client.post(TOKEN_URL, data=data)
-        if token_resp.status_code != 200:
-            logger.error(f"交換 token 失敗: {token_resp.text}")
-            raise HTTPException(status_code=token_resp.status_code, detail="交換 token 失敗")
-
-        token_json = token_resp.json()
-        access_token = token_json.get("access_token")
-        refresh_token = token_json.get("refresh_token")
-        id_token = token_json.get("id_token")
-        expires_in = token_json.get("expires_in", 0)
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": sess.redirect_uri,
+        "client_id": settings.LINE_CLIENT_ID,
+        "client_secret": settings.LINE_CLIENT_SECRET,
+        "code_verifier": sess.code_verifier,
+    }
+    token_resp = await client.post(TOKEN_URL, data=data, timeout=LINE_TIMEOUT)
+    if token_resp.status_code != 200:
+        logger.error(f"交換 token 失敗: {token_resp.text}")
+        raise HTTPException(status_code=token_resp.status_code, detail="交換 token 失敗")
+
+    token_json = token_resp.json()
+    access_token = token_json.get("access_token")
+    refresh_token = token_json.get("refresh_token")
+    id_token = token_json.get("id_token")
+    expires_in = token_json.get("expires_in", 0)
 
     if not access_token or not id_token:
         raise HTTPException(status_code=400, detail="缺少 access_token 或 id_token")
 
     # ====== 使用 LINE verify endpoint 驗證 ID Token ======
-    async with httpx.AsyncClient(timeout=10) as client:
-        verify_data = {
-            "id_token": id_token,
-            "client_id": settings.LINE_CLIENT_ID,
-        }
-        verify_resp = await client.post(VERIFY_URL, data=verify_data)
-        if verify_resp.status_code != 200:
-            logger.error(f"ID Token 驗證失敗: {verify_resp.text}")
-            raise HTTPException(status_code=400, detail="ID Token 驗證失敗")
-
-        decoded = verify_resp.json()
-        logger.info(f"ID Token 驗證成功: {decoded}")
+    verify_data = {
+        "id_token": id_token,
+        "client_id": settings.LINE_CLIENT_ID,
+    }
+    verify_resp = await client.post(VERIFY_URL, data=verify_data, timeout=LINE_TIMEOUT)
+    if verify_resp.status_code != 200:
+        logger.error(f"ID Token 驗證失敗: {verify_resp.text}")
+        raise HTTPException(status_code=400, detail="ID Token 驗證失敗")
+
+    decoded = verify_resp.json()
+    logger.info(f"ID Token 驗證成功: {decoded}")
 
     # 驗證 nonce
     if decoded.get("nonce") != sess.nonce:
@@ -154,14 +270,13 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
     picture_url = decoded.get("picture")
 
     # ====== 從 userinfo 端點取更多資料 ======
-    async with httpx.AsyncClient(timeout=10) as client:
-        prof_resp = await client.get(USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
-        if prof_resp.status_code == 200:
-            prof = prof_resp.json()
-            display_name = prof.get("name", display_name)
-            picture_url = prof.get("picture", picture_url)
-        else:
-            logger.warning(f"userinfo 取得失敗: {prof_resp.text}")
+    prof_resp = await client.get(USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"}, timeout=LINE_TIMEOUT)
+    if prof_resp.status_code == 200:
+        prof = prof_resp.json()
+        display_name = prof.get("name", display_name)
+        picture_url = prof.get("picture", picture_url)
+    else:
+        logger.warning(f"userinfo 取得失敗: {prof_resp.text}")
 
     now = datetime.utcnow()
     expires_at = now + timedelta(seconds=int(expires_in)) if expires_in else None
@@ -180,6 +295,8 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
             refresh_token=refresh_token,
             id_token=id_token,
             token_expires_at=expires_at,
+            access_token_hash=hash_token(access_token),
+            id_token_hash=hash_token(id_token),
             channel_id=str(settings.LINE_CLIENT_ID),
         )
         db.add(user)
@@ -189,12 +306,14 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
         user.email = email
         user.email_granted = bool(email)
         user.last_login_at = now
+        invalidate_token_cache(db)
         user.access_token = access_token
         user.refresh_token = refresh_token
         user.id_token = id_token
         user.token_expires_at = expires_at
+        user.access_token_hash = hash_token(access_token)
+        user.id_token_hash = hash_token(id_token)
 
-    sess.consumed = True
     db.commit()
     db.refresh(user)
 
@@ -210,22 +329,21 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
 
 # ====== Refresh Token ======
 
-async def exchange_token_refresh(db: Session, refresh_token: str) -> Dict:
+async def exchange_token_refresh(db: Session, client: httpx.AsyncClient, refresh_token: str) -> Dict:
     """
     依 LINE 規範，用 refresh_token 交換新 access_token。
     """
-    async with httpx.AsyncClient(timeout=15) as client:
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token,
-            "client_id": settings.LINE_CLIENT_ID,
-            "client_secret": settings.LINE_CLIENT_SECRET,
-        }
-        resp = await client.post(TOKEN_URL, data=data)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail="刷新 token 失敗")
-
-        token_json = resp.json()
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "client_id": settings.LINE_CLIENT_ID,
+        "client_secret": settings.LINE_CLIENT_SECRET,
+    }
+    resp = await client.post(TOKEN_URL, data=data, timeout=LINE_TIMEOUT)
+    if resp.status_code != 200:
+        raise HTTPException(status_code=resp.status_code, detail="刷新 token 失敗")
+
+    token_json = resp.json()
 
     access_token = token_json.get("access_token")
     new_refresh_token = token_json.get("refresh_token", refresh_token)
@@ -236,7 +354,10 @@ async def exchange_token_refresh(db: Session, refresh_token: str) -> Dict:
     if not user:
         raise HTTPException(status_code=404, detail="找不到對應的使用者")
 
+    # 舊的 access_token 不再有效
+    invalidate_token_cache(db)
     user.access_token = access_token
+    user.access_token_hash = hash_token(access_token)
     user.refresh_token = new_refresh_token
     user.token_expires_at = datetime.utcnow() + timedelta(seconds=int(expires_in))
     db.commit()
@@ -253,20 +374,25 @@ async def exchange_token_refresh(db: Session, refresh_token: str) -> Dict:
 
 # ====== Revoke Token ======
 
-async def revoke_token(access_token: str) -> bool:
+async def revoke_token(db: Session, client: httpx.AsyncClient, access_token: str) -> bool:
     """
-    撤銷 access_token。
+    撤銷 access_token，並清除本地的 access_token 與快取，之後以此 token 驗證一律失敗。
     """
-    async with httpx.AsyncClient(timeout=15) as client:
-        data = {
-            "access_token": access_token,
-            "client_id": settings.LINE_CLIENT_ID,
-            "client_secret": settings.LINE_CLIENT_SECRET,
-        }
-        resp = await client.post(REVOKE_URL, data=data)
-        if resp.status_code == 200:
-            return True
-        raise HTTPException(status_code=resp.status_code, detail="撤銷失敗")
+    data = {
+        "access_token": access_token,
+        "client_id": settings.LINE_CLIENT_ID,
+        "client_secret": settings.LINE_CLIENT_SECRET,
+    }
+    resp = await client.post(REVOKE_URL, data=data, timeout=LINE_TIMEOUT)
+    if resp.status_code == 200:
+        token_hash = hash_token(access_token)
+        db.query(LineUser).filter(LineUser.access_token_hash == token_hash).update(
+            {LineUser.access_token: None, LineUser.access_token_hash: None}, synchronize_session=False
+        )
+        invalidate_token_cache(db)
+        db.commit()
+        return True
+    raise HTTPException(status_code=resp.status_code, detail="撤銷失敗")
 
 
 # ====== Userinfo (Local lookup) ======
@@ -275,7 +401,7 @@ def userinfo_from_id_token(db: Session, id_token: str) -> Dict:
     """
     根據本地已驗證的 id_token 找使用者資料。
     """
-    user = db.query(LineUser).filter(LineUser.id_token == id_token).first()
+    user = db.query(LineUser).filter(LineUser.id_token_hash == hash_token(id_token)).first()
     if not user:
         raise HTTPException(status_code=404, detail="找不到對應使用者")
     return {
@@ -303,10 +429,30 @@ def parse_scopes(scopes_text: Optional[str]) -> set[str]:
     return scopes
 
 
+def _load_token_user(db: Session, token_hash: str) -> Optional[TokenUser]:
+    # access_token_hash / id_token_hash 各有索引，OR 以 BitmapOr 合併
+    user: Optional[LineUser] = (
+        db.query(LineUser)
+        .filter(or_(LineUser.access_token_hash == token_hash, LineUser.id_token_hash == token_hash))
+        .first()
+    )
+    if user is None:
+        return None
+    expires = user.token_expires_at
+    if expires is not None and expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return TokenUser(user.id, user.line_user_id, user.scopes, expires)
+
+
 def verify_user_token(
         credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
         db: Session = Depends(get_db),
-) -> LineUser:
+) -> TokenUser:
+    """
+    驗證 Bearer token（access_token 或 id_token）。
+    以 token 的 SHA-256 查詢並快取 LINE_TOKEN_CACHE_TTL_SECONDS 秒（不超過 token 到期時間）；
+    快取依 line_users 的快取世代區分，命中時只需一次主鍵查詢。
+    """
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -328,20 +474,21 @@ def verify_user_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user: Optional[LineUser] = (
-        db.query(LineUser)
-        .filter(or_(LineUser.access_token == token, LineUser.id_token == token))
-        .first()
-    )
+    token_hash = hash_token(token)
+    key = (db.scalar(build_generation_statement(LineUser)) or 0, token_hash)
+    user = token_cache.get(TOKEN_CACHE_NAMESPACE, key)
     if user is None:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token 無效或使用者不存在")
+        user = _load_token_user(db, token_hash)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token 無效或使用者不存在")
+        ttl = None
+        if user.token_expires_at is not None:
+            ttl = min(settings.LINE_TOKEN_CACHE_TTL_SECONDS, (user.token_expires_at - datetime.now(timezone.utc)).total_seconds())
+        token_cache.set(TOKEN_CACHE_NAMESPACE, key, user, ttl)
 
     if user.token_expires_at is not None:
         now = datetime.now(timezone.utc)
-        expires = user.token_expires_at
-        if expires.tzinfo is None:
-            expires = expires.replace(tzinfo=timezone.utc)
-        if now >= expires:
+        if now >= user.token_expires_at:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token 已過期",
@@ -350,10 +497,10 @@ def verify_user_token(
     return user
 
 
-def require_scopes(*required_scopes: str) -> Callable[[LineUser], LineUser]:
+def require_scopes(*required_scopes: str) -> Callable[[TokenUser], TokenUser]:
     required = {s.strip().lower() for s in required_scopes if s.strip()}
 
-    def dependency(user: LineUser = Depends(verify_user_token)) -> LineUser:
+    def dependency(user: TokenUser = Depends(verify_user_token)) -> TokenUser:
         user_scopes = parse_scopes(user.scopes)
         missing = required - user_scopes
         if missing:
@@ -0,0 +1,254 @@
+"""
+Discord 通知的 transactional outbox。
+
+- 路由以 enqueue_notification() 在建立資料的同一個交易寫入 notification_outbox：commit 成功才有通知，
+  worker 重啟也不會遺失；POST 只多一筆 INSERT（commit 時一併送出），不等待發送
+- 每個 worker 的背景 relay 以 SELECT ... FOR UPDATE SKIP LOCKED 一次認領最多 MAX_EMBEDS 筆（且不超過訊息長度上限）、合併成一則訊息，
+  認領時在同一個短交易中把 available_at 延後 NOTIFY_CLAIM_LEASE_SECONDS（租約）並 commit，
+  多個 worker / replica 同時執行也不會重複認領；發送在交易外進行，不持有連線與鎖
+- 送出成功後才以第二個交易刪除（at-least-once：送出後、刪除前中斷，租約到期後會再送一次）
+- 依 Discord 的 rate limit 標頭與 429 的 retry_after 等待；網路錯誤與 5xx 以指數退避加 jitter 延後 available_at，
+  共 NOTIFY_MAX_ATTEMPTS 次仍失敗或收到其他 4xx 時標記 failed_at；合併的訊息被 4xx 拒絕時改為逐筆發送，
+  只放棄單獨發送仍被拒絕的通知
+- 標記 failed_at 的通知保留 NOTIFY_FAILED_RETENTION_HOURS 小時供查詢，之後由 relay 每小時清除
+- 本 worker 的寫入在 commit 後以 wake_relay() 喚醒 relay；其他 worker / replica 的寫入每 NOTIFY_POLL_SECONDS 秒輪詢一次
+- shutdown 時最多等待 NOTIFY_DRAIN_SECONDS 送完待發送的通知；未送完的留在 outbox，由其他或重新啟動的 worker 發送
+"""
+import asyncio
+import contextlib
+import logging
+import random
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+import httpx
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import AsyncSessionLocal, SessionLocal
+from .discord_webhook import (
+    MAX_EMBEDS,
+    Notification,
+    batch_size,
+    build_message,
+    post_discord_message,
+    rate_limit_wait_seconds,
+    retry_after_seconds,
+)
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+_wake: Optional[asyncio.Event] = None
+_stopping: Optional[asyncio.Event] = None
+_relay: Optional[asyncio.Task] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# rate limit 額度用完時，下一次可以呼叫的時間（event loop 時間）
+_blocked_until = 0.0
+
+# 清除過期的放棄通知的間隔
+PURGE_INTERVAL_SECONDS = 3600
+
+notification_stats = {"sent": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+
+Outbox = models.NotificationOutbox
+
+CLAIM_STATEMENT = (
+    select(Outbox)
+    .where(Outbox.failed_at.is_(None), Outbox.available_at <= func.now())
+    .order_by(Outbox.id)
+    .limit(MAX_EMBEDS)
+    .with_for_update(skip_locked=True)
+)
+
+
+def enqueue_notification(db: Session, content: str, embed_data: Optional[dict] = None) -> None:
+    """
+    在目前交易中加入一則通知（隨呼叫端的 commit 一起寫入，rollback 則一併取消）。
+    未設定 DISCORD_WEBHOOK_URL 時不寫入。
+    """
+    if not settings.DISCORD_WEBHOOK_URL:
+        return
+    db.add(Outbox(content=content, embed_data=embed_data))
+
+
+def wake_relay() -> None:
+    """
+    commit 後呼叫：讓本 worker 的 relay 立即處理，不必等到下一次輪詢。
+    同步路由在 threadpool 中執行，以 call_soon_threadsafe 交給 event loop 設定。
+    """
+    if _wake is not None and _loop is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+
+def _retry_delay(attempt: int) -> timedelta:
+    # 指數退避 + full jitter，避免多個 worker 同時重送
+    backoff = min(settings.NOTIFY_RETRY_MAX_SECONDS, settings.NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return timedelta(seconds=random.uniform(0, backoff))
+
+
+async def _claim_batch() -> List[models.NotificationOutbox]:
+    """
+    以短交易認領一則訊息可容納的筆數（最多 MAX_EMBEDS 筆，見 batch_size）：available_at 延後 NOTIFY_CLAIM_LEASE_SECONDS 後立即 commit，
+    發送期間不持有資料列鎖，其他 worker 也不會重複認領
+    """
+    async with AsyncSessionLocal() as db, db.begin():
+        rows = (await db.scalars(CLAIM_STATEMENT)).all()
+        # 超過一則訊息長度上限的部分不延後，commit 後即可由下一批認領
+        rows = rows[: batch_size([Notification(row.content, row.embed_data) for row in rows])]
+        if rows:
+            await db.execute(
+                update(Outbox)
+                .where(Outbox.id.in_([row.id for row in rows]))
+                .values(available_at=func.now() + timedelta(seconds=settings.NOTIFY_CLAIM_LEASE_SECONDS))
+            )
+    return list(rows)
+
+
+async def _post(rows: List[models.NotificationOutbox]) -> Tuple[Optional[httpx.Response], str]:
+    """在交易外發送，等待 Discord 回應時不佔用資料庫連線；回傳 (response, 錯誤說明)，網路錯誤時 response 為 None"""
+    wait = _blocked_until - asyncio.get_running_loop().time()
+    if wait > 0:
+        await asyncio.sleep(wait)
+    message = build_message([Notification(row.content, row.embed_data) for row in rows])
+    try:
+        response = await post_discord_message(get_http_client(), message)
+    except httpx.RequestError as e:
+        return None, f"{type(e).__name__}: {e}"
+    return response, f"HTTP {response.status_code}: {response.text[:500]}"
+
+
+def _rejected(response: Optional[httpx.Response]) -> bool:
+    """429 以外的 4xx（webhook 失效、內容不合法）：原樣重送也不會成功"""
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+async def _settle(rows: List[models.NotificationOutbox], response: Optional[httpx.Response], error: str) -> None:
+    """以第二個交易依發送結果刪除、解除租約或延後重試"""
+    global _blocked_until
+    loop = asyncio.get_running_loop()
+    ids = [row.id for row in rows]
+    async with AsyncSessionLocal() as db, db.begin():
+        if response is not None and response.status_code == 429:
+            # 不計入失敗次數；解除租約，等待後重新認領
+            notification_stats["rate_limited"] += 1
+            _blocked_until = loop.time() + retry_after_seconds(response)
+            await db.execute(update(Outbox).where(Outbox.id.in_(ids)).values(available_at=func.now()))
+            return
+        if response is not None:
+            _blocked_until = loop.time() + rate_limit_wait_seconds(response)
+            if response.is_success:
+                await db.execute(delete(Outbox).where(Outbox.id.in_(ids)))
+                notification_stats["sent"] += len(rows)
+                return
+
+        give_up = _rejected(response)
+        attempt = max(row.attempts for row in rows) + 1
+        await db.execute(
+            update(Outbox)
+            .where(Outbox.id.in_(ids))
+            .values(
+                attempts=Outbox.attempts + 1,
+                available_at=func.now() + _retry_delay(attempt),
+                last_error=error,
+                failed_at=func.now() if give_up else case(
+                    (Outbox.attempts + 1 >= settings.NOTIFY_MAX_ATTEMPTS, func.now()), else_=None
+                ),
+            )
+        )
+    if give_up or attempt >= settings.NOTIFY_MAX_ATTEMPTS:
+        notification_stats["failed"] += len(rows)
+        logger.error("放棄發送 %d 則通知（%s）", len(rows), error)
+    else:
+        notification_stats["retries"] += len(rows)
+        logger.warning("Discord webhook 發送失敗（第 %d 次，稍後重試）：%s", attempt, error)
+
+
+async def _relay_batch() -> int:
+    """認領並發送一批通知，回傳認領的筆數（0 表示目前沒有待發送的通知）"""
+    rows = await _claim_batch()
+    if not rows:
+        return 0
+    response, error = await _post(rows)
+    if len(rows) > 1 and _rejected(response):
+        # 可能只是其中一筆內容不合法：逐筆重送，只放棄單獨發送仍被拒絕的通知
+        logger.warning("Discord 拒絕 %d 則通知合併的訊息（%s），改為逐筆發送", len(rows), error)
+        for row in rows:
+            await _settle([row], *await _post([row]))
+        return len(rows)
+    await _settle(rows, response, error)
+    return len(rows)
+
+
+async def purge_failed_notifications() -> int:
+    """刪除放棄發送超過 NOTIFY_FAILED_RETENTION_HOURS 小時的通知（內容含個人資料，不無限期保留）"""
+    async with AsyncSessionLocal() as db, db.begin():
+        result = await db.execute(
+            delete(Outbox).where(
+                Outbox.failed_at < func.now() - timedelta(hours=settings.NOTIFY_FAILED_RETENTION_HOURS)
+            )
+        )
+    return result.rowcount
+
+
+async def _run(wake: asyncio.Event, stopping: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    next_purge = loop.time()
+    while True:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(wake.wait(), settings.NOTIFY_POLL_SECONDS)
+        if wake.is_set() and not stopping.is_set():
+            # 等待同一波的其他通知，合併成一則訊息
+            await asyncio.sleep(settings.NOTIFY_COALESCE_SECONDS)
+        wake.clear()
+        try:
+            while await _relay_batch():
+                pass
+            if loop.time() >= next_purge:
+                next_purge = loop.time() + PURGE_INTERVAL_SECONDS
+                await purge_failed_notifications()
+        except Exception:
+            # 任何錯誤都不能讓 relay 停止；已認領的通知在租約到期後重新發送
+            logger.exception("notification_outbox 處理失敗")
+        if stopping.is_set():
+            return
+
+
+def start_notification_relay() -> None:
+    """啟動背景 relay（lifespan startup）"""
+    global _wake, _stopping, _relay, _loop
+    if not settings.DISCORD_WEBHOOK_URL:
+        return
+    _loop = asyncio.get_running_loop()
+    _wake, _stopping = asyncio.Event(), asyncio.Event()
+    _relay = asyncio.create_task(_run(_wake, _stopping))
+
+
+async def stop_notification_relay() -> None:
+    """送完待發送的通知（最多 NOTIFY_DRAIN_SECONDS 秒）後停止 relay（lifespan shutdown）"""
+    global _wake, _stopping, _relay, _loop
+    if _relay is None:
+        return
+    _stopping.set()
+    _wake.set()
+    try:
+        await asyncio.wait_for(_relay, settings.NOTIFY_DRAIN_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("shutdown 前未送完 notification_outbox，由其他 worker 或下次啟動時發送")
+    except asyncio.CancelledError:
+        pass
+    _wake = _stopping = _relay = _loop = None
+
+
+def notification_outbox_stats() -> dict:
+    """本 worker 的發送統計，與 outbox 中待發送 / 已放棄的筆數（所有 worker 共用）"""
+    with SessionLocal() as db:
+        pending, failed = db.execute(
+            select(
+                func.count().filter(Outbox.failed_at.is_(None)),
+                func.count().filter(Outbox.failed_at.is_not(None)),
+            )
+        ).one()
+    return {**notification_stats, "outbox_pending": pending, "outbox_failed": failed}
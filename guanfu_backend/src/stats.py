@@ -0,0 +1,86 @@
+"""
+統計總覽（GET /stats）的預先彙總。
+
+- stats_rollup 為 materialized view，每列為 (區塊, 分組鍵, 筆數, 數量)，/stats 只讀這張小表
+- 寫入經 crud.commit_changes 會把資料表的快取世代 +1；背景工作每 STATS_REFRESH_SECONDS 秒比對來源資料表的世代總和
+  與上次彙總時記錄的值（cache_generations 的 stats_rollup 列），有變動才 REFRESH MATERIALIZED VIEW CONCURRENTLY
+- 多 worker 以 advisory lock 確保同一時間只有一個 worker 重新彙總；彙總期間讀取不受阻擋
+"""
+import asyncio
+import logging
+
+from sqlalchemy import DDL, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database import async_engine
+
+logger = logging.getLogger(__name__)
+
+STATS_VIEW = "stats_rollup"
+
+# 彙總的來源資料表（與 cache_generations 的名稱相同）
+STATS_SOURCE_TABLES = ("human_resources", "requirements_hr", "requirements_supplies", "shelters", "supply_items")
+
+STATS_VIEW_DDL = [
+    DDL(
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {STATS_VIEW} AS
+        SELECT 'shelters' AS section, status AS key, count(*) AS record_count,
+               COALESCE(sum(COALESCE(available_spaces, GREATEST(capacity - COALESCE(current_occupancy, 0), 0), 0)), 0)::bigint
+                   AS quantity
+        FROM shelters GROUP BY status
+        UNION ALL
+        SELECT 'human_resources', role_type, count(*), sum(GREATEST(headcount_need - headcount_got, 0))::bigint
+        FROM human_resources WHERE status = 'active' AND role_status <> 'completed' GROUP BY role_type
+        UNION ALL
+        SELECT 'supply_items', tag, count(*), sum(total_number - COALESCE(received_count, 0))::bigint
+        FROM supply_items WHERE COALESCE(received_count, 0) < total_number GROUP BY tag
+        UNION ALL
+        SELECT 'requirements_hr', place_id, count(*), sum(require_count - received_count)::bigint
+        FROM requirements_hr WHERE received_count < require_count GROUP BY place_id
+        UNION ALL
+        SELECT 'requirements_supplies', place_id, count(*), sum(require_count - received_count)::bigint
+        FROM requirements_supplies WHERE received_count < require_count GROUP BY place_id
+        """
+    ),
+    # REFRESH ... CONCURRENTLY 需要唯一索引
+    DDL(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{STATS_VIEW}_section_key ON {STATS_VIEW} (section, key)"),
+]
+
+SOURCE_GENERATION_SQL = text(
+    "SELECT COALESCE(sum(generation), 0) FROM cache_generations WHERE name = ANY(:names)"
+)
+ROLLUP_GENERATION_SQL = text("SELECT generation FROM cache_generations WHERE name = :name")
+MARK_REFRESHED_SQL = text(
+    "INSERT INTO cache_generations (name, generation, updated_at) VALUES (:name, :generation, now()) "
+    "ON CONFLICT (name) DO UPDATE SET generation = EXCLUDED.generation, updated_at = EXCLUDED.updated_at"
+)
+
+
+async def refresh_stats_if_changed(force: bool = False) -> bool:
+    """
+    來源資料表有寫入時重新彙總，回傳是否有執行 REFRESH。
+    其他 worker 正在彙總時直接略過（下一輪再比對）。
+    """
+    async with async_engine.begin() as conn:
+        sources = (await conn.execute(SOURCE_GENERATION_SQL, {"names": list(STATS_SOURCE_TABLES)})).scalar()
+        refreshed = (await conn.execute(ROLLUP_GENERATION_SQL, {"name": STATS_VIEW})).scalar()
+        if refreshed == sources and not force:
+            return False
+        locked = (await conn.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"), {"name": STATS_VIEW})).scalar()
+        if not locked:
+            return False
+        # 記錄的是 REFRESH 前讀到的世代：期間若有新的寫入，下一輪會再彙總一次
+        await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {STATS_VIEW}"))
+        await conn.execute(MARK_REFRESHED_SQL, {"name": STATS_VIEW, "generation": sources})
+    return True
+
+
+async def stats_refresh_loop(interval_seconds: float) -> None:
+    """背景工作：每 interval_seconds 秒檢查一次；資料庫錯誤只記錄，不中斷"""
+    while True:
+        try:
+            await refresh_stats_if_changed()
+        except SQLAlchemyError:
+            logger.exception("stats_rollup 重新彙總失敗")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,32 @@
+"""
+測試需要一個可連線的 Postgres（EXPLAIN 查詢計畫與 SQL 計數都依賴實際的資料庫），
+連線設定與應用程式相同，由環境變數或 .env.dev 提供；連不上時整批略過。
+"""
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# 缺少必要設定時 src 無法匯入，測試模組一律不收集
+try:
+    from src import database
+except ValidationError as exc:
+    database = None
+    collect_ignore_glob = ["test_*.py"]
+    _missing_settings = ", ".join(str(error["loc"][0]) for error in exc.errors())
+
+
+def pytest_report_header(config):
+    if database is None:
+        return f"略過所有測試：缺少應用程式設定 {_missing_settings}"
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    try:
+        with database.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError as exc:
+        pytest.skip(f"無法連線到測試資料庫：{exc.orig}")
+    database.init_schema("create_all")
+    return database.engine
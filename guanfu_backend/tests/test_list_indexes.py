@@ -0,0 +1,152 @@
+"""
+以 EXPLAIN 確認各列表端點的查詢會用到對應的複合索引。
+
+測試資料表多半是空的，規劃器在小表上本來就偏好循序掃描，
+因此在交易內 SET LOCAL enable_seqscan = off，只比較各索引之間的成本：
+若查詢條件或排序與索引不符，計畫會退回主鍵或其他索引，斷言就會失敗。
+多個索引都符合時（例如 places 的 status 與 type + status），空表上的成本相同，
+需先寫入資料並 ANALYZE 讓規劃器有欄位分布可比較；交易最後 rollback，不留下資料。
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import desc, select, text
+
+from src import crud, models
+from src.routers.supplies import supply_status_statement
+
+# 同一個 status、查詢的 type 只佔 2%：只用 status 的索引要掃過大部分資料才湊得到一頁
+SEED_PLACES = (
+    """
+    INSERT INTO places (id, name, coordinates, type, status, contact_name, contact_phone)
+    SELECT 'seed-' || n, 'seed', '{"lat": 23.6, "lng": 121.4}', CASE WHEN n % 50 = 0 THEN '避難所' ELSE '物資站' END,
+           'open', 'seed', '0900000000'
+    FROM generate_series(1, 2000) AS n
+    """,
+    "ANALYZE places",
+)
+
+CURSOR = crud.encode_token([datetime(2025, 10, 1, tzinfo=timezone.utc), "00000000-0000-0000-0000-000000000000"])
+
+# (說明, 查詢, 應出現在計畫中的索引[, 事前執行的 SQL])
+CASES = [
+    # 一般列表：filter_by(status=...) 且未指定排序
+    *[
+        (f"{model.__tablename__} status", crud.build_list_statement(model, status="open"),
+         f"idx_{model.__tablename__}_status_updated_at")
+        for model in (
+            models.Shelter,
+            models.MedicalStation,
+            models.MentalHealthResource,
+            models.Accommodation,
+            models.ShowerStation,
+            models.WaterRefillStation,
+            models.Restroom,
+            models.Report,
+        )
+    ],
+    # 游標分頁：依 (updated_at, id) 排序並跳過游標之前的資料
+    *[
+        (f"{model.__tablename__} cursor", crud.build_list_statement(model, cursor=CURSOR, limit=50),
+         f"idx_{model.__tablename__}_updated_at_id")
+        for model in (
+            models.Shelter,
+            models.Accommodation,
+            models.HumanResource,
+            models.Supply,
+            models.SupplyItem,
+            models.SupplyProvider,
+            models.Place,
+            models.RequirementsHr,
+            models.RequirementsSupplies,
+        )
+    ],
+    (
+        "places type + status",
+        crud.build_list_statement(models.Place, type="避難所", status="open", order_by=models.Place.updated_at.desc()),
+        "idx_places_type_status_updated_at",
+        SEED_PLACES,
+    ),
+    (
+        "places status",
+        crud.build_list_statement(models.Place, status="open", order_by=models.Place.updated_at.desc()),
+        "idx_places_status_updated_at",
+    ),
+    (
+        "requirements_hr place_id",
+        crud.build_list_statement(
+            models.RequirementsHr, place_id="p", order_by=models.RequirementsHr.updated_at.desc()
+        ),
+        "idx_requirements_hr_place_id_updated_at",
+    ),
+    (
+        "requirements_supplies place_id",
+        crud.build_list_statement(
+            models.RequirementsSupplies, place_id="p", order_by=models.RequirementsSupplies.updated_at.desc()
+        ),
+        "idx_requirements_supplies_place_id_updated_at",
+    ),
+    (
+        "supply_items supply_id",
+        crud.build_list_statement(models.SupplyItem, supply_id="s"),
+        "idx_supply_items_supply_id",
+    ),
+    (
+        "supply_providers supply_item_id",
+        crud.build_list_statement(
+            models.SupplyProvider, supply_item_id="i", order_by=models.SupplyProvider.updated_at.desc()
+        ),
+        "idx_supply_providers_supply_item_id",
+    ),
+    (
+        "supplies open",
+        supply_status_statement("open").order_by(desc(models.Supply.updated_at)).limit(50),
+        "idx_supplies_open_updated_at_id",
+    ),
+    (
+        "supplies fulfilled",
+        supply_status_statement("fulfilled").order_by(desc(models.Supply.updated_at)).limit(50),
+        "idx_supplies_fulfilled_updated_at_id",
+    ),
+    (
+        "human_resources status",
+        select(models.HumanResource).filter_by(status="active")
+        .order_by(models.HumanResource.created_at.desc()).limit(20),
+        "idx_human_resources_status_created_at",
+    ),
+    (
+        "human_resources role_status",
+        select(models.HumanResource).filter_by(role_status="pending")
+        .order_by(models.HumanResource.created_at.desc()).limit(20),
+        "idx_human_resources_role_status_created_at",
+    ),
+    (
+        "human_resources role_type",
+        select(models.HumanResource).filter_by(role_type="一般志工")
+        .order_by(models.HumanResource.created_at.desc()).limit(20),
+        "idx_human_resources_role_type_created_at",
+    ),
+]
+
+
+def explain(engine, statement, setup=()) -> str:
+    compiled = statement.compile(dialect=engine.dialect)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            for sql in setup:
+                connection.execute(text(sql))
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).all()
+        finally:
+            transaction.rollback()
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    ("statement", "index", "setup"),
+    [pytest.param(*case[1:3], case[3] if len(case) > 3 else (), id=case[0]) for case in CASES],
+)
+def test_list_statement_uses_index(db_engine, statement, index, setup):
+    plan = explain(db_engine, statement, setup)
+    assert index in plan, plan
@@ -0,0 +1,93 @@
+"""
+GET /supplies 每頁發出的 SQL 語句數不應隨頁面大小增加（物資項目以 selectinload 一次載入，不逐筆 lazy load）。
+以 async Engine 的 before_cursor_execute 事件計算每個請求實際送出的語句數。
+"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, select
+
+from src import crud, models
+from src.config import settings
+from src.database import SessionLocal, async_engine
+from src.main import app
+
+SEED_NAME = "test_supplies_queries"
+SUPPLY_COUNT = 12
+ITEMS_PER_SUPPLY = 3
+
+
+@pytest.fixture
+def client(db_engine, monkeypatch):
+    # 關閉回應快取與啟動時的背景工作，只計算列表本身的查詢
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "DB_POOL_WARMUP", False)
+    monkeypatch.setattr(settings, "STATS_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(settings, "DB_INIT_ON_STARTUP", "none")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def seeded_supplies(db_engine):
+    with SessionLocal() as db:
+        for index in range(SUPPLY_COUNT):
+            supply = models.Supply(name=f"{SEED_NAME}-{index}")
+            supply.supplies = [
+                models.SupplyItem(total_number=5, received_count=index % 2 * 5, tag="food", name=f"item-{n}")
+                for n in range(ITEMS_PER_SUPPLY)
+            ]
+            db.add(supply)
+        crud.commit_changes(db, models.Supply, models.SupplyItem)
+    yield
+    seeded_ids = select(models.Supply.id).where(models.Supply.name.like(f"{SEED_NAME}-%")).scalar_subquery()
+    with SessionLocal() as db:
+        db.execute(delete(models.SupplyItem).where(models.SupplyItem.supply_id.in_(seeded_ids)))
+        db.execute(delete(models.Supply).where(models.Supply.id.in_(seeded_ids)))
+        crud.commit_changes(db, models.Supply, models.SupplyItem)
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def statements_for(client, params: dict) -> list:
+    # 先請求一次，讓總數快取等與頁面大小無關的狀態一致
+    client.get("/supplies", params=params).raise_for_status()
+    with count_statements() as statements:
+        response = client.get("/supplies", params=params)
+    response.raise_for_status()
+    return statements
+
+
+@pytest.mark.parametrize("embed", [None, "all", "none"])
+@pytest.mark.parametrize("paging", [{}, {"cursor": ""}], ids=["offset", "cursor"])
+def test_list_supplies_query_count_is_constant(client, seeded_supplies, embed, paging):
+    params = {**paging, **({"embed": embed} if embed else {})}
+    counts = {
+        limit: len(statements_for(client, {**params, "limit": limit}))
+        for limit in (1, 5, SUPPLY_COUNT)
+    }
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_list_supplies_loads_items_in_one_query(client, seeded_supplies):
+    params = {"limit": SUPPLY_COUNT, "status": "open"}
+    with_items = statements_for(client, {**params, "embed": "all"})
+    without_items = statements_for(client, {**params, "embed": "none"})
+    assert len(with_items) == len(without_items) + 1, with_items
+
+    member = client.get("/supplies", params={**params, "embed": "all"}).json()["member"]
+    seeded = [supply for supply in member if supply["name"].startswith(SEED_NAME)]
+    assert seeded and all(len(supply["supplies"]) == ITEMS_PER_SUPPLY for supply in seeded)